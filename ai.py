@@ -12,55 +12,362 @@ Copyright and Usage Information
 This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
 """
 from __future__ import annotations
+from typing import Any, Optional
+import threading
+import time
 # from python_ta.contracts import check_contracts
 from gametree import *
 from board import Board
+from bitboard import BitBoard
+from search import AlphaBetaSearch, SearchTimeout, WIN_SCORE
+from parallel import ParallelSearch
+from transposition import TranspositionTable
+from tablebase import Tablebase
+from book import OpeningBook
+from stats import SearchStats
+from evaluation import Evaluator, PositionalEvaluator
+from zobrist import side_key
+
+# The ways the AI can pick its moves.
+AVERAGE_MODE = 'average'
+ALPHABETA_MODE = 'alphabeta'
+
+# The depth of the search that predicts the opponent's move to ponder on, when the transposition table has no move
+# stored for it.
+PONDER_PREDICTION_DEPTH = 4
 
 
 # @check_contracts
 class AI:
     """ A player class that makes moves based on the game tree
 
+    In AVERAGE_MODE the AI builds the full game tree and picks the move with the best average material advantage. In
+    ALPHABETA_MODE it runs an alpha-beta search instead, and its game tree only holds the current board.
+
     Instance Attributes:
     - game_tree: a gametree object that the AI will use to pick the best moves.
+    - colour: the colour the AI plays.
+    - use_bitboard: whether the AI searches on a BitBoard converted from the game board instead of on Board copies.
+    - mode: how the AI picks its moves, either AVERAGE_MODE or ALPHABETA_MODE.
+    - tree_depth: the depth of the game tree built in AVERAGE_MODE.
+    - search_depth: the number of plies searched in ALPHABETA_MODE when there is no time budget.
+    - time_budget_ms: the default number of milliseconds a move may take in ALPHABETA_MODE, or None to always search
+    to search_depth.
+    - transposition_table: the table of search results kept between moves in ALPHABETA_MODE.
+    - search: the alpha-beta search used in ALPHABETA_MODE, which spreads the root moves across worker processes
+    when the AI was given more than one worker.
+    - tablebase: the endgame tablebases the AI plays from perfectly once few enough pieces are left, or None.
+    - book: the opening book the AI plays from while the game is still in it, or None.
+    - evaluator: the evaluator that scores the positions at the end of the AI's search or game tree.
+    - collect_stats: whether the AI records statistics about how it chose each of its moves.
+    - stats: the statistics being recorded for the move the AI is about to make, or None if there are none.
+    - stats_log: the statistics recorded for each move the AI has made, as dictionaries that can be written as JSON.
+    - ponder_move: the opponent move the AI pondered on during the opponent's last turn, or None if it did not ponder
+    on a single move.
+
+    Private Instance Attributes:
+    - _ponder_seconds: the time spent searching the position after self.ponder_move.
+    - _ponder_credit_ms: the milliseconds of pondering to take off the time budget of the next move, because the
+    opponent played the move the AI pondered on.
+
+    Representation Invariants:
+    - self.colour in (BLACK, WHITE)
+    - self.mode in (AVERAGE_MODE, ALPHABETA_MODE)
+    - self.tree_depth >= 1
+    - self.search_depth >= 1
+    - self.time_budget_ms is None or self.time_budget_ms >= 0
     """
     game_tree: GameTree
+    colour: int
+    use_bitboard: bool
+    mode: str
+    tree_depth: int
+    search_depth: int
+    time_budget_ms: Optional[int]
+    transposition_table: TranspositionTable
+    search: AlphaBetaSearch
+    tablebase: Optional[Tablebase]
+    book: Optional[OpeningBook]
+    evaluator: Evaluator
+    collect_stats: bool
+    stats: Optional[SearchStats]
+    stats_log: list[dict[str, Any]]
+    ponder_move: Optional[tuple[tuple[int, int], tuple[int, int]]]
+    _ponder_seconds: float
+    _ponder_credit_ms: int
+
+    def __init__(self, game_tree: GameTree, use_bitboard: bool = False, mode: str = AVERAGE_MODE,
+                 tree_depth: int = 4, search_depth: int = 8, time_budget_ms: Optional[int] = None,
+                 tt_size_mb: float = 16, workers: int = 1, colour: int = BLACK,
+                 tablebase_dir: Optional[str] = None, book_path: Optional[str] = None,
+                 collect_stats: bool = False, evaluator: Optional[Evaluator] = None) -> None:
+        """ Initializes the AI's gametree and a transposition table taking up about tt_size_mb megabytes.
 
-    def __init__(self, game_tree: GameTree) -> None:
-        """ Initializes the AI's gametree """
+        With more than one worker, deep searches run in parallel in that many worker processes. If tablebase_dir is
+        given, the endgame tablebase files in it are used in positions with few enough pieces, and if book_path is
+        given, the opening book file at that path is used while the game is still in it. Positions are scored with
+        the given evaluator, by default a PositionalEvaluator with the default weights.
+        """
         self.game_tree = game_tree
+        self.colour = colour
+        self.use_bitboard = use_bitboard
+        self.mode = mode
+        self.tree_depth = tree_depth
+        self.search_depth = search_depth
+        self.time_budget_ms = time_budget_ms
+        self.transposition_table = TranspositionTable(tt_size_mb)
+        self.evaluator = evaluator if evaluator is not None else PositionalEvaluator()
+        if workers > 1:
+            self.search = ParallelSearch(self.transposition_table, workers, evaluator=self.evaluator)
+        else:
+            self.search = AlphaBetaSearch(self.transposition_table, self.evaluator)
+        self.tablebase = Tablebase(tablebase_dir) if tablebase_dir is not None else None
+        self.book = OpeningBook(book_path) if book_path is not None else None
+        self.collect_stats = collect_stats
+        self.stats = None
+        self.stats_log = []
+        self.ponder_move = None
+        self._ponder_seconds = 0.0
+        self._ponder_credit_ms = 0
 
-    def update_game_tree(self, move: tuple[tuple[int, int], tuple[int, int]], board: Board) -> None:
+    def update_game_tree(self, move: tuple[tuple[int, int], tuple[int, int]], board: Board | BitBoard) -> None:
         """ updates the AI's gametree after a move was made.
 
+        In AVERAGE_MODE, the subtree the AI already built for the move is kept and only extended by the plies it is
+        missing. The tree is only rebuilt from scratch if the AI has no subtree for the move. If the AI collects
+        statistics, the ones recorded for its next move start here, so they include building the tree. If the move is
+        the one the AI pondered on, the time it spent pondering is taken off the time budget of its next move.
+
         Parameters:
         - move: the previous move that was made.
-        - board: a board object for the current state of the gameboard.
+        - board: a board or bitboard object for the current state of the gameboard.
 
         Preconditions:
         - move is a valid checkers move.
         - the board status matches the move that was given.
         """
-        self.game_tree = generate_game_tree(board, move)
+        if self.collect_stats:
+            self._start_stats()
+        if self.use_bitboard and isinstance(board, Board):
+            board = BitBoard.from_board(board)
+        if self.ponder_move is not None and move == self.ponder_move:
+            self._ponder_credit_ms = round(self._ponder_seconds * 1000)
+        else:
+            self._ponder_credit_ms = 0
+        self.ponder_move = None
+
+        if self.mode == ALPHABETA_MODE:
+            self.game_tree = GameTree(board, move)
+            return
+
+        subtree = self.game_tree.get_subtree(move)
+        if subtree is not None and subtree.board_state.zobrist == board.zobrist:
+            extend_game_tree(subtree, max_depth=self.tree_depth, colour=self.colour, stats=self.stats,
+                             evaluator=self.evaluator)
+            self.game_tree = subtree
+        else:
+            self.game_tree = generate_game_tree(board, move, max_depth=self.tree_depth, colour=self.colour,
+                                                stats=self.stats, evaluator=self.evaluator)
 
-    def make_move(self) -> tuple[tuple[int, int], tuple[int, int]] | str:
+    def make_move(self, time_budget_ms: Optional[int] = None) -> tuple[tuple[int, int], tuple[int, int]] | str:
         """ makes the best move for the AI player
 
+        Parameters:
+        - time_budget_ms: the number of milliseconds the move may take in ALPHABETA_MODE, searching one ply deeper at
+        a time until it runs out. Defaults to self.time_budget_ms.
+
+        Returns:
+        - returns the move that was made.
+
+        Preconditions:
+        - time_budget_ms is None or time_budget_ms >= 0
+        """
+        if self.collect_stats and self.stats is None:
+            self._start_stats()
+
+        move, source = None, None
+        if self.book is not None:
+            move, source = self._make_book_move(), 'book'
+        if move is None and self.tablebase is not None:
+            move, source = self._make_tablebase_move(), 'tablebase'
+        if move is None and self.mode == ALPHABETA_MODE:
+            if time_budget_ms is None:
+                time_budget_ms = self.time_budget_ms
+            move, source = self._make_search_move(time_budget_ms), ALPHABETA_MODE
+        elif move is None:
+            move, source = self._make_average_move(), AVERAGE_MODE
+
+        if self.stats is not None:
+            self._finish_stats(source)
+        return move
+
+    def _make_average_move(self) -> tuple[tuple[int, int], tuple[int, int]] | str:
+        """ makes the move whose subtree has the best average material advantage for the AI
+
         Returns:
         - returns the move that was made.
         """
         moves = self.game_tree.get_subtrees()
+        sign = 1 if self.colour == BLACK else -1
         curr_advantage = -100
         best = moves[0]
 
         for move in moves:
-            if move.material_advantage > curr_advantage:
-                curr_advantage = move.material_advantage
+            if sign * move.material_advantage > curr_advantage:
+                curr_advantage = sign * move.material_advantage
                 best = move
 
         self.game_tree = best
         return best.move
 
+    def _make_book_move(self) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """ makes the best move the opening book holds for the current board
+
+        Returns:
+        - returns the move that was made, or None if the current board is not in the book or the book's move is not
+        legal on it.
+        """
+        board = self.game_tree.board_state
+        best_move = self.book.best_move(board, self.colour)
+        if best_move is None:
+            return None
+
+        for move, child in get_successors(board, self.colour):
+            if move == best_move:
+                self.game_tree = GameTree(child, move, self.evaluator.evaluate(child))
+                return best_move
+        return None
+
+    def _make_tablebase_move(self) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """ makes the move the endgame tablebase gives for the current board, taking the fastest win, a draw or the
+        slowest loss
+
+        Returns:
+        - returns the move that was made, or None if the current board is not in the tablebase or the tablebase's move
+        is not legal on it.
+        """
+        board = self.game_tree.board_state
+        if board.black_left + board.white_left > self.tablebase.max_pieces:
+            return None
+        found = self.tablebase.best_move(board, self.colour)
+        if found is None:
+            return None
+
+        best_move, result, _ = found
+        score = result * WIN_SCORE if self.colour == BLACK else -result * WIN_SCORE
+        for move, child in get_successors(board, self.colour):
+            if move == best_move:
+                self.game_tree = GameTree(child, move, score)
+                return best_move
+        return None
+
+    def _make_search_move(self, time_budget_ms: Optional[int]) -> tuple[tuple[int, int], tuple[int, int]]:
+        """ makes the best move found by an alpha-beta search of the current board
+
+        Parameters:
+        - time_budget_ms: the number of milliseconds the search may take, or None to search to self.search_depth.
+
+        Returns:
+        - returns the move that was made.
+        """
+        board = self.game_tree.board_state
+        self.transposition_table.new_search()
+        if time_budget_ms is not None:
+            time_budget_ms = max(0, time_budget_ms - self._ponder_credit_ms)
+        self._ponder_credit_ms = 0
+        if time_budget_ms is None:
+            best_move, score = self.search.search(board, self.colour, self.search_depth)
+            depth = self.search_depth
+        else:
+            best_move, score = self.search.iterative_deepening(board, self.colour, time_budget_ms)
+            depth = self.search.completed_depth
+        if self.stats is not None:
+            self.stats.depth = depth
+
+        for move, child in get_successors(board, self.colour):
+            if move == best_move:
+                self.game_tree = GameTree(child, move, score if self.colour == BLACK else -score)
+        return best_move
+
+    def ponder(self, board: Board | BitBoard, stop_event: threading.Event, all_replies: bool = False,
+               time_budget_ms: Optional[int] = None) -> None:
+        """ searches during the opponent's turn until stop_event is set or the time budget runs out, so that the
+        results left in the transposition table make the AI's next move faster and better.
+
+        By default the AI predicts the opponent's move and searches the position it leads to, as its next search would.
+        If the opponent plays that move, the time spent pondering is taken off the time budget of the AI's next move.
+        With all_replies, the AI searches the current board from the opponent's point of view instead, which helps
+        with every reply but less with each one. Only ALPHABETA_MODE ponders.
+
+        Parameters:
+        - board: the board during the opponent's turn, which the AI does not change.
+        - stop_event: the event the opponent's move sets to stop pondering.
+        - all_replies: whether to search every opponent move instead of only the predicted one.
+        - time_budget_ms: the number of milliseconds the AI may ponder for, or None to ponder until stop_event is set.
+        """
+        self.ponder_move = None
+        self._ponder_seconds = 0.0
+        if self.mode != ALPHABETA_MODE:
+            return
+        board = BitBoard.from_board(board) if self.use_bitboard and isinstance(board, Board) else board.__copy__()
+        opponent = WHITE if self.colour == BLACK else BLACK
+        search = AlphaBetaSearch(self.transposition_table, self.evaluator)
+        search.stop_event = stop_event
+        self.transposition_table.new_search()
+        started = time.perf_counter()
+
+        try:
+            if all_replies:
+                search.iterative_deepening(board, opponent, time_budget_ms)
+                return
+            reply = self._predict_reply(board, search)
+            if reply is None:
+                return
+            self.ponder_move = (reply[0], reply[1])
+            board.make_move(reply)
+            start = time.perf_counter()
+            if time_budget_ms is not None:
+                time_budget_ms = max(0, time_budget_ms - round((start - started) * 1000))
+            try:
+                search.iterative_deepening(board, self.colour, time_budget_ms)
+            finally:
+                self._ponder_seconds = time.perf_counter() - start
+        except SearchTimeout:
+            pass
+
+    def _predict_reply(self, board: Board | BitBoard, search: AlphaBetaSearch) -> Optional[tuple]:
+        """ returns the move the AI expects the opponent to make on board: the best move stored for it in the
+        transposition table, or else the best move found by a search PONDER_PREDICTION_DEPTH plies deep. Returns None
+        if the opponent has no moves.
+        """
+        opponent = WHITE if self.colour == BLACK else BLACK
+        moves = board.legal_moves(opponent)
+        entry = self.transposition_table.probe(board.zobrist ^ side_key(opponent))
+        best_move = entry[3] if entry is not None else None
+        if best_move is None and moves:
+            best_move, _ = search.search(board, opponent, PONDER_PREDICTION_DEPTH)
+        return next((move for move in moves if (move[0], move[1]) == best_move), None)
+
+    def _start_stats(self) -> None:
+        """ starts recording statistics for the AI's next move """
+        self.stats = SearchStats()
+        self.stats.start(self.transposition_table)
+        self.search.stats = self.stats
+
+    def _finish_stats(self, source: str) -> None:
+        """ stops recording statistics for the move just made and adds them to the log
+
+        Parameters:
+        - source: how the move was chosen.
+        """
+        self.stats.source = source
+        if source == AVERAGE_MODE:
+            self.stats.depth = self.tree_depth
+        self.stats.stop(self.transposition_table)
+        self.stats_log.append(self.stats.to_dict())
+        self.search.stats = None
+        self.stats = None
+
 
 if __name__ == '__main__':
     import doctest
@@ -70,7 +377,8 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['board', 'gametree'],
+        'extra-imports': ['board', 'bitboard', 'gametree', 'search', 'parallel', 'transposition',
+                          'tablebase', 'book', 'stats', 'evaluation', 'zobrist', 'threading', 'time'],
         'max-line-length': 120,
         'disable': ['wildcard-import']
     })
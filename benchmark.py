@@ -0,0 +1,258 @@
+""" Checkers performance benchmarks
+
+Module Description
+==================
+
+This module contains a benchmark suite that times move generation, board copies, win detection, encoding positions to
+and from their 12 byte binary form, and full AI moves on a fixed set of positions, on both Board and BitBoard. Each
+benchmark is timed over many samples and reported as the median, 90th and 99th percentile time per call. Results can
+be saved as a baseline and later runs compared against it, failing when a benchmark has become slower than the
+baseline by more than a threshold.
+
+Examples, saving a baseline and then checking a change against it:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.1
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Any, Callable, Optional
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+from board import Board
+from bitboard import BitBoard, INITIAL_BLACK, INITIAL_WHITE
+from gametree import GameTree
+from ai import AI, ALPHABETA_MODE, AVERAGE_MODE
+from perft import perft
+from constants import *
+
+# The positions the benchmarks run on, as the black, white and king masks of a BitBoard and the colour to move.
+POSITIONS = {
+    'opening': (INITIAL_BLACK, INITIAL_WHITE, 0, WHITE),
+    'midgame': (0x49d7e, 0xe7ea2000, 0, WHITE),
+    'multijump': (0x3028b04, 0x700c1000, 0, WHITE),
+    'king_endgame': (0x2402, 0x48440000, 0x48440402, WHITE)
+}
+
+# How much slower than the baseline a benchmark's median may get before it counts as a regression.
+DEFAULT_THRESHOLD = 0.10
+
+# The shortest time one sample of a benchmark takes, calling it as many times as that needs.
+_MIN_SAMPLE_SECONDS = 0.02
+
+
+def _fresh_winner(board: Board) -> Optional[int]:
+    """ Returns board.get_winner() with the board's move cache emptied first, as it is after a move is played """
+    board.clear_move_cache()
+    return board.get_winner()
+
+
+def _ai_move(board: BitBoard, colour: int, mode: str, depth: int) \
+        -> tuple[tuple[int, int], tuple[int, int]] | str:
+    """ Makes a move for colour with a new AI playing on a copy of board """
+    if mode == ALPHABETA_MODE:
+        ai = AI(GameTree(board.__copy__()), use_bitboard=True, mode=mode, search_depth=depth, colour=colour)
+    else:
+        ai = AI(GameTree(board.to_board()), mode=mode, tree_depth=depth, colour=colour)
+        ai.update_game_tree('*', ai.game_tree.board_state)
+    return ai.make_move()
+
+
+def benchmarks(perft_depth: int = 3, ai_depth: int = 6,
+               tree_depth: int = 3) -> list[tuple[str, Callable[[], Any]]]:
+    """ Returns the name and function of every benchmark.
+
+    Parameters:
+    - perft_depth: the depth of the move generation benchmarks.
+    - ai_depth: the search depth of the alpha-beta AI move benchmarks.
+    - tree_depth: the game tree depth of the averaging AI move benchmarks.
+    """
+    result = []
+    for name, (black, white, kings, colour) in POSITIONS.items():
+        bitboard = BitBoard(black, white, kings)
+        board = bitboard.to_board()
+        result.extend([
+            (f'{name}/board/perft{perft_depth}', lambda b=board, c=colour: perft(b, c, perft_depth)),
+            (f'{name}/bitboard/perft{perft_depth}', lambda b=bitboard, c=colour: perft(b, c, perft_depth)),
+            (f'{name}/board/copy', board.__copy__),
+            (f'{name}/bitboard/copy', bitboard.__copy__),
+            (f'{name}/board/get_winner', lambda b=board: _fresh_winner(b)),
+            (f'{name}/bitboard/get_winner', bitboard.get_winner),
+            (f'{name}/board/to_bytes', lambda b=board, c=colour: b.to_bytes(c)),
+            (f'{name}/bitboard/to_bytes', lambda b=bitboard, c=colour: b.to_bytes(c)),
+            (f'{name}/board/from_bytes', lambda d=bitboard.to_bytes(colour): Board.from_bytes(d)),
+            (f'{name}/bitboard/from_bytes', lambda d=bitboard.to_bytes(colour): BitBoard.from_bytes(d)),
+            (f'{name}/ai/alphabeta{ai_depth}', lambda b=bitboard, c=colour: _ai_move(b, c, ALPHABETA_MODE, ai_depth)),
+            (f'{name}/ai/average{tree_depth}', lambda b=bitboard, c=colour: _ai_move(b, c, AVERAGE_MODE, tree_depth))
+        ])
+    return result
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """ Returns the nearest-rank percentile of a list of samples.
+
+    Preconditions:
+    - samples != []
+    - 0 < fraction <= 1
+
+    >>> percentile([4.0, 1.0, 3.0, 2.0], 0.5)
+    2.0
+    >>> percentile([4.0, 1.0, 3.0, 2.0], 0.99)
+    4.0
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def time_function(function: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """ Times a function and returns the median, 90th and 99th percentile of its time per call in seconds.
+
+    Each of the repeat samples calls the function enough times to take at least _MIN_SAMPLE_SECONDS, and the garbage
+    collector is turned off while sampling, as timeit does.
+
+    Preconditions:
+    - repeat >= 1
+    """
+    function()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= _MIN_SAMPLE_SECONDS:
+            break
+        number *= 2
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {'median': percentile(samples, 0.5), 'p90': percentile(samples, 0.9), 'p99': percentile(samples, 0.99),
+            'calls': number * repeat}
+
+
+def run(repeat: int = 15, only: Optional[str] = None, perft_depth: int = 3, ai_depth: int = 6,
+        tree_depth: int = 3, verbose: bool = False) -> dict[str, dict[str, float]]:
+    """ Runs the benchmarks and returns the timings of each one by name.
+
+    Parameters:
+    - repeat: the number of samples of each benchmark.
+    - only: run only the benchmarks whose name contains this text, or every benchmark if it is None.
+    - perft_depth: the depth of the move generation benchmarks.
+    - ai_depth: the search depth of the alpha-beta AI move benchmarks.
+    - tree_depth: the game tree depth of the averaging AI move benchmarks.
+    - verbose: whether to print each benchmark as it finishes.
+    """
+    results = {}
+    for name, function in benchmarks(perft_depth, ai_depth, tree_depth):
+        if only is None or only in name:
+            results[name] = time_function(function, repeat)
+            if verbose:
+                print(_format_row(name, results[name]))
+    return results
+
+
+def _format_seconds(seconds: float) -> str:
+    """ Returns a time in seconds formatted in the most readable unit
+
+    >>> _format_seconds(0.0000123), _format_seconds(0.0123), _format_seconds(1.5)
+    ('12.30us', '12.30ms', '1.500s')
+    """
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.2f}us'
+    elif seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    else:
+        return f'{seconds:.3f}s'
+
+
+def _format_row(name: str, timing: dict[str, float]) -> str:
+    """ Returns one line of the benchmark report """
+    return (f"{name:<36} median {_format_seconds(timing['median']):>10}  p90 {_format_seconds(timing['p90']):>10}  "
+            f"p99 {_format_seconds(timing['p99']):>10}")
+
+
+def save_baseline(path: str, results: dict[str, dict[str, float]]) -> None:
+    """ Writes benchmark results to a baseline JSON file, along with the Python version and machine they ran on """
+    with open(path, 'w') as file:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, file,
+                  indent=2)
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]],
+            threshold: float = DEFAULT_THRESHOLD) -> list[tuple[str, float, float, float]]:
+    """ Compares benchmark results with a baseline and returns the regressions.
+
+    Parameters:
+    - results: the timings of the benchmarks that were run.
+    - baseline: the timings of the baseline.
+    - threshold: the fraction by which a median may grow before it counts as a regression.
+
+    Returns:
+    - A list holding, for each benchmark whose median grew by more than threshold, its name, its baseline median,
+    its new median and the fraction by which it grew.
+
+    >>> compare({'a': {'median': 1.2}, 'b': {'median': 1.05}}, {'a': {'median': 1.0}, 'b': {'median': 1.0}})
+    [('a', 1.0, 1.2, 0.19999999999999996)]
+    """
+    regressions = []
+    for name, timing in results.items():
+        if name in baseline:
+            old, new = baseline[name]['median'], timing['median']
+            change = new / old - 1
+            if change > threshold:
+                regressions.append((name, old, new, change))
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """ Runs the benchmarks from the command line and returns 1 if any regressed against the baseline, or 0 """
+    parser = argparse.ArgumentParser(description='Benchmark checkers move generation and search.')
+    parser.add_argument('--repeat', type=int, default=15, help='the number of samples of each benchmark')
+    parser.add_argument('--only', default=None, help='run only the benchmarks whose name contains this text')
+    parser.add_argument('--perft-depth', type=int, default=3, help='the depth of the move generation benchmarks')
+    parser.add_argument('--ai-depth', type=int, default=6, help='the search depth of the alpha-beta AI benchmarks')
+    parser.add_argument('--tree-depth', type=int, default=3, help='the game tree depth of the averaging AI benchmarks')
+    parser.add_argument('--save', default=None, help='a JSON file to save the results to as a baseline')
+    parser.add_argument('--compare', default=None, help='a baseline JSON file to compare the results with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='the fraction a median may grow by before it counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.only, args.perft_depth, args.ai_depth, args.tree_depth, verbose=True)
+    if args.save is not None:
+        save_baseline(args.save, results)
+
+    if args.compare is None:
+        return 0
+    with open(args.compare) as file:
+        baseline = json.load(file)['results']
+    print()
+    for name, timing in results.items():
+        if name in baseline:
+            print(f"{name:<36} {timing['median'] / baseline[name]['median'] - 1:+.1%}")
+    regressions = compare(results, baseline, args.threshold)
+    for name, old, new, change in regressions:
+        print(f'REGRESSION {name}: {_format_seconds(old)} -> {_format_seconds(new)} ({change:+.1%})')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+""" Checkers BitBoard class
+
+Module Description
+==================
+
+This module contains a bitboard representation of a checkers position that the AI can search on instead of a Board.
+The 32 playable squares are numbered 0 to 31 row by row from the top of the board, and a position is stored as three
+32-bit masks: the black pieces, the white pieces and the kings.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Optional
+from constants import *
+from board import Board
+import position
+from zobrist import PIECE_KEYS
+
+SQUARES = 32
+FULL_MASK = (1 << SQUARES) - 1
+INITIAL_BLACK = (1 << 12) - 1
+INITIAL_WHITE = FULL_MASK ^ ((1 << 20) - 1)
+
+# The (row, column) of every playable square.
+SQUARE_COORDS = [(sq // 4, 2 * (sq % 4) + (sq // 4 + 1) % 2) for sq in range(SQUARES)]
+
+# Diagonal directions in the order Board.get_valid_moves visits them: up-left, up-right, down-left, down-right.
+_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+_WHITE_DIRECTIONS = (0, 1)
+_BLACK_DIRECTIONS = (2, 3)
+_KING_DIRECTIONS = (0, 1, 2, 3)
+
+
+def square_index(row: int, col: int) -> int:
+    """ Returns the index of the playable square at the given row and column.
+
+    Preconditions:
+    - row < ROWS and row >= 0
+    - col < COLS and col >= 0
+    - col % 2 == (row + 1) % 2
+
+    >>> square_index(0, 1)
+    0
+    >>> square_index(7, 6)
+    31
+    """
+    return row * 4 + col // 2
+
+
+def _build_tables() -> tuple[list[tuple[int, ...]], list[tuple[int, ...]], list[tuple[int, ...]]]:
+    """ Builds the step, jump and continuation jump tables, holding -1 where a square is off the board.
+
+    Continuation jumps mirror Board._traverse_left and Board._traverse_right, where a second or later jump going
+    up the board never lands on row 0.
+    """
+    steps, jumps, continuations = [], [], []
+    for row, col in SQUARE_COORDS:
+        step, jump, continuation = [], [], []
+        for dr, dc in _DIRECTIONS:
+            if 0 <= row + dr < ROWS and 0 <= col + dc < COLS:
+                step.append(square_index(row + dr, col + dc))
+            else:
+                step.append(-1)
+
+            if 0 <= row + 2 * dr < ROWS and 0 <= col + 2 * dc < COLS:
+                jump.append(square_index(row + 2 * dr, col + 2 * dc))
+            else:
+                jump.append(-1)
+
+            if jump[-1] != -1 and row + 2 * dr != 0:
+                continuation.append(jump[-1])
+            else:
+                continuation.append(-1)
+        steps.append(tuple(step))
+        jumps.append(tuple(jump))
+        continuations.append(tuple(continuation))
+    return steps, jumps, continuations
+
+
+_STEP, _JUMP, _CONTINUE = _build_tables()
+
+# The Zobrist keys of the pieces on every playable square, in the same order as zobrist.PIECE_KEYS.
+_SQUARE_KEYS = [PIECE_KEYS[row][col] for row, col in SQUARE_COORDS]
+
+
+def _hash_masks(black: int, white: int, kings: int) -> int:
+    """ Returns the Zobrist hash of the position with the given masks, equal to the hash of the same position on a
+    Board.
+    """
+    zobrist = 0
+    pieces = black | white
+    while pieces:
+        low = pieces & -pieces
+        pieces ^= low
+        sq = low.bit_length() - 1
+        zobrist ^= _SQUARE_KEYS[sq][(0 if black & low else 2) + (1 if kings & low else 0)]
+    return zobrist
+
+
+# @check_contracts
+class BitBoard:
+    """ A bitboard representation of a checkers position.
+
+    Moves are generated with the same rules as Board.get_valid_moves, so any move found on a BitBoard is valid on the
+    Board it was converted from. A move is a tuple of the start square, the end square and a mask of the squares
+    captured along the way.
+
+    Instance Attributes:
+    - black: mask of the squares holding black pieces.
+    - white: mask of the squares holding white pieces.
+    - kings: mask of the squares holding kings of either colour.
+    - zobrist: the Zobrist hash of the pieces on the board, kept up to date by self.make_move.
+
+    A bitboard is equal to any Board or BitBoard holding the same pieces on the same squares, and hashes by
+    self.zobrist like Board, so it must not be changed while it is a key of a dict or in a set.
+
+    Representation Invariants:
+    - self.black & self.white == 0
+    - self.kings & ~(self.black | self.white) == 0
+    """
+    black: int
+    white: int
+    kings: int
+    zobrist: int
+
+    def __init__(self, black: int = INITIAL_BLACK, white: int = INITIAL_WHITE, kings: int = 0) -> None:
+        """ Initializes a bitboard, by default to the starting position """
+        self.black = black
+        self.white = white
+        self.kings = kings
+        self.zobrist = _hash_masks(black, white, kings)
+
+    def __copy__(self) -> BitBoard:
+        """ Creates and returns a copy of the bitboard """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.black = self.black
+        new_board.white = self.white
+        new_board.kings = self.kings
+        new_board.zobrist = self.zobrist
+        return new_board
+
+    def __eq__(self, other: object) -> bool:
+        """ Returns whether other is a Board or BitBoard holding the same pieces on the same squares """
+        if isinstance(other, BitBoard):
+            return self.black == other.black and self.white == other.white and self.kings == other.kings
+        elif isinstance(other, Board):
+            return self.zobrist == other.zobrist and self.masks() == other.masks()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.zobrist)
+
+    @classmethod
+    def from_board(cls, board: Board) -> BitBoard:
+        """ Returns the bitboard for the position on the given board
+
+        Parameters:
+        - board: the board to convert.
+        """
+        return cls(*board.masks())
+
+    def to_board(self) -> Board:
+        """ Returns a Board holding the same position as this bitboard """
+        return Board.from_masks(self.black, self.white, self.kings)
+
+    def masks(self) -> tuple[int, int, int]:
+        """ Returns the masks of the squares holding black pieces, white pieces and kings """
+        return (self.black, self.white, self.kings)
+
+    def to_bytes(self, colour: int = WHITE) -> bytes:
+        """ Returns the 12 byte binary form of the position with colour to move, as in position.encode
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+
+        >>> len(BitBoard().to_bytes())
+        12
+        """
+        return position.encode(self.black, self.white, self.kings, colour)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> tuple[BitBoard, int]:
+        """ Returns the bitboard and the colour to move of a position from its binary form. Raises ValueError if data
+        is not the binary form of a position.
+
+        >>> board, colour = BitBoard.from_bytes(BitBoard(0b1, 0b10, 0b10).to_bytes(BLACK))
+        >>> (board.black, board.white, board.kings), colour == BLACK
+        ((1, 2, 2), True)
+        """
+        black, white, kings, colour = position.decode(data)
+        return (cls(black, white, kings), colour)
+
+    def to_fen(self, colour: int = WHITE) -> str:
+        """ Returns the FEN of the position with colour to move, as in position.to_fen
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        return position.to_fen(self.black, self.white, self.kings, colour)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> tuple[BitBoard, int]:
+        """ Returns the bitboard and the colour to move of a position from its FEN. Raises ValueError if fen is not a
+        FEN.
+
+        >>> board, colour = BitBoard.from_fen(BitBoard().to_fen(BLACK))
+        >>> board == BitBoard() == Board(), colour == BLACK
+        (True, True)
+        """
+        black, white, kings, colour = position.from_fen(fen)
+        return (cls(black, white, kings), colour)
+
+    @property
+    def black_left(self) -> int:
+        """ The number of black pieces left """
+        return self.black.bit_count()
+
+    @property
+    def white_left(self) -> int:
+        """ The number of white pieces left """
+        return self.white.bit_count()
+
+    @property
+    def black_kings(self) -> int:
+        """ The number of black kings """
+        return (self.black & self.kings).bit_count()
+
+    @property
+    def white_kings(self) -> int:
+        """ The number of white kings """
+        return (self.white & self.kings).bit_count()
+
+    def get_valid_moves(self, sq: int) -> dict[int, int]:
+        """ Returns a dictionary of valid moves for the piece on the given square.
+
+        Parameters:
+        - sq: the square of the piece for which valid moves are to be determined.
+
+        Returns:
+        - A dictionary mapping each destination square to the mask of pieces captured by moving there, in the same
+        order and with the same captures as Board.get_valid_moves.
+
+        Preconditions:
+        - (self.black | self.white) & (1 << sq) != 0
+        """
+        bit = 1 << sq
+        if self.black & bit:
+            opponent = self.white
+            directions = _KING_DIRECTIONS if self.kings & bit else _BLACK_DIRECTIONS
+        else:
+            opponent = self.black
+            directions = _KING_DIRECTIONS if self.kings & bit else _WHITE_DIRECTIONS
+        occupied = self.black | self.white
+
+        moves = {}
+        step, jump = _STEP[sq], _JUMP[sq]
+        for d in directions:
+            target = step[d]
+            if target == -1:
+                continue
+            if not occupied >> target & 1:
+                moves[target] = 0
+            elif opponent >> target & 1:
+                land = jump[d]
+                if land != -1 and not occupied >> land & 1:
+                    captured = 1 << target
+                    moves[land] = captured
+                    self._continue_jumps(land, d < 2, captured, opponent, occupied, moves)
+        return moves
+
+    def _continue_jumps(self, sq: int, up: bool, last: int, opponent: int, occupied: int,
+                        moves: dict[int, int]) -> None:
+        """ Helper function for self.get_valid_moves. Adds the jumps that continue from sq in the same vertical
+        direction to moves.
+
+        Like Board._traverse_left and Board._traverse_right, the captures recorded for a continued jump are the piece
+        it jumps over and the piece captured by the jump before it.
+
+        Parameters:
+        - sq: the square the previous jump landed on.
+        - up: whether the jumps are going up the board.
+        - last: the mask of the piece captured by the previous jump.
+        - opponent: the mask of the opponent's pieces.
+        - occupied: the mask of all pieces on the board.
+        - moves: the dictionary of moves to add to.
+        """
+        step, continuation = _STEP[sq], _CONTINUE[sq]
+        for d in (_WHITE_DIRECTIONS if up else _BLACK_DIRECTIONS):
+            target, land = step[d], continuation[d]
+            if land != -1 and opponent >> target & 1 and not occupied >> land & 1:
+                captured = 1 << target
+                moves[land] = captured | last
+                self._continue_jumps(land, up, captured, opponent, occupied, moves)
+
+    def legal_moves(self, colour: int) -> list[tuple[tuple[int, int], tuple[int, int], int]]:
+        """ Returns every valid move for the given colour, scanning pieces in the same order as the rows of a Board.
+
+        Parameters:
+        - colour: the colour of the player to move.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        moves = []
+        pieces = self.black if colour == BLACK else self.white
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            sq = low.bit_length() - 1
+            start = SQUARE_COORDS[sq]
+            for end, captured in self.get_valid_moves(sq).items():
+                moves.append((start, SQUARE_COORDS[end], captured))
+        return moves
+
+    def make_move(self, move: tuple[tuple[int, int], tuple[int, int], int]) -> tuple[int, int, int, int]:
+        """ Plays a move on this bitboard and returns a token that self.unmake_move uses to take it back.
+
+        Parameters:
+        - move: a move returned by self.legal_moves for this position.
+        """
+        undo = (self.black, self.white, self.kings, self.zobrist)
+        (start_row, start_col), (end_row, end_col), captured = move
+        start_sq = square_index(start_row, start_col)
+        end_sq = square_index(end_row, end_col)
+        start, end = 1 << start_sq, 1 << end_sq
+
+        if self.black & start:
+            self.black ^= start | end
+            self.white &= ~captured
+            kind, captured_kind = 0, 2
+        else:
+            self.white ^= start | end
+            self.black &= ~captured
+            kind, captured_kind = 2, 0
+
+        zobrist = self.zobrist
+        if self.kings & start:
+            self.kings ^= start | end
+            zobrist ^= _SQUARE_KEYS[start_sq][kind + 1] ^ _SQUARE_KEYS[end_sq][kind + 1]
+        elif end_row == ROWS - 1 or end_row == 0:
+            self.kings |= end
+            zobrist ^= _SQUARE_KEYS[start_sq][kind] ^ _SQUARE_KEYS[end_sq][kind + 1]
+        else:
+            zobrist ^= _SQUARE_KEYS[start_sq][kind] ^ _SQUARE_KEYS[end_sq][kind]
+
+        while captured:
+            low = captured & -captured
+            captured ^= low
+            zobrist ^= _SQUARE_KEYS[low.bit_length() - 1][captured_kind + (1 if self.kings & low else 0)]
+        self.kings &= ~move[2]
+        self.zobrist = zobrist
+        return undo
+
+    def unmake_move(self, undo: tuple[int, int, int, int]) -> None:
+        """ Takes back the move that returned the given token from self.make_move.
+
+        Parameters:
+        - undo: the token returned by self.make_move.
+        """
+        self.black, self.white, self.kings, self.zobrist = undo
+
+    def has_moves(self, colour: int) -> bool:
+        """ Returns whether the given colour has any valid move.
+
+        Parameters:
+        - colour: the colour of the player to check.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        pieces = self.black if colour == BLACK else self.white
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            if self.get_valid_moves(low.bit_length() - 1):
+                return True
+        return False
+
+    def get_winner(self) -> Optional[int]:
+        """ Determines and returns the colour of the winner of the game if any, following Board.get_winner """
+        if self.white == 0 or not self.has_moves(WHITE):
+            return BLACK
+        elif self.black == 0 or not self.has_moves(BLACK):
+            return WHITE
+        else:
+            return None
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['board', 'position', 'zobrist', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })
@@ -14,8 +14,8 @@ from __future__ import annotations
 from typing import Optional
 from constants import *
 from piece import Piece
-from python_ta.contracts import check_contracts
-import pygame
+from zobrist import piece_key
+import position
 
 
 # @check_contracts
@@ -28,6 +28,14 @@ class Board:
     - black_left : integer representing number of black pieces left
     - white_kings : integer representing number of white king pieces
     - black_kings : integer representing number of black king pieces
+    - zobrist : the Zobrist hash of the pieces on the board, kept up to date as pieces are moved and removed
+
+    Boards are equal when they hold the same pieces on the same squares, and hash by self.zobrist, so a board must not
+    be changed while it is a key of a dict or in a set.
+
+    Private Instance Attributes:
+    - _legal_moves : maps a colour to its list of legal moves on the current board, cleared whenever a piece is moved
+    or removed
 
     Representation Invariants:
     - self.white_left >= 0
@@ -40,6 +48,8 @@ class Board:
     black_left: int
     white_kings: int
     black_kings: int
+    zobrist: int
+    _legal_moves: dict[int, list[tuple[tuple[int, int], tuple[int, int], list[Piece]]]]
 
     def __init__(self) -> None:
         """ Initializes an instance of a new gameboard """
@@ -47,24 +57,118 @@ class Board:
         self.black_left = self.white_left = 12
         self.black_kings = self.white_kings = 0
         self._create_board()
+        self.zobrist = self.compute_zobrist()
+        self._legal_moves = {}
 
     def __copy__(self) -> Board:
         """ Creates and returns a copy of the board """
-        new_board = Board()
+        new_board = Board.__new__(Board)
+        new_board.board = [[0 if piece == 0 else piece.__copy__() for piece in row] for row in self.board]
         new_board.white_left = self.white_left
         new_board.black_left = self.black_left
         new_board.white_kings = self.white_kings
         new_board.black_kings = self.black_kings
-
-        for i in range(0, len(self.board)):
-            for j in range(0, len(self.board[0])):
-                if isinstance(self.board[i][j], Piece):
-                    new_board.board[i][j] = self.board[i][j].__copy__()
-                else:
-                    new_board.board[i][j] = self.board[i][j]
+        new_board.zobrist = self.zobrist
+        new_board._legal_moves = {}
 
         return new_board
 
+    def __eq__(self, other: object) -> bool:
+        """ Returns whether other is a board holding the same pieces on the same squares """
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.zobrist == other.zobrist and self.masks() == other.masks()
+
+    def __hash__(self) -> int:
+        return hash(self.zobrist)
+
+    @classmethod
+    def from_masks(cls, black: int, white: int, kings: int) -> Board:
+        """ Returns a board holding the pieces of the given masks, in which bit n is the n-th playable square counting
+        row by row from the top left, as on a BitBoard.
+
+        Preconditions:
+        - black & white == 0
+        - kings & ~(black | white) == 0
+        """
+        board = cls.__new__(cls)
+        board.board = [[0] * COLS for _ in range(ROWS)]
+        board.black_left = black.bit_count()
+        board.white_left = white.bit_count()
+        board.black_kings = (black & kings).bit_count()
+        board.white_kings = (white & kings).bit_count()
+        occupied = black | white
+        while occupied:
+            bit = occupied & -occupied
+            occupied ^= bit
+            sq = bit.bit_length() - 1
+            row = sq // 4
+            col = 2 * (sq % 4) + (row + 1) % 2
+            piece = Piece(row, col, BLACK if black & bit else WHITE)
+            piece.is_king = bool(kings & bit)
+            board.board[row][col] = piece
+        board.zobrist = board.compute_zobrist()
+        board._legal_moves = {}
+        return board
+
+    def masks(self) -> tuple[int, int, int]:
+        """ Returns the masks of the squares holding black pieces, white pieces and kings, as in Board.from_masks
+
+        >>> Board.from_masks(0b11, 0b1 << 31, 0b10).masks() == (0b11, 0b1 << 31, 0b10)
+        True
+        """
+        black = white = kings = 0
+        for row in self.board:
+            for piece in row:
+                if piece != 0:
+                    bit = 1 << (piece.row * 4 + piece.col // 2)
+                    if piece.colour == BLACK:
+                        black |= bit
+                    else:
+                        white |= bit
+                    if piece.is_king:
+                        kings |= bit
+        return (black, white, kings)
+
+    def to_bytes(self, colour: int = WHITE) -> bytes:
+        """ Returns the 12 byte binary form of the position on the board with colour to move, as in position.encode
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        return position.encode(*self.masks(), colour)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> tuple[Board, int]:
+        """ Returns the board and the colour to move of a position from its binary form. Raises ValueError if data is
+        not the binary form of a position.
+
+        >>> board, colour = Board.from_bytes(Board().to_bytes(BLACK))
+        >>> board == Board(), colour == BLACK
+        (True, True)
+        """
+        black, white, kings, colour = position.decode(data)
+        return (cls.from_masks(black, white, kings), colour)
+
+    def to_fen(self, colour: int = WHITE) -> str:
+        """ Returns the FEN of the position on the board with colour to move, as in position.to_fen
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+
+        >>> Board().to_fen()
+        'W:W21,22,23,24,25,26,27,28,29,30,31,32:B1,2,3,4,5,6,7,8,9,10,11,12'
+        """
+        return position.to_fen(*self.masks(), colour)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> tuple[Board, int]:
+        """ Returns the board and the colour to move of a position from its FEN. Raises ValueError if fen is not a
+        FEN.
+        """
+        black, white, kings, colour = position.from_fen(fen)
+        return (cls.from_masks(black, white, kings), colour)
+
     def _create_board(self) -> None:
         """ Creates the initial state of a gameboard """
         for row in range(ROWS):
@@ -80,35 +184,14 @@ class Board:
                 else:
                     self.board[row].append(0)
 
-    def draw(self, screen: pygame.Surface) -> None:
-        """ Draws the gameboard AND the pieces on the board
-
-        Parameters:
-        - screen: a pygame surface object which will be used to display the gameboard
-
-        Preconditions:
-        - screen is an appropriate pygame surface object
-        """
-        self.draw_squares(screen)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
+    def compute_zobrist(self) -> int:
+        """ Computes and returns the Zobrist hash of the pieces on the board from scratch """
+        zobrist = 0
+        for row in self.board:
+            for piece in row:
                 if piece != 0:
-                    piece.draw(screen)
-
-    def draw_squares(self, screen: pygame.Surface) -> None:
-        """ Draws the squares on the gameboard WITHOUT any pieces
-
-        Parameters:
-        - screen: a pygame surface object which will be used to display the gameboard
-
-        Preconditions:
-        - screen is an appropriate pygame surface object
-        """
-        screen.fill(DARK_BROWN)
-        for row in range(ROWS):
-            for col in range(row % 2, ROWS, 2):
-                pygame.draw.rect(screen, LIGHT_BROWN, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                    zobrist ^= piece_key(piece.row, piece.col, piece.colour, piece.is_king)
+        return zobrist
 
     def move(self, piece: Piece, row: int, col: int) -> None:
         """ Moves a piece of the board to a given row and column.
@@ -121,6 +204,8 @@ class Board:
         Preconditions:
         - any([piece in r for r in self.board])
         """
+        self._legal_moves = {}
+        self.zobrist ^= piece_key(piece.row, piece.col, piece.colour, piece.is_king)
         self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
         piece.move(row, col)
 
@@ -130,6 +215,90 @@ class Board:
                 self.white_kings += 1
             else:
                 self.black_kings += 1
+        self.zobrist ^= piece_key(row, col, piece.colour, piece.is_king)
+
+    def make_move(self, move: tuple[tuple[int, int], tuple[int, int], list[Piece]]) -> tuple:
+        """ Plays a move on the board in place and returns a token that self.unmake_move uses to take it back.
+
+        Parameters:
+        - move: a tuple of the start square, the end square and the pieces captured, as returned by
+        self.legal_moves.
+
+        Preconditions:
+        - move is a valid move on this board.
+
+        Capturing a king leaves the same material as the same capture on a BitBoard:
+        >>> from bitboard import BitBoard
+        >>> from gametree import material_advantage_of
+        >>> board = Board.from_masks(1 << 5, 1 << 9 | 1 << 31, 1 << 9)
+        >>> bitboard = BitBoard.from_board(board)
+        >>> undo = board.make_move(((1, 2), (3, 4), [board.get_piece(2, 3)]))
+        >>> _ = bitboard.make_move(((1, 2), (3, 4), 1 << 9))
+        >>> material_advantage_of(board) == material_advantage_of(bitboard) == 0, board.white_kings
+        (True, 0)
+        >>> board.unmake_move(undo)
+        >>> board == Board.from_masks(1 << 5, 1 << 9 | 1 << 31, 1 << 9), board.white_kings
+        (True, 1)
+        """
+        start, end, captured = move
+        piece = self.board[start[0]][start[1]]
+        undo = (piece, start, captured, piece.is_king, self.black_kings, self.white_kings, self.zobrist,
+                self._legal_moves)
+        self.move(piece, end[0], end[1])
+        self.remove(captured)
+        return undo
+
+    def unmake_move(self, undo: tuple) -> None:
+        """ Takes back the move that returned the given token from self.make_move, restoring the pieces it captured
+        and undoing any promotion.
+
+        Parameters:
+        - undo: the token returned by self.make_move.
+
+        Preconditions:
+        - undo was returned by the last move made on this board that has not been taken back.
+        """
+        piece, start, captured, is_king, self.black_kings, self.white_kings, self.zobrist, self._legal_moves = undo
+        self.board[piece.row][piece.col] = 0
+        self.board[start[0]][start[1]] = piece
+        piece.move(start[0], start[1])
+        piece.is_king = is_king
+
+        for captured_piece in captured:
+            self.board[captured_piece.row][captured_piece.col] = captured_piece
+            if captured_piece.colour == WHITE:
+                self.white_left += 1
+            else:
+                self.black_left += 1
+
+    def legal_moves(self, colour: int) -> list[tuple[tuple[int, int], tuple[int, int], list[Piece]]]:
+        """ Returns every valid move for the given colour as a tuple of the start square, the end square and the
+        pieces captured, scanning the pieces row by row.
+
+        The list is generated once per position and colour and kept until a piece is moved or removed, so it must not
+        be modified.
+
+        Parameters:
+        - colour: the colour of the player to move.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        moves = self._legal_moves.get(colour)
+        if moves is None:
+            moves = []
+            for row in self.board:
+                for piece in row:
+                    if piece != 0 and piece.colour == colour:
+                        start = (piece.row, piece.col)
+                        for end, captured in self.get_valid_moves(piece).items():
+                            moves.append((start, end, captured))
+            self._legal_moves[colour] = moves
+        return moves
+
+    def clear_move_cache(self) -> None:
+        """ Forgets the legal moves generated for the current board, as playing or removing a piece does """
+        self._legal_moves = {}
 
     def get_piece(self, row: int, col: int) -> Piece | int:
         """ Returns the piece at the given row and column
@@ -153,31 +322,42 @@ class Board:
         Preconditions:
         - all the pieces are in self.board.
         """
+        if pieces:
+            self._legal_moves = {}
         for piece in pieces:
             self.board[piece.row][piece.col] = 0
             if piece != 0:
+                self.zobrist ^= piece_key(piece.row, piece.col, piece.colour, piece.is_king)
                 if piece.colour == WHITE:
                     self.white_left -= 1
+                    self.white_kings -= piece.is_king
                 else:
                     self.black_left -= 1
+                    self.black_kings -= piece.is_king
 
-    def get_winner(self) -> Optional[tuple[tuple[int, int, int], list[list[Piece | int]]]]:
-        """ Determines and returns the winner of the game if any """
-        all_black_moves = {}
-        for row in self.board:
-            for piece in row:
-                if isinstance(piece, Piece) and piece.colour == BLACK:
-                    all_black_moves.update(self.get_valid_moves(piece))
+    def has_moves(self, colour: int) -> bool:
+        """ Returns whether the given colour has any valid move, stopping at the first piece that has one.
 
-        all_white_moves = {}
+        Parameters:
+        - colour: the colour of the player to check.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        moves = self._legal_moves.get(colour)
+        if moves is not None:
+            return len(moves) > 0
         for row in self.board:
             for piece in row:
-                if isinstance(piece, Piece) and piece.colour == WHITE:
-                    all_white_moves.update(self.get_valid_moves(piece))
+                if piece != 0 and piece.colour == colour and self.get_valid_moves(piece):
+                    return True
+        return False
 
-        if self.white_left == 0 or len(all_white_moves) == 0:
+    def get_winner(self) -> Optional[tuple[int, list[list[Piece | int]]]]:
+        """ Determines and returns the winner of the game if any """
+        if self.white_left == 0 or not self.has_moves(WHITE):
             return (BLACK, self.board)
-        elif self.black_left == 0 or len(all_black_moves) == 0:
+        elif self.black_left == 0 or not self.has_moves(BLACK):
             return (WHITE, self.board)
         else:
             return None
@@ -211,7 +391,7 @@ class Board:
 
         return moves
 
-    def _traverse_left(self, start: int, stop: int, direction: int, colour: tuple[int, int, int], col,
+    def _traverse_left(self, start: int, stop: int, direction: int, colour: int, col,
                        captured: list = None) -> dict[tuple[int, int], list[Piece]]:
         """ Helper function for self.get_valid_moves. Traverses diagonally left and returns a dictionary
         of valid moves and captured pieces if any
@@ -233,7 +413,7 @@ class Board:
         - start <= ROWS and start >= -1
         - stop <= ROWS and stop >= -1
         - direction in (-1, 1)
-        - colour in ((255, 255, 255), (0, 0, 0))
+        - colour in (BLACK, WHITE)
         - col <= COLS and col >= -1
         - captured is a valid list of pieces or None
         """
@@ -272,7 +452,7 @@ class Board:
 
         return moves
 
-    def _traverse_right(self, start: int, stop: int, direction: int, colour: tuple[int, int, int], col,
+    def _traverse_right(self, start: int, stop: int, direction: int, colour: int, col,
                         captured: list = None) -> dict[tuple[int, int], list[Piece]]:
         """ Helper function for self.get_valid_moves. Traverses diagonally left and returns a dictionary
         of valid moves and captured pieces if any
@@ -294,7 +474,7 @@ class Board:
         - start <= ROWS and start >= -1
         - stop <= ROWS and stop >= -1
         - direction in (-1, 1)
-        - colour in ((255, 255, 255), (0, 0, 0))
+        - colour in (BLACK, WHITE)
         - col <= COLS and col >= -1
         - captured is a valid list of pieces or None
         """
@@ -340,5 +520,7 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'max-line-length': 120
+        'extra-imports': ['piece', 'zobrist', 'position', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
     })
@@ -0,0 +1,281 @@
+""" Checkers opening book
+
+Module Description
+==================
+
+This module contains an opening book: for the positions reached in the first plies of many games, how often each move
+was played from them and how those games ended. Books are built from self-play games, tournament results or PDN games,
+and are stored in a binary hash table file that is memory-mapped, so looking up a position reads only a few records.
+
+Examples, building a book from 200 self-play games that start with 4 random plies, and from a PDN file:
+
+    python book.py --out book.bin --selfplay 200 --engine mode=alphabeta,depth=6 --random-plies 4
+    python book.py --out book.bin --pdn games.pdn --jsonl results.jsonl
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Any, Iterable, Optional
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+import zlib
+from constants import *
+from board import Board
+from bitboard import BitBoard, SQUARE_COORDS, square_index
+from position import POSITION_SIZE
+import pdn
+
+# The number of plies of each game added to a book by default.
+DEFAULT_MAX_PLIES = 20
+
+# A book file starts with a magic number, a version and its number of slots, followed by one record per slot: the key
+# of a position, the start and end square of a move, the number of games the move was played in, the number of them
+# won by the player who made the move, and the number drawn. A slot with no games is empty.
+MAGIC = b'CKBK'
+VERSION = 2
+_HEADER = struct.Struct('<4sB3xI')
+_RECORD = struct.Struct(f'<{POSITION_SIZE}sBBxxIII')
+
+
+def position_key(board: Board | BitBoard, colour: int) -> bytes:
+    """ Returns the key a position is stored under in a book: its binary form from position.encode, so that different
+    positions never share a key.
+
+    Parameters:
+    - board: the position.
+    - colour: the colour of the player to move.
+
+    Preconditions:
+    - colour in (BLACK, WHITE)
+    """
+    return board.to_bytes(colour)
+
+
+def _slot(key: bytes, slots: int) -> int:
+    """ Returns the slot of a book with the given number of slots that a position key hashes to """
+    return zlib.crc32(key) & (slots - 1)
+
+
+def add_game(entries: dict[bytes, dict[tuple[int, int], list[int]]],
+             moves: Iterable[tuple[tuple[int, int], tuple[int, int]]], winner: Optional[int],
+             max_plies: int = DEFAULT_MAX_PLIES) -> None:
+    """ Adds the opening of a game to the statistics of a book being built.
+
+    Parameters:
+    - entries: the statistics of the book, mapping each position key to the games, wins and draws of every move
+    played from it, where a move is its start and end square index.
+    - moves: the start and end square of each move of the game, from the starting position with white to move.
+    - winner: the colour that won the game, or None if it was drawn.
+    - max_plies: the number of plies of the game to add.
+    """
+    board = BitBoard()
+    colour = WHITE
+    for ply, key in enumerate(moves):
+        if ply >= max_plies:
+            break
+        start, end = tuple(key[0]), tuple(key[1])
+        legal = [move for move in board.legal_moves(colour) if (move[0], move[1]) == (start, end)]
+        if not legal:
+            break
+
+        stats = entries.setdefault(position_key(board, colour), {}).setdefault(
+            (square_index(*start), square_index(*end)), [0, 0, 0])
+        stats[0] += 1
+        if winner == colour:
+            stats[1] += 1
+        elif winner is None:
+            stats[2] += 1
+
+        board.make_move(legal[0])
+        colour = BLACK if colour == WHITE else WHITE
+
+
+def add_records(entries: dict[bytes, dict[tuple[int, int], list[int]]], records: Iterable[dict[str, Any]],
+                max_plies: int = DEFAULT_MAX_PLIES) -> None:
+    """ Adds the games recorded by tournament.play_game to the statistics of a book being built """
+    for record in records:
+        winner = WHITE if record['result'] == 'white' else BLACK if record['result'] == 'black' else None
+        add_game(entries, record['moves'], winner, max_plies)
+
+
+def add_pdn(entries: dict[bytes, dict[tuple[int, int], list[int]]], text: str,
+            max_plies: int = DEFAULT_MAX_PLIES) -> int:
+    """ Adds the games of a PDN text that have a result to the statistics of a book being built, and returns the
+    number of those left out because one of their moves is not legal
+    """
+    games, rejected = pdn.legal_games(text)
+    for moves, winner in games:
+        add_game(entries, moves, winner, max_plies)
+    return rejected
+
+
+def write_book(path: str, entries: dict[bytes, dict[tuple[int, int], list[int]]]) -> int:
+    """ Writes a book to a file and returns the number of records in it.
+
+    Records are placed by linear probing in a table with at least twice as many slots as records, so every move of a
+    position is found between the slot its key hashes to and the next empty slot.
+    """
+    records = [(key, start, end, *stats) for key, moves in entries.items() for (start, end), stats in moves.items()]
+    slots = 2
+    while slots < 2 * len(records):
+        slots *= 2
+
+    table: list[Optional[bytes]] = [None] * slots
+    for record in records:
+        index = _slot(record[0], slots)
+        while table[index] is not None:
+            index = (index + 1) & (slots - 1)
+        table[index] = _RECORD.pack(*record)
+
+    empty = _RECORD.pack(b'', 0, 0, 0, 0, 0)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, slots))
+        for packed in table:
+            file.write(empty if packed is None else packed)
+    os.replace(path + '.tmp', path)
+    return len(records)
+
+
+# @check_contracts
+class OpeningBook:
+    """ An opening book file, memory-mapped so that looking up a position reads only the records near its slot.
+
+    Instance Attributes:
+    - path: the path of the book file.
+    - slots: the number of slots in the book, or 0 if the file does not exist.
+    - min_games: the fewest games a move must have been played in for self.best_move to pick it.
+
+    Private Instance Attributes:
+    - _data: the memory map of the file, or None if the file does not exist.
+
+    Representation Invariants:
+    - self.slots == 0 or self.slots & (self.slots - 1) == 0
+    - self.min_games >= 1
+    """
+    path: str
+    slots: int
+    min_games: int
+    _data: Optional[mmap.mmap]
+
+    def __init__(self, path: str, min_games: int = 2) -> None:
+        """ Opens a book file, or an empty book if the file does not exist """
+        self.path = path
+        self.min_games = min_games
+        self.slots = 0
+        self._data = None
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.slots = _HEADER.unpack_from(self._data)
+            if magic != MAGIC or version != VERSION:
+                self.close()
+                raise ValueError(f'{path} is not an opening book file of version {VERSION}, so it must be rebuilt')
+
+    def lookup(self, board: Board | BitBoard,
+               colour: int) -> list[tuple[tuple[tuple[int, int], tuple[int, int]], int, int, int]]:
+        """ Returns the moves a book holds for a position.
+
+        Parameters:
+        - board: the position to look up.
+        - colour: the colour of the player to move.
+
+        Returns:
+        - A list holding, for each move, its start and end square, the number of games it was played in, the number
+        of them won by colour and the number drawn.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        if self._data is None:
+            return []
+        key = position_key(board, colour)
+        index = _slot(key, self.slots)
+        moves = []
+        while True:
+            record_key, start, end, games, wins, draws = _RECORD.unpack_from(
+                self._data, _HEADER.size + index * _RECORD.size)
+            if games == 0:
+                return moves
+            if record_key == key:
+                moves.append(((SQUARE_COORDS[start], SQUARE_COORDS[end]), games, wins, draws))
+            index = (index + 1) & (self.slots - 1)
+
+    def best_move(self, board: Board | BitBoard,
+                  colour: int) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """ Returns the book move with the best score for colour, counting a draw as half a win, among the moves played
+        in at least self.min_games games, or None if the position has no such move.
+
+        Parameters:
+        - board: the position to find a move in.
+        - colour: the colour of the player to move.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        legal = {(move[0], move[1]) for move in board.legal_moves(colour)}
+        best, best_score = None, None
+        for move, games, wins, draws in self.lookup(board, colour):
+            if games >= self.min_games and move in legal:
+                score = ((wins + draws / 2) / games, games)
+                if best_score is None or score > best_score:
+                    best, best_score = move, score
+        return best
+
+    def close(self) -> None:
+        """ Closes the book file """
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+
+def _self_play(engine: dict[str, Any], games: int, workers: Optional[int], random_plies: int) -> list[dict[str, Any]]:
+    """ Plays games between two copies of an AI configuration and returns their records """
+    import tournament
+
+    output = io.StringIO()
+    tournament.run_tournament(engine, engine, games, workers, output, random_plies=random_plies)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Builds an opening book from the command line """
+    import tournament
+
+    parser = argparse.ArgumentParser(description='Build a checkers opening book.')
+    parser.add_argument('--out', default='book.bin', help='the book file to write')
+    parser.add_argument('--jsonl', action='append', default=[], help='a JSON lines file written by tournament.py')
+    parser.add_argument('--pdn', action='append', default=[], help='a PDN file of games')
+    parser.add_argument('--selfplay', type=int, default=0, help='the number of self-play games to play')
+    parser.add_argument('--engine', type=tournament.parse_engine, default=tournament.parse_engine(''),
+                        help='the engine configuration for self-play, as in tournament.py')
+    parser.add_argument('--random-plies', type=int, default=4,
+                        help='the number of random plies each self-play game starts with')
+    parser.add_argument('--workers', type=int, default=None, help='the number of self-play processes')
+    parser.add_argument('--plies', type=int, default=DEFAULT_MAX_PLIES, help='the number of plies of each game to add')
+    args = parser.parse_args(argv)
+
+    entries = {}
+    for path in args.jsonl:
+        with open(path) as file:
+            add_records(entries, (json.loads(line) for line in file if line.strip()), args.plies)
+    for path in args.pdn:
+        with open(path) as file:
+            rejected = add_pdn(entries, file.read(), args.plies)
+        if rejected:
+            print(f'{path}: skipped {rejected} game(s) with a move that is not legal')
+    if args.selfplay:
+        add_records(entries, _self_play(args.engine, args.selfplay, args.workers, args.random_plies), args.plies)
+
+    records = write_book(args.out, entries)
+    print(f'{args.out}: {len(entries)} positions, {records} moves')
+
+
+if __name__ == '__main__':
+    main()
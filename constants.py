@@ -4,23 +4,27 @@ Module Description
 ==================
 
 This module contains a collection of constants that will be used throughout the implementation of the checkers game.
+It only uses the standard library, so the rules and the AI can be loaded without pygame.
 
 Copyright and Usage Information
 ===============================
 
 This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
 """
-import pygame
-
 WIDTH, HEIGHT = 800, 800
 ROWS, COLS = 8, 8
 SQUARE_SIZE = WIDTH//COLS
 
+# The colours of the players. They are small non-zero ints rather than RGB values, so that pieces stay small and a
+# colour is never mistaken for an empty square, which is 0 on a Board. The renderer maps them to RGB values.
+BLACK, WHITE = 1, 2
+COLOUR_NAMES = {BLACK: 'black', WHITE: 'white'}
+
 # RGB values
 RED = (255, 0, 0)
 LIGHT_RED = (200, 75, 75)
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
+WHITE_RGB = (255, 255, 255)
+BLACK_RGB = (0, 0, 0)
 GREY = (128, 128, 128)
 DARK_GREY = (105, 105, 105)
 BLUE = (0, 0, 255)
@@ -28,6 +32,3 @@ DARK_BROWN = (116, 52, 16)
 DARK_BROWN2 = (74, 55, 43)
 LIGHT_BROWN = (236, 205, 165)
 LIGHT_BROWN2 = (213, 202, 191)
-
-
-CROWN = pygame.transform.scale(pygame.image.load('crown.png'), (50, 45))
@@ -0,0 +1,281 @@
+""" Checkers game record corpus
+
+Module Description
+==================
+
+This module contains a binary file format for large collections of games, with a writer that appends each game as it
+ends and a reader that memory-maps the file as a NumPy array, so that millions of positions can be read in batches
+without copying or parsing them.
+
+A corpus file starts with a magic number and a version, followed by one fixed-size record per move played: the
+position before the move in the 12 byte form of position.encode, the start and end square index of the move, the
+result of the game for black, flags about the position, the search score of the move from black's point of view (NaN
+if the move was not searched), the number of the game in the file and the ply of the move in its game. The records of
+a game are consecutive and in the order the moves were played.
+
+Games can be added from the records written by tournament.py and from PDN files, and exported to PDN.
+
+Examples, building a corpus and exporting its games to PDN:
+
+    python corpus.py games.corpus --jsonl results.jsonl --pdn games.pdn
+    python corpus.py games.corpus --export-pdn all_games.pdn
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Any, Iterable, Iterator, Optional
+import argparse
+import json
+import math
+import os
+import struct
+import numpy as np
+import pdn
+from bitboard import BitBoard, SQUARE_COORDS, square_index
+from position import POSITION_SIZE
+from constants import *
+
+MAGIC = b'CKGC'
+VERSION = 1
+_HEADER = struct.Struct('<4sB3x')
+
+# The layout of a record, as a struct for writing and as a NumPy dtype for reading. The black, white and kings fields
+# are the three words of the position's binary form, so the kings field also holds the colour to move.
+_RECORD = struct.Struct(f'<{POSITION_SIZE}sBBbBfII')
+RECORD_DTYPE = np.dtype([('black', '<u4'), ('white', '<u4'), ('kings', '<u4'), ('start', 'u1'), ('end', 'u1'),
+                         ('result', 'i1'), ('flags', 'u1'), ('score', '<f4'), ('game', '<u4'), ('ply', '<u4')])
+
+# The flag of a record whose player to move has no capture.
+QUIET = 1
+
+# The result of a game for black, keyed by the winner.
+_RESULTS = {BLACK: 1, WHITE: -1, None: 0}
+
+# The number of records each batch of CorpusReader.batches holds by default.
+DEFAULT_BATCH_SIZE = 1 << 16
+
+
+def masks(records: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the black, white and king masks of the positions of an array of records, and the colour to move of
+    each, as arrays.
+
+    >>> records = np.zeros(1, dtype=RECORD_DTYPE)
+    >>> records['black'], records['white'], records['kings'] = 0b1, 0b10, 0b1 | 0b100
+    >>> [int(array[0]) for array in masks(records)] == [0b1, 0b10, 0b1, BLACK]
+    True
+    """
+    black, white, kings = records['black'], records['white'], records['kings']
+    occupied = black | white
+    colours = np.where(kings & ~occupied, BLACK, WHITE)
+    return (black, white, kings & occupied, colours)
+
+
+# @check_contracts
+class CorpusWriter:
+    """ Appends games to a corpus file, one game at a time.
+
+    Instance Attributes:
+    - path: the path of the corpus file.
+    - games: the number of games in the file, including those it held before it was opened.
+
+    Private Instance Attributes:
+    - _file: the file the records are appended to, or None once closed.
+
+    Representation Invariants:
+    - self.games >= 0
+    """
+    path: str
+    games: int
+    _file: Optional[Any]
+
+    def __init__(self, path: str) -> None:
+        """ Opens a corpus file to append games to, creating it if it does not exist. Raises ValueError if the file
+        exists and is not a corpus file.
+        """
+        self.path = path
+        self.games = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as file:
+                _check_header(path, file.read(_HEADER.size))
+                size = os.path.getsize(path) - _HEADER.size
+                if size >= _RECORD.size:
+                    file.seek(_HEADER.size + (size // _RECORD.size - 1) * _RECORD.size)
+                    self.games = _RECORD.unpack(file.read(_RECORD.size))[-2] + 1
+            self._file = open(path, 'r+b')
+            self._file.truncate(_HEADER.size + size // _RECORD.size * _RECORD.size)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+
+    def __enter__(self) -> CorpusWriter:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def write_game(self, moves: Iterable[tuple[tuple[int, int], tuple[int, int]]], winner: Optional[int],
+                   scores: Optional[list[Optional[float]]] = None) -> int:
+        """ Appends a game and returns the number of records written, stopping at its first move that is not legal.
+
+        Parameters:
+        - moves: the start and end square of each move of the game, from the starting position with white to move.
+        - winner: the colour that won the game, or None if it was drawn.
+        - scores: the search score of each move from black's point of view, or None for a move that was not searched.
+
+        Preconditions:
+        - self._file is not None
+        """
+        board = BitBoard()
+        colour = WHITE
+        result = _RESULTS[winner]
+        records = []
+        for ply, key in enumerate(moves):
+            start, end = tuple(key[0]), tuple(key[1])
+            legal_moves = board.legal_moves(colour)
+            legal = [move for move in legal_moves if (move[0], move[1]) == (start, end)]
+            if not legal:
+                break
+            flags = 0 if any(move[2] for move in legal_moves) else QUIET
+            score = scores[ply] if scores is not None and ply < len(scores) and scores[ply] is not None else math.nan
+            records.append(_RECORD.pack(board.to_bytes(colour), square_index(*start), square_index(*end), result,
+                                        flags, score, self.games, ply))
+            board.make_move(legal[0])
+            colour = BLACK if colour == WHITE else WHITE
+
+        self._file.write(b''.join(records))
+        self.games += 1
+        return len(records)
+
+    def add_records(self, records: Iterable[dict[str, Any]]) -> None:
+        """ Appends the games recorded by tournament.play_game """
+        for record in records:
+            winner = WHITE if record['result'] == 'white' else BLACK if record['result'] == 'black' else None
+            self.write_game(record['moves'], winner, record.get('scores'))
+
+    def add_pdn(self, text: str) -> int:
+        """ Appends the games of a PDN text that have a known result, and returns the number of those left out
+        because one of their moves is not legal
+        """
+        games, rejected = pdn.legal_games(text)
+        for moves, winner in games:
+            self.write_game(moves, winner)
+        return rejected
+
+    def flush(self) -> None:
+        """ Writes the games appended so far to the file """
+        self._file.flush()
+
+    def close(self) -> None:
+        """ Closes the corpus file """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# @check_contracts
+class CorpusReader:
+    """ A corpus file memory-mapped as a read-only NumPy array of records.
+
+    Instance Attributes:
+    - path: the path of the corpus file.
+    - records: the records of the file, with the fields of RECORD_DTYPE. Slices of it are views of the file.
+    """
+    path: str
+    records: np.ndarray
+
+    def __init__(self, path: str) -> None:
+        """ Opens a corpus file. Raises ValueError if it is not a corpus file """
+        self.path = path
+        with open(path, 'rb') as file:
+            _check_header(path, file.read(_HEADER.size))
+        count = (os.path.getsize(path) - _HEADER.size) // RECORD_DTYPE.itemsize
+        if count == 0:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=_HEADER.size, shape=(count,))
+
+    def __len__(self) -> int:
+        """ Returns the number of records in the corpus """
+        return len(self.records)
+
+    def batches(self, size: int = DEFAULT_BATCH_SIZE) -> Iterator[np.ndarray]:
+        """ Yields the records in consecutive batches of at most size records, each a view of the file.
+
+        Preconditions:
+        - size >= 1
+        """
+        for start in range(0, len(self.records), size):
+            yield self.records[start:start + size]
+
+    def position(self, index: int) -> tuple[BitBoard, int]:
+        """ Returns the position of a record as a bitboard and the colour to move
+
+        Preconditions:
+        - 0 <= index < len(self)
+        """
+        return BitBoard.from_bytes(self.records[index:index + 1].tobytes()[:POSITION_SIZE])
+
+    def games(self) -> Iterator[tuple[list[tuple[tuple[int, int], tuple[int, int]]], Optional[int]]]:
+        """ Yields the moves of each game in the corpus, as their start and end squares, and the colour that won it,
+        or None if it was drawn. Games with no records are skipped.
+        """
+        games = self.records['game']
+        bounds = np.concatenate(([0], np.flatnonzero(games[1:] != games[:-1]) + 1, [len(games)]))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if start == stop:
+                continue
+            records = self.records[start:stop]
+            starts, ends = records['start'].tolist(), records['end'].tolist()
+            moves = [(SQUARE_COORDS[begin], SQUARE_COORDS[end]) for begin, end in zip(starts, ends)]
+            result = int(records['result'][0])
+            yield (moves, BLACK if result > 0 else WHITE if result < 0 else None)
+
+    def export_pdn(self, path: str) -> int:
+        """ Writes every game in the corpus to a PDN file and returns the number of games written """
+        count = 0
+        with open(path, 'w') as file:
+            for moves, winner in self.games():
+                count += 1
+                file.write(pdn.format_game(moves, winner, {'Event': f'{os.path.basename(self.path)} game {count}'}))
+                file.write('\n')
+        return count
+
+
+def _check_header(path: str, header: bytes) -> None:
+    """ Raises ValueError if header is not the header of a corpus file of this version """
+    if len(header) != _HEADER.size or _HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError(f'{path} is not a corpus file of version {VERSION}')
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Adds games to a corpus, or exports it to PDN, from the command line """
+    parser = argparse.ArgumentParser(description='Build a binary corpus of checkers games, or export it to PDN.')
+    parser.add_argument('corpus', help='the corpus file')
+    parser.add_argument('--jsonl', action='append', default=[], help='a JSON lines file written by tournament.py')
+    parser.add_argument('--pdn', action='append', default=[], help='a PDN file of games to add')
+    parser.add_argument('--export-pdn', default=None, help='a PDN file to write every game of the corpus to')
+    args = parser.parse_args(argv)
+
+    if args.jsonl or args.pdn or not os.path.exists(args.corpus):
+        with CorpusWriter(args.corpus) as writer:
+            for path in args.jsonl:
+                with open(path) as file:
+                    writer.add_records(json.loads(line) for line in file if line.strip())
+            for path in args.pdn:
+                with open(path) as file:
+                    rejected = writer.add_pdn(file.read())
+                if rejected:
+                    print(f'{path}: skipped {rejected} game(s) with a move that is not legal')
+
+    reader = CorpusReader(args.corpus)
+    print(f'{args.corpus}: {len(reader)} positions')
+    if args.export_pdn is not None:
+        print(f'wrote {reader.export_pdn(args.export_pdn)} games to {args.export_pdn}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+""" Checkers background AI
+
+Module Description
+==================
+
+This module contains a wrapper that runs an AI's moves in a background thread, so that the game loop can keep drawing
+the board and handling events while the AI thinks, and can stop the AI when the window is closed. The wrapper can also
+let the AI ponder in the background during the opponent's turn, which is stopped as soon as the opponent moves.
+
+The wrapper can call back when a move is ready, such as to post an event that wakes a game loop blocked waiting for
+events, so the game loop does not have to poll while the AI thinks.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Callable, Optional
+import threading
+from board import Board
+from bitboard import BitBoard
+from ai import AI
+from parallel import ParallelSearch
+from search import SearchTimeout
+
+
+# @check_contracts
+class BackgroundAI:
+    """ Runs the moves of an AI in a background thread.
+
+    Instance Attributes:
+    - ai: the AI whose moves are run. Nothing else may use it while self.is_thinking() or self.is_pondering() is
+    True.
+    - on_move: a function called from the background thread once a move's result is ready to be collected by
+    self.poll, or None to call nothing.
+
+    Private Instance Attributes:
+    - _thread: the thread running the current move or pondering, or None if neither has been started since the last
+    result was collected or pondering was stopped.
+    - _stop_event: the event that stops the search of the current move or pondering.
+    - _pondering: whether self._thread is pondering rather than running a move.
+    - _finished: whether self._thread has finished running the current move, even if it is still calling
+    self.on_move.
+    - _result: the move found by the thread, or None if it has not found one yet.
+    - _error: the exception the thread raised, or None if it did not raise one.
+    """
+    ai: AI
+    on_move: Optional[Callable[[], None]]
+    _thread: Optional[threading.Thread]
+    _stop_event: threading.Event
+    _pondering: bool
+    _finished: bool
+    _result: Optional[tuple[tuple[int, int], tuple[int, int]]]
+    _error: Optional[BaseException]
+
+    def __init__(self, ai: AI, on_move: Optional[Callable[[], None]] = None) -> None:
+        """ Initializes a wrapper that is not thinking """
+        self.ai = ai
+        self.on_move = on_move
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._pondering = False
+        self._finished = False
+        self._result = None
+        self._error = None
+
+    def start(self, move: tuple[tuple[int, int], tuple[int, int]] | str, board: Board | BitBoard,
+              time_budget_ms: Optional[int] = None) -> None:
+        """ Starts updating the AI with the opponent's move and choosing its reply in the background, after stopping
+        any pondering.
+
+        Parameters:
+        - move: the move the opponent just made.
+        - board: the board after that move, which the caller must not change while the AI thinks.
+        - time_budget_ms: the number of milliseconds the AI may take, or None for its default.
+
+        Preconditions:
+        - not self.is_thinking()
+        """
+        self._stop_pondering()
+        self._stop_event = threading.Event()
+        self.ai.search.stop_event = self._stop_event
+        self._finished = False
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._think, args=(move, board, time_budget_ms), daemon=True)
+        self._thread.start()
+
+    def _think(self, move: tuple[tuple[int, int], tuple[int, int]] | str, board: Board | BitBoard,
+               time_budget_ms: Optional[int]) -> None:
+        """ Runs in the background thread: updates the AI, stores the move it chooses and calls self.on_move """
+        try:
+            self.ai.update_game_tree(move, board)
+            self._result = self.ai.make_move(time_budget_ms)
+        except SearchTimeout:
+            self._result = None
+        except BaseException as error:
+            self._error = error
+        self._finished = True
+        if self.on_move is not None:
+            self.on_move()
+
+    def ponder(self, board: Board | BitBoard, all_replies: bool = False, time_budget_ms: Optional[int] = None) -> None:
+        """ Starts pondering on a copy of the board in the background during the opponent's turn, until the next call
+        to self.start or self.cancel, or until the time budget runs out.
+
+        Parameters:
+        - board: the board during the opponent's turn.
+        - all_replies: whether to search every opponent move instead of only the predicted one.
+        - time_budget_ms: the number of milliseconds the AI may ponder for, or None for no limit.
+
+        Preconditions:
+        - not self.is_thinking()
+        """
+        self._stop_pondering()
+        self._stop_event = threading.Event()
+        self._pondering = True
+        self._error = None
+        args = (board.__copy__(), self._stop_event, all_replies, time_budget_ms)
+        self._thread = threading.Thread(target=self._ponder, args=args, daemon=True)
+        self._thread.start()
+
+    def _ponder(self, board: Board | BitBoard, stop_event: threading.Event, all_replies: bool,
+                time_budget_ms: Optional[int]) -> None:
+        """ Runs in the background thread: ponders until stop_event is set or the time budget runs out """
+        try:
+            self.ai.ponder(board, stop_event, all_replies, time_budget_ms)
+        except BaseException as error:
+            self._error = error
+
+    def _stop_pondering(self) -> None:
+        """ Stops pondering, if the AI is, and waits for it to finish. Re-raises any exception the AI raised while
+        pondering.
+        """
+        if not self._pondering:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._pondering = False
+        if self._error is not None:
+            raise self._error
+
+    def is_thinking(self) -> bool:
+        """ Returns whether a move has been started and its result not yet collected by self.poll """
+        return self._thread is not None and not self._pondering
+
+    def is_pondering(self) -> bool:
+        """ Returns whether pondering has been started and not yet stopped, even if it has finished on its own """
+        return self._pondering
+
+    def poll(self) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """ Returns the move the AI chose if it has finished thinking, or None if it is still thinking or is not
+        thinking at all. Re-raises any exception the AI raised while thinking.
+        """
+        if self._thread is None or self._pondering or not self._finished:
+            return None
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def cancel(self, timeout: float = 1.0) -> None:
+        """ Stops the AI's search or pondering and waits up to timeout seconds for its thread to finish.
+
+        A search that does not check for the stop, such as building a game tree, is left to finish on its own, but
+        its thread does not keep the program running.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._pondering = False
+        if isinstance(self.ai.search, ParallelSearch):
+            self.ai.search.shutdown()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['threading', 'board', 'bitboard', 'ai', 'parallel', 'search'],
+        'max-line-length': 120,
+        'disable': ['broad-exception-caught']
+    })
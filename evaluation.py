@@ -0,0 +1,375 @@
+""" Checkers evaluation functions
+
+Module Description
+==================
+
+This module contains the evaluators the AI can score positions with. Every evaluator scores a position from black's
+point of view, in units of one man, so a MaterialEvaluator gives the same scores as gametree.material_advantage_of.
+
+The PositionalEvaluator adds weighted positional terms to the material count:
+- a piece-square table, rewarding men for advancing and any piece for holding the centre;
+- a back rank guard, rewarding men left on their own back row to stop the opponent crowning;
+- mobility, the number of plain moves each side has;
+- runaway men, which no opponent piece can stop from reaching the far row.
+
+Positions are scored one at a time from the masks of a BitBoard, using tables built once for the weights. Many
+positions can also be scored in a single call with NumPy, which is only imported when a batch is large enough to need
+it.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+import json
+import os
+from board import Board
+from bitboard import BitBoard, SQUARES, SQUARE_COORDS, FULL_MASK, square_index
+from constants import *
+
+# The weights of the PositionalEvaluator's terms, each in units of one man.
+DEFAULT_WEIGHTS = {
+    'man': 1.0,
+    'king': 3.0,
+    'advance': 0.04,
+    'centre': 0.05,
+    'back_rank': 0.1,
+    'mobility': 0.02,
+    'runaway': 0.5
+}
+
+# The terms of the PositionalEvaluator, in the order of the columns of feature_matrix.
+FEATURES = tuple(DEFAULT_WEIGHTS)
+
+# The smallest number of positions PositionalEvaluator.evaluate_many scores with NumPy instead of one at a time.
+MIN_BATCH_SIZE = 64
+
+# The squares counted as the centre of the board.
+CENTRE_MASK = sum(1 << sq for sq, (row, col) in enumerate(SQUARE_COORDS) if 2 <= row <= 5 and 2 <= col <= 5)
+
+# The back rows of black and white, where their men start and the opponent's men are crowned.
+BLACK_BACK_RANK = sum(1 << sq for sq, (row, _) in enumerate(SQUARE_COORDS) if row == 0)
+WHITE_BACK_RANK = sum(1 << sq for sq, (row, _) in enumerate(SQUARE_COORDS) if row == ROWS - 1)
+
+
+def _shift_masks(row_step: int) -> dict[int, int]:
+    """ Returns, for each shift of a square's index that moves a piece one row in the direction of row_step, the mask
+    of the squares that shift keeps on the board.
+
+    >>> {shift: hex(mask) for shift, mask in sorted(_shift_masks(1).items())}
+    {3: '0xe0e0e0', 4: '0xfffffff', 5: '0x7070707'}
+    """
+    masks = {}
+    for sq, (row, col) in enumerate(SQUARE_COORDS):
+        for col_step in (-1, 1):
+            if 0 <= row + row_step < ROWS and 0 <= col + col_step < COLS:
+                shift = square_index(row + row_step, col + col_step) - sq
+                masks[shift] = masks.get(shift, 0) | 1 << sq
+    return masks
+
+
+def _cones(row_step: int) -> list[int]:
+    """ Returns, for each square, the mask of the squares a man on it could reach moving in the direction of
+    row_step, which an opponent piece has to be in to stop the man being crowned.
+
+    >>> hex(_cones(1)[20])
+    '0x31000000'
+    """
+    cones = []
+    for row, col in SQUARE_COORDS:
+        cones.append(sum(1 << sq for sq, (other_row, other_col) in enumerate(SQUARE_COORDS)
+                         if 0 < (other_row - row) * row_step and abs(other_col - col) <= abs(other_row - row)))
+    return cones
+
+
+_DOWN_SHIFTS = _shift_masks(1)
+_UP_SHIFTS = _shift_masks(-1)
+_BLACK_CONES = _cones(1)
+_WHITE_CONES = _cones(-1)
+
+# The men that are checked for being runaways: those in the opponent's half of the board.
+_BLACK_RUNAWAY_MASK = sum(1 << sq for sq, (row, _) in enumerate(SQUARE_COORDS) if ROWS // 2 <= row < ROWS - 1)
+_WHITE_RUNAWAY_MASK = sum(1 << sq for sq, (row, _) in enumerate(SQUARE_COORDS) if 0 < row < ROWS // 2)
+
+# The squares of each row.
+_ROW_MASKS = [sum(1 << sq for sq, (row, _) in enumerate(SQUARE_COORDS) if row == r) for r in range(ROWS)]
+
+
+def mobility(movers: int, shifts: dict[int, int], empty: int) -> int:
+    """ Returns the number of plain moves the pieces in movers can make in one vertical direction.
+
+    Parameters:
+    - movers: the mask of the pieces that may move in the direction.
+    - shifts: the shift masks of the direction, from _shift_masks.
+    - empty: the mask of the empty squares.
+
+    >>> mobility(BitBoard().black, _DOWN_SHIFTS, FULL_MASK ^ (BitBoard().black | BitBoard().white))
+    7
+    """
+    count = 0
+    for shift, mask in shifts.items():
+        if shift > 0:
+            count += ((movers & mask) << shift & empty).bit_count()
+        else:
+            count += ((movers & mask) >> -shift & empty).bit_count()
+    return count
+
+
+def feature_matrix(black: Any, white: Any, kings: Any) -> Any:
+    """ Returns a NumPy matrix with a row for each of many positions, given as sequences or arrays of their masks,
+    holding the value of each term in FEATURES for black minus its value for white. A PositionalEvaluator's score of
+    a position is the dot product of its row with the evaluator's weights, so the weights can be fitted to the rows.
+
+    Parameters:
+    - black: the black mask of each position.
+    - white: the white mask of each position.
+    - kings: the king mask of each position.
+
+    Preconditions:
+    - len(black) == len(white) == len(kings)
+
+    >>> feature_matrix([BitBoard().black], [BitBoard().white], [0]).tolist()
+    [[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]
+    """
+    import numpy as np  # only needed to score positions in batches
+
+    black, white, kings = (np.asarray(masks, dtype=np.uint64) for masks in (black, white, kings))
+    black_men, white_men = black & ~kings & FULL_MASK, white & ~kings & FULL_MASK
+    empty = ~(black | white) & FULL_MASK
+
+    def popcount(masks: Any) -> Any:
+        """ Returns the number of bits set in each mask """
+        return np.bitwise_count(masks).astype(np.int64)
+
+    def count_moves(movers: Any, shifts: dict[int, int]) -> Any:
+        """ Returns the number of plain moves of each position's movers in one vertical direction """
+        count = np.zeros(len(movers), dtype=np.int64)
+        for shift, mask in shifts.items():
+            moved = movers & mask
+            moved = moved << shift if shift > 0 else moved >> -shift
+            count += popcount(moved & empty)
+        return count
+
+    def count_runaways(men: Any, opponent: Any, runaway_mask: int, cones: list[int]) -> Any:
+        """ Returns the number of each position's men that no opponent piece can stop """
+        count = np.zeros(len(men), dtype=np.int64)
+        for sq in range(SQUARES):
+            if runaway_mask >> sq & 1:
+                count += (men >> sq & 1).astype(np.int64) * (opponent & cones[sq] == 0)
+        return count
+
+    advance = np.zeros(len(black), dtype=np.int64)
+    for row in range(ROWS):
+        advance += row * popcount(black_men & _ROW_MASKS[row]) \
+            - (ROWS - 1 - row) * popcount(white_men & _ROW_MASKS[row])
+
+    columns = {
+        'man': popcount(black_men) - popcount(white_men),
+        'king': popcount(black & kings) - popcount(white & kings),
+        'advance': advance,
+        'centre': popcount(black & CENTRE_MASK) - popcount(white & CENTRE_MASK),
+        'back_rank': popcount(black_men & BLACK_BACK_RANK) - popcount(white_men & WHITE_BACK_RANK),
+        'mobility': count_moves(black, _DOWN_SHIFTS) + count_moves(black & kings, _UP_SHIFTS)
+        - count_moves(white, _UP_SHIFTS) - count_moves(white & kings, _DOWN_SHIFTS),
+        'runaway': count_runaways(black_men, white, _BLACK_RUNAWAY_MASK, _BLACK_CONES)
+        - count_runaways(white_men, black, _WHITE_RUNAWAY_MASK, _WHITE_CONES)
+    }
+    return np.stack([columns[name] for name in FEATURES], axis=1).astype(np.float64)
+
+
+# @check_contracts
+class Evaluator(ABC):
+    """ An abstract evaluator of checkers positions.
+
+    Scores are given from black's point of view, in units of one man. A subclass that does not override evaluate
+    cannot be created:
+
+    >>> class Unfinished(Evaluator):
+    ...     pass
+    >>> Unfinished()
+    Traceback (most recent call last):
+    ...
+    TypeError: Can't instantiate abstract class Unfinished with abstract method evaluate
+    """
+
+    @abstractmethod
+    def evaluate(self, board: Board | BitBoard) -> float:
+        """ Returns the score of the position on board """
+
+    def evaluate_many(self, boards: list[Board | BitBoard]) -> list[float]:
+        """ Returns the scores of the positions on boards, in the same order """
+        return [self.evaluate(board) for board in boards]
+
+
+# @check_contracts
+class MaterialEvaluator(Evaluator):
+    """ An evaluator that counts material only, counting a king as three men
+
+    >>> MaterialEvaluator().evaluate(BitBoard(0b111, 0b1 << 31, 0b1))
+    4
+    """
+
+    def evaluate(self, board: Board | BitBoard) -> float:
+        """ Returns black's material advantage on board """
+        return board.black_left + 2 * board.black_kings - board.white_left - 2 * board.white_kings
+
+
+# @check_contracts
+class PositionalEvaluator(Evaluator):
+    """ An evaluator that adds weighted positional terms to the material count.
+
+    Instance Attributes:
+    - weights: the weight of each term, with the same keys as DEFAULT_WEIGHTS.
+
+    Private Instance Attributes:
+    - _square_weights: the score of a black man, black king, white man and white king on each square, combining
+    material, the piece-square table and the back rank guard.
+    - _byte_tables: the sums of self._square_weights for every value of each byte of a mask, so the square scores of
+    every piece of a kind are added up with four lookups.
+
+    Representation Invariants:
+    - set(self.weights) == set(DEFAULT_WEIGHTS)
+    - len(self._square_weights) == 4
+    """
+    weights: dict[str, float]
+    _square_weights: list[list[float]]
+    _byte_tables: list[list[list[float]]]
+
+    def __init__(self, weights: Optional[dict[str, float]] = None) -> None:
+        """ Initializes an evaluator with the given weights, taking any weight left out from DEFAULT_WEIGHTS """
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        if set(self.weights) != set(DEFAULT_WEIGHTS):
+            raise ValueError(f'unknown weights {sorted(set(self.weights) - set(DEFAULT_WEIGHTS))}')
+
+        self._square_weights = [[], [], [], []]
+        for sq, (row, _) in enumerate(SQUARE_COORDS):
+            bit = 1 << sq
+            centre = self.weights['centre'] if CENTRE_MASK & bit else 0.0
+            self._square_weights[0].append(self.weights['man'] + self.weights['advance'] * row + centre
+                                           + (self.weights['back_rank'] if BLACK_BACK_RANK & bit else 0.0))
+            self._square_weights[1].append(self.weights['king'] + centre)
+            self._square_weights[2].append(-self.weights['man'] - self.weights['advance'] * (ROWS - 1 - row) - centre
+                                           - (self.weights['back_rank'] if WHITE_BACK_RANK & bit else 0.0))
+            self._square_weights[3].append(-self.weights['king'] - centre)
+        self._byte_tables = [[[sum(squares[byte * 8 + i] for i in range(8) if value >> i & 1) for value in range(256)]
+                              for byte in range(SQUARES // 8)] for squares in self._square_weights]
+
+    @classmethod
+    def from_file(cls, path: str) -> PositionalEvaluator:
+        """ Returns an evaluator with the weights in a JSON file written by tuning.py, or with the default weights if
+        there is no file at path.
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as file:
+            return cls(json.load(file)['weights'])
+
+    def __getstate__(self) -> dict[str, Any]:
+        """ Returns the state to pickle, leaving out the tables that can be rebuilt from the weights """
+        return {'weights': self.weights}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """ Restores a pickled evaluator by rebuilding its tables """
+        self.__init__(state['weights'])
+
+    def evaluate(self, board: Board | BitBoard) -> float:
+        """ Returns the score of the position on board
+
+        >>> evaluator = PositionalEvaluator()
+        >>> round(evaluator.evaluate(BitBoard()), 9)
+        0.0
+        >>> board = BitBoard(1 << 24, 1 << 16)  # a black man on row 6 that no white piece can stop
+        >>> round(evaluator.evaluate(board) - PositionalEvaluator({'runaway': 0.0}).evaluate(board), 9)
+        0.5
+        """
+        black, white, kings = board.masks()
+        weights = self.weights
+        tables = self._byte_tables
+        score = 0.0
+        for table, mask in zip(tables, (black & ~kings, black & kings, white & ~kings, white & kings)):
+            if mask:
+                score += table[0][mask & 255] + table[1][mask >> 8 & 255] + table[2][mask >> 16 & 255] \
+                    + table[3][mask >> 24]
+
+        empty = FULL_MASK ^ (black | white)
+        black_mobility = mobility(black, _DOWN_SHIFTS, empty) + mobility(black & kings, _UP_SHIFTS, empty)
+        white_mobility = mobility(white, _UP_SHIFTS, empty) + mobility(white & kings, _DOWN_SHIFTS, empty)
+        score += weights['mobility'] * (black_mobility - white_mobility)
+
+        runaways = 0
+        men = black & ~kings & _BLACK_RUNAWAY_MASK
+        while men:
+            low = men & -men
+            men ^= low
+            if not _BLACK_CONES[low.bit_length() - 1] & white:
+                runaways += 1
+        men = white & ~kings & _WHITE_RUNAWAY_MASK
+        while men:
+            low = men & -men
+            men ^= low
+            if not _WHITE_CONES[low.bit_length() - 1] & black:
+                runaways -= 1
+        return score + weights['runaway'] * runaways
+
+    def evaluate_many(self, boards: list[Board | BitBoard]) -> list[float]:
+        """ Returns the scores of the positions on boards, in the same order, scoring them all at once with NumPy if
+        there are at least MIN_BATCH_SIZE of them.
+        """
+        if len(boards) < MIN_BATCH_SIZE:
+            return [self.evaluate(board) for board in boards]
+        black, white, kings = zip(*(board.masks() for board in boards))
+        return self.evaluate_masks(black, white, kings).tolist()
+
+    def evaluate_masks(self, black: Any, white: Any, kings: Any) -> Any:
+        """ Returns a NumPy array of the scores of many positions, given as sequences or arrays of their masks.
+
+        Parameters:
+        - black: the black mask of each position.
+        - white: the white mask of each position.
+        - kings: the king mask of each position.
+
+        Preconditions:
+        - len(black) == len(white) == len(kings)
+
+        >>> evaluator = PositionalEvaluator()
+        >>> boards = [BitBoard(), BitBoard(1 << 24, 1 << 3), BitBoard(0x49d7e, 0xe7ea2000, 0x2000)]
+        >>> scores = evaluator.evaluate_masks(*zip(*(board.masks() for board in boards)))
+        >>> all(abs(score - evaluator.evaluate(board)) < 1e-9 for score, board in zip(scores, boards))
+        True
+        """
+        import numpy as np  # only needed to score positions in batches
+
+        return feature_matrix(black, white, kings) @ np.array([self.weights[name] for name in FEATURES])
+
+
+# The evaluators that can be chosen by name.
+EVALUATORS = {'material': MaterialEvaluator, 'positional': PositionalEvaluator}
+
+
+def make_evaluator(name: str) -> Evaluator:
+    """ Returns a new evaluator of the kind with the given name in EVALUATORS, or a PositionalEvaluator with the
+    weights in the file with the given name if it ends in '.json'.
+
+    >>> type(make_evaluator('material')).__name__
+    'MaterialEvaluator'
+    """
+    if name.endswith('.json'):
+        return PositionalEvaluator.from_file(name)
+    elif name not in EVALUATORS:
+        raise ValueError(f'unknown evaluator {name!r}')
+    return EVALUATORS[name]()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['abc', 'json', 'os', 'board', 'bitboard', 'constants', 'numpy'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import', 'import-outside-toplevel']
+    })
@@ -16,6 +16,8 @@ import pygame
 from constants import *
 from board import Board
 from piece import Piece
+from gamestatus import GameStatus
+import renderer
 
 
 # from python_ta.contracts import check_contracts
@@ -31,25 +33,41 @@ class Game:
     - turn: the player whose turn it is.
     - valid_moves: a dict containing the valid moves and pieces that will be captured.
     - prev_move: the previous move made on the game board.
+    - status: a message shown across the top of the board, such as that the AI is thinking, or None for none.
 
     Private Instance Attributes:
     - board: an instance of board used to represent the board used for the game.
+    - game_status: whether the game is over, kept up to date as moves are played.
+    - renderer: the renderer that repaints only the squares that changed each frame, or None if the whole screen is
+    redrawn every frame.
     """
     screen: pygame.Surface
     selected: Optional[Piece]
     _board: Board
-    turn: tuple[int, int, int]
+    _game_status: GameStatus
+    turn: int
     valid_moves: dict[tuple[int, int], list[Piece]]
     prev_move: tuple[tuple[int, int], tuple[int, int]] | str
+    status: Optional[str]
+    _renderer: Optional[renderer.BoardRenderer]
 
-    def __init__(self, screen: pygame.Surface) -> None:
-        """ Initializes a checkers game """
+    def __init__(self, screen: pygame.Surface, dirty_rects: bool = True) -> None:
+        """ Initializes a checkers game
+
+        Parameters:
+        - screen: the pygame screen object on which the game is displayed.
+        - dirty_rects: whether each frame repaints and updates only the squares that changed, rather than the whole
+        screen.
+        """
         self.screen = screen
         self.selected = None
         self._board = Board()
         self.turn = WHITE
+        self._game_status = GameStatus(self._board, self.turn)
         self.valid_moves = {}
         self.prev_move = '*'
+        self.status = None
+        self._renderer = renderer.BoardRenderer() if dirty_rects else None
 
     def get_board(self) -> Board:
         """ Returns a copy of the game board """
@@ -57,10 +75,23 @@ class Game:
 
     def update(self) -> None:
         """ Updates the display of the game board """
-        self._board.draw(self.screen)
+        if self._renderer is not None:
+            rects = self._renderer.draw(self.screen, self._board, self.valid_moves, self.status)
+            if rects:
+                pygame.display.update(rects)
+            return
+
+        renderer.draw_board(self.screen, self._board)
         self.draw_valid_moves(self.valid_moves)
+        if self.status is not None:
+            renderer.draw_status(self.screen, self.status)
         pygame.display.update()
 
+    def invalidate(self) -> None:
+        """ Makes the next update redraw the whole screen, such as after the window was uncovered """
+        if self._renderer is not None:
+            self._renderer.invalidate()
+
     def select(self, row: int, col: int) -> bool:
         """ Selects a piece at the given row and column
 
@@ -84,7 +115,8 @@ class Game:
         piece = self._board.get_piece(row, col)
         if piece != 0 and piece.colour == self.turn:
             self.selected = piece
-            self.valid_moves = self._board.get_valid_moves(piece)
+            self.valid_moves = {end: captured for start, end, captured in self._board.legal_moves(piece.colour)
+                                if start == (row, col)}
             return True
         elif piece == 0 or piece.colour != self.turn:
             self.selected = None
@@ -112,10 +144,7 @@ class Game:
 
         if self.selected and piece == 0 and (row, col) in self.valid_moves:
             self.prev_move = ((self.selected.row, self.selected.col), (row, col))
-            self._board.move(self.selected, row, col)
-            captured = self.valid_moves[(row, col)]
-            if captured:
-                self._board.remove(captured)
+            self._game_status.play(self._board, (self.prev_move[0], (row, col), self.valid_moves[(row, col)]))
 
             self.change_turn()
             return True
@@ -144,9 +173,17 @@ class Game:
         else:
             self.turn = WHITE
 
-    def get_winner(self) -> Optional[tuple[tuple[int, int, int], list[list[Piece | int]]]]:
-        """ Returns the winner of the game if there is one, otherwise returns None """
-        return self._board.get_winner()
+    def get_winner(self) -> Optional[tuple[Optional[int], list[list[Piece | int]]]]:
+        """ Returns the winner of the game and its final board if the game is over, with None as the winner of a drawn
+        game, otherwise returns None
+        """
+        if not self._game_status.is_over():
+            return None
+        return (self._game_status.winner, self._board.board)
+
+    def get_end_reason(self) -> Optional[str]:
+        """ Returns why the game ended, as one of the reasons in gamestatus, or None if it is not over """
+        return self._game_status.reason
 
 
 if __name__ == '__main__':
@@ -157,7 +194,7 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['board', 'piece', 'pygame', 'constants'],
+        'extra-imports': ['board', 'piece', 'gamestatus', 'pygame', 'constants', 'renderer'],
         'max-line-length': 120,
         'disable': ['wildcard-import']
     })
@@ -0,0 +1,159 @@
+""" Checkers game status
+
+Module Description
+==================
+
+This module contains a class that keeps track of whether a game is over as its moves are played, so that asking is
+O(1) instead of generating every move of both players. Besides a player losing all their pieces or being left without
+a move, a game is drawn when the same position occurs a number of times with the same player to move, or when a
+number of plies in a row are played without a capture or a man moving.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Optional
+from board import Board
+from bitboard import BitBoard, square_index
+from zobrist import side_key
+from constants import *
+
+# The number of plies in a row without a capture or a man moving after which a game is drawn: forty moves each.
+DEFAULT_NO_PROGRESS_PLIES = 80
+
+# The number of times the same position must occur, with the same player to move, for a game to be drawn.
+DEFAULT_REPETITIONS = 3
+
+# The reasons a game can end.
+NO_PIECES = 'no pieces'
+NO_MOVES = 'no moves'
+REPETITION = 'repetition'
+NO_PROGRESS = 'no progress'
+
+
+# @check_contracts
+class GameStatus:
+    """ The status of a game, updated as each move is played.
+
+    Instance Attributes:
+    - turn: the colour of the player to move.
+    - winner: the colour of the player who won, or None if the game is drawn or not over.
+    - reason: why the game ended, one of NO_PIECES, NO_MOVES, REPETITION and NO_PROGRESS, or None if it is not over.
+    - plies_without_progress: the number of plies played since the last capture or move of a man.
+    - no_progress_limit: the number of plies without progress after which the game is drawn.
+    - repetitions: the number of times the same position must occur for the game to be drawn.
+
+    Private Instance Attributes:
+    - _history: the number of times each position has occurred since the last capture or move of a man, keyed by its
+    Zobrist hash with the player to move. Positions from before that cannot occur again, so they are forgotten.
+
+    Representation Invariants:
+    - self.turn in (BLACK, WHITE)
+    - self.winner is None or self.reason in (NO_PIECES, NO_MOVES)
+    - self.plies_without_progress >= 0
+    - self.no_progress_limit >= 1
+    - self.repetitions >= 2
+
+    >>> board = BitBoard(1 << 0, 1 << 31, 1 << 0 | 1 << 31)
+    >>> status = GameStatus(board, WHITE)
+    >>> shuffle = [((7, 6), (6, 7)), ((0, 1), (1, 0)), ((6, 7), (7, 6)), ((1, 0), (0, 1))]
+    >>> for key in shuffle * 2:
+    ...     status.play(board, next(move for move in board.legal_moves(status.turn) if move[:2] == key))
+    >>> status.is_over(), status.winner, status.reason, status.plies_without_progress
+    (True, None, 'repetition', 8)
+    """
+    turn: int
+    winner: Optional[int]
+    reason: Optional[str]
+    plies_without_progress: int
+    no_progress_limit: int
+    repetitions: int
+    _history: dict[int, int]
+
+    def __init__(self, board: Board | BitBoard, turn: int = WHITE,
+                 no_progress_limit: int = DEFAULT_NO_PROGRESS_PLIES, repetitions: int = DEFAULT_REPETITIONS) -> None:
+        """ Initializes the status of a game starting from the given board.
+
+        Parameters:
+        - board: the board the game starts from.
+        - turn: the colour of the player to move first.
+        - no_progress_limit: the number of plies without a capture or a man moving after which the game is drawn.
+        - repetitions: the number of times the same position must occur for the game to be drawn.
+
+        Preconditions:
+        - turn in (BLACK, WHITE)
+        - no_progress_limit >= 1
+        - repetitions >= 2
+        """
+        self.turn = turn
+        self.winner = None
+        self.reason = None
+        self.plies_without_progress = 0
+        self.no_progress_limit = no_progress_limit
+        self.repetitions = repetitions
+        self._history = {}
+        self._update(board)
+
+    def is_over(self) -> bool:
+        """ Returns whether the game is over """
+        return self.reason is not None
+
+    def is_draw(self) -> bool:
+        """ Returns whether the game is over and drawn """
+        return self.reason is not None and self.winner is None
+
+    def play(self, board: Board | BitBoard, move: tuple) -> None:
+        """ Plays a move on the board and updates the status of the game.
+
+        Parameters:
+        - board: the board of the game, which must not have been changed since the last move played through self.
+        - move: a move returned by board.legal_moves(self.turn).
+
+        Preconditions:
+        - not self.is_over()
+        """
+        (row, col), _, captured = move
+        if isinstance(board, BitBoard):
+            progress = bool(captured) or not board.kings >> square_index(row, col) & 1
+        else:
+            progress = bool(captured) or not board.get_piece(row, col).is_king
+        board.make_move(move)
+
+        self.turn = BLACK if self.turn == WHITE else WHITE
+        if progress:
+            self.plies_without_progress = 0
+            self._history.clear()
+        else:
+            self.plies_without_progress += 1
+        self._update(board)
+
+    def _update(self, board: Board | BitBoard) -> None:
+        """ Records the board's position and checks whether it ends the game, following Board.get_winner for wins """
+        if board.white_left == 0 or not board.has_moves(WHITE):
+            self.winner = BLACK
+        elif board.black_left == 0 or not board.has_moves(BLACK):
+            self.winner = WHITE
+        if self.winner is not None:
+            self.reason = NO_PIECES if board.white_left == 0 or board.black_left == 0 else NO_MOVES
+            return
+
+        key = board.zobrist ^ side_key(self.turn)
+        self._history[key] = self._history.get(key, 0) + 1
+        if self._history[key] >= self.repetitions:
+            self.reason = REPETITION
+        elif self.plies_without_progress >= self.no_progress_limit:
+            self.reason = NO_PROGRESS
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['board', 'bitboard', 'zobrist', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })
@@ -13,10 +13,17 @@ This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, V
 """
 
 from __future__ import annotations
-from python_ta.contracts import check_contracts
+from typing import Optional
+import time
 from board import Board
+from bitboard import BitBoard
+from stats import SearchStats
+from evaluation import Evaluator, MaterialEvaluator
 from constants import *
 
+# The evaluator used when none is given, which counts material.
+_MATERIAL = MaterialEvaluator()
+
 
 # @check_contracts
 class GameTree:
@@ -24,21 +31,21 @@ class GameTree:
     Instance Attributes:
         - move: the previous move made in the checkers game.
         - material_advantage: the current advantage of white at the current state of the gameboard.
-        - board_state: a board instance showing the state of the current board.
+        - board_state: a board or bitboard instance showing the state of the current board.
 
     Private Instance Attributes:
-        - _subtrees: maps a board to a GameTree.
+        - _subtrees: maps a move to the GameTree of the board it leads to.
 
     Representation Invariants:
     - move == '*' if the game has just begun.
     """
     move: str | tuple[tuple[int, int], tuple[int, int]]
     material_advantage: float
-    board_state: Board
+    board_state: Board | BitBoard
 
-    _subtrees: dict[str, GameTree]
+    _subtrees: dict[str | tuple[tuple[int, int], tuple[int, int]], GameTree]
 
-    def __init__(self,  board: Board, move: str | tuple[tuple[int, int], tuple[int, int]] = '*',
+    def __init__(self,  board: Board | BitBoard, move: str | tuple[tuple[int, int], tuple[int, int]] = '*',
                  material_adv: float = 0.0) -> None:
         """ Initializing new GameTree """
         self.move = move
@@ -60,75 +67,165 @@ class GameTree:
         Parameters:
         - subtree: the subtree to be added to self
          """
-        self._subtrees[str(subtree.board_state)] = subtree
+        self._subtrees[subtree.move] = subtree
+
+    def get_subtree(self, move: tuple[tuple[int, int], tuple[int, int]]) -> Optional[GameTree]:
+        """ Returns the subtree reached by the given move, or None if this tree has no such subtree.
 
+        Parameters:
+        - move: the move leading to the subtree.
+        """
+        return self._subtrees.get(move)
 
-def generate_game_tree(board: Board, m: tuple[tuple[int, int], tuple[int, int]], d: int = 0) -> GameTree:
+
+def generate_game_tree(board: Board | BitBoard, m: tuple[tuple[int, int], tuple[int, int]], d: int = 0,
+                       max_depth: int = 4, colour: int = BLACK,
+                       stats: Optional[SearchStats] = None, evaluator: Optional[Evaluator] = None) -> GameTree:
     """ generates the gametree up to a certain depth with all the possible moves
 
+    The leaves of the tree are scored together once it is built, so an evaluator can score them all in one batch.
+
     Parameters:
-    - board: the current state of the baord in which to build the gametree upon.
+    - board: the current state of the baord in which to build the gametree upon, either a Board or a BitBoard.
     - m: the move that was made to achieve the current state of the board.
     - d: recurrsion variable to keep track of depth.
+    - max_depth: the depth at which to stop building the gametree.
+    - colour: the colour of the player to move at depth 0.
+    - stats: the collector to record the positions generated and the time spent in, or None to not record any.
+    - evaluator: the evaluator that scores the leaves, or None to count their material.
 
     Returns:
     - returns a GameTree object that contatins all the valid moves for a given board.
      """
-    game_tree = GameTree(board)
-    game_tree.move = m
-
-    if d == 4:
-        black_adv = board.black_left + (2 * board.black_kings)
-        white_adv = board.white_left + (2 * board.white_kings)
-        game_tree.material_advantage = black_adv - white_adv
-        return game_tree
+    leaves = []
+    game_tree = _build_game_tree(board, m, d, max_depth, colour, stats, leaves)
+    _score_leaves(leaves, stats, evaluator)
+    _average_advantages(game_tree)
+    return game_tree
+
+
+def extend_game_tree(game_tree: GameTree, d: int = 0, max_depth: int = 4, colour: int = BLACK,
+                     stats: Optional[SearchStats] = None, evaluator: Optional[Evaluator] = None) -> None:
+    """ extends an existing gametree in place so that it reaches max_depth, expanding only its leaves
+
+    The extended tree has the same subtrees and material advantages as a tree built by generate_game_tree from the
+    same board, but only the missing plies at its frontier are generated.
+
+    Parameters:
+    - game_tree: the gametree to extend.
+    - d: recurrsion variable to keep track of depth.
+    - max_depth: the depth the gametree should reach.
+    - colour: the colour of the player to move at depth 0.
+    - stats: the collector to record the positions generated and the time spent in, or None to not record any.
+    - evaluator: the evaluator that scores the new leaves, or None to count their material.
+    """
+    leaves = []
+    _extend_leaves(game_tree, d, max_depth, colour, stats, leaves)
+    _score_leaves(leaves, stats, evaluator)
+    _average_advantages(game_tree)
+
+
+def _build_game_tree(board: Board | BitBoard, m: tuple[tuple[int, int], tuple[int, int]], d: int, max_depth: int,
+                     colour: int, stats: Optional[SearchStats], leaves: list[GameTree]) -> GameTree:
+    """ Helper function for generate_game_tree. Builds the gametree without scoring it, adding its leaves to leaves """
+    game_tree = GameTree(board, m)
+    if stats is not None:
+        stats.count_node(d)
+
+    if d < max_depth:
+        for move, board_copy in get_successors(board, _mover(colour, d), stats):
+            game_tree.add_subtree(_build_game_tree(board_copy, move, d + 1, max_depth, colour, stats, leaves))
+
+    if len(game_tree.get_subtrees()) == 0:
+        leaves.append(game_tree)
+    return game_tree
+
+
+def _extend_leaves(game_tree: GameTree, d: int, max_depth: int, colour: int,
+                   stats: Optional[SearchStats], leaves: list[GameTree]) -> None:
+    """ Helper function for extend_game_tree. Expands the leaves of the gametree above max_depth without scoring
+    them, adding the new leaves to leaves.
+    """
+    if d == max_depth:
+        return
+    elif len(game_tree.get_subtrees()) == 0:
+        for move, board_copy in get_successors(game_tree.board_state, _mover(colour, d), stats):
+            game_tree.add_subtree(_build_game_tree(board_copy, move, d + 1, max_depth, colour, stats, leaves))
+        if len(game_tree.get_subtrees()) == 0:
+            leaves.append(game_tree)
+    else:
+        for subtree in game_tree.get_subtrees():
+            _extend_leaves(subtree, d + 1, max_depth, colour, stats, leaves)
+
+
+def _mover(colour: int, d: int) -> int:
+    """ Returns the colour of the player to move at depth d of a gametree where colour moves at depth 0 """
+    return colour if d % 2 == 0 else (WHITE if colour == BLACK else BLACK)
+
+
+def _score_leaves(leaves: list[GameTree], stats: Optional[SearchStats], evaluator: Optional[Evaluator]) -> None:
+    """ Sets the material advantage of each leaf to its score, adding the time it took to stats if it is not None """
+    if evaluator is None:
+        evaluator = _MATERIAL
+    if stats is None:
+        scores = evaluator.evaluate_many([leaf.board_state for leaf in leaves])
+    else:
+        start = time.perf_counter()
+        scores = evaluator.evaluate_many([leaf.board_state for leaf in leaves])
+        stats.eval_seconds += time.perf_counter() - start
+    for leaf, score in zip(leaves, scores):
+        leaf.material_advantage = score
+
+
+def _average_advantages(game_tree: GameTree) -> None:
+    """ Sets the material advantage of every node of the gametree that has subtrees to the average of theirs """
+    subtrees = game_tree.get_subtrees()
+    if len(subtrees) != 0:
+        for subtree in subtrees:
+            _average_advantages(subtree)
+        game_tree.material_advantage = sum(tree.material_advantage for tree in subtrees) / len(subtrees)
+
+
+def material_advantage_of(board: Board | BitBoard) -> float:
+    """ Returns black's material advantage on the given board, counting a king as three pieces
+
+    Parameters:
+    - board: the board to evaluate, either a Board or a BitBoard.
+    """
+    black_adv = board.black_left + (2 * board.black_kings)
+    white_adv = board.white_left + (2 * board.white_kings)
+    return black_adv - white_adv
+
+
+def get_successors(board: Board | BitBoard, colour: int, stats: Optional[SearchStats] = None) \
+        -> list[tuple[tuple[tuple[int, int], tuple[int, int]], Board | BitBoard]]:
+    """ Returns every move for the given colour along with a copy of the board that results from it
+
+    Parameters:
+    - board: the board to generate moves on, either a Board or a BitBoard.
+    - colour: the colour of the player to move.
+    - stats: the collector to add the time spent generating moves and copying boards to, or None.
+
+    Preconditions:
+    - colour in (BLACK, WHITE)
+    """
+    if stats is not None:
+        start = time.perf_counter()
+        moves = board.legal_moves(colour)
+        stats.movegen_seconds += time.perf_counter() - start
+        start = time.perf_counter()
     else:
-        for row in board.board:
-            for piece in row:
-                if piece == 0:
-                    pass
-                elif piece.colour == BLACK and d % 2 == 0:
-                    for cord in list(board.get_valid_moves(piece).keys()):
-                        board_copy = board.__copy__()
-                        move = ((piece.row, piece.col), cord)
-                        board_copy.move(board_copy.board[piece.row][piece.col], cord[0], cord[1])
-                        remove_pieces = board.get_valid_moves(piece)[cord]
-                        board_copy.remove(remove_pieces)
-                        new_game_tree = generate_game_tree(board_copy, move, d + 1)
-
-                        if len(new_game_tree.get_subtrees()) == 0:
-                            b_adv = new_game_tree.board_state.black_left + 2 * new_game_tree.board_state.black_kings
-                            w_adv = new_game_tree.board_state.white_left + 2 * new_game_tree.board_state.white_kings
-                            new_game_tree.material_advantage = b_adv - w_adv
-                        else:
-                            tot = sum([tree.material_advantage for tree in new_game_tree.get_subtrees()])
-                            new_game_tree.material_advantage = tot / len(new_game_tree.get_subtrees())
-
-                        game_tree.add_subtree(new_game_tree)
-                elif piece.colour == WHITE and d % 2 != 0:
-                    for cord in list(board.get_valid_moves(piece).keys()):
-                        board_copy = board.__copy__()
-                        move = ((piece.row, piece.col), cord)
-                        board_copy.move(board_copy.board[piece.row][piece.col], cord[0], cord[1])
-                        remove_pieces = board.get_valid_moves(piece)[cord]
-                        board_copy.remove(remove_pieces)
-                        new_game_tree = generate_game_tree(board_copy, move, d + 1)
-
-                        if len(new_game_tree.get_subtrees()) == 0:
-                            b_adv = new_game_tree.board_state.black_left + 2 * new_game_tree.board_state.black_kings
-                            w_adv = new_game_tree.board_state.white_left + 2 * new_game_tree.board_state.white_kings
-                            new_game_tree.material_advantage = b_adv - w_adv
-                        else:
-                            tot = sum([tree.material_advantage for tree in new_game_tree.get_subtrees()])
-                            new_game_tree.material_advantage = tot / len(new_game_tree.get_subtrees())
-
-                        game_tree.add_subtree(new_game_tree)
-
-        if len(game_tree.get_subtrees()) != 0:
-            tot = sum([tree.material_advantage for tree in game_tree.get_subtrees()])
-            game_tree.material_advantage = tot / len(game_tree.get_subtrees())
-
-        return game_tree
+        moves = board.legal_moves(colour)
+
+    successors = []
+    for move in moves:
+        board_copy = board.__copy__()
+        board_copy.make_move(move)
+        successors.append(((move[0], move[1]), board_copy))
+
+    if stats is not None:
+        stats.copy_seconds += time.perf_counter() - start
+    return successors
 
 
 if __name__ == '__main__':
@@ -137,5 +234,7 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'max-line-length': 120
+        'extra-imports': ['time', 'board', 'bitboard', 'stats', 'evaluation', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
     })
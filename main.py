@@ -6,8 +6,10 @@ Module Description
 This module contains a collection of functions and attributes that will be used to help run the whole checkers game.
 
 **NOTE**
-The performance of this program may be affected by the computational power of your computer. If you are experiencing
-slow run times, please head to gametree.py line-80 and lower the value d. (The higher the value of d, the better the AI)
+The AI searches one ply deeper at a time until its time budget runs out, so it takes about the same time per move on
+any computer. To make it think for longer or shorter, change AI_TIME_BUDGET_MS below. (The bigger the budget, the
+better the AI) It thinks in a background thread, so the window keeps responding, and can be closed, while it does.
+While it waits for your move it ponders on the move it expects you to make, and replies sooner if you make it.
 
 Copyright and Usage Information
 ===============================
@@ -16,36 +18,73 @@ This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, V
 """
 
 from __future__ import annotations
+from typing import Optional
 import pygame
 import constants
 from game import Game
 from piece import Piece
-from ai import AI
+from ai import AI, ALPHABETA_MODE
+from evaluation import PositionalEvaluator
+from engine import BackgroundAI
 from gametree import GameTree
+import renderer
+
+# The number of milliseconds the AI may spend choosing each move.
+AI_TIME_BUDGET_MS = 1000
+
+# The number of processes the AI's search spreads its moves across. 1 searches in the game's own process.
+AI_WORKERS = 1
+
+# The directory the AI reads endgame tablebases from, written by tablebase.py. The AI searches as usual without them.
+TABLEBASE_DIR = 'tablebases'
+
+# The opening book the AI plays from at the start of the game, written by book.py. The AI searches as usual without it.
+BOOK_PATH = 'book.bin'
+
+# The evaluation weights the AI scores positions with, written by tuning.py. The AI uses its default weights without it.
+WEIGHTS_PATH = 'weights.json'
+
+# Whether the AI ponders on every move the player could make during the player's turn, instead of only on the move it
+# expects the player to make.
+PONDER_ALL_REPLIES = False
+
+# The number of milliseconds the AI may ponder for during each of the player's turns. Once it runs out, a game waiting
+# for the player uses almost no CPU.
+PONDER_TIME_BUDGET_MS = 5 * AI_TIME_BUDGET_MS
+
+
+# The event posted when the AI has chosen its move, which wakes the game loop while it waits for events.
+AI_MOVE_EVENT = pygame.USEREVENT
 
 
 # @check_contracts
 def main() -> None:
-    """ main function where the game is run """
-    FPS = 24
+    """ main function where the game is run
+
+    The game loop sleeps in pygame.event.wait until there is something to do: the player clicking, the window being
+    uncovered or closed, or the AI posting AI_MOVE_EVENT when it has chosen its move. A game waiting for the player
+    therefore uses almost no CPU.
+    """
     SCREEN = pygame.display.set_mode((constants.WIDTH, constants.HEIGHT))
     pygame.display.set_caption('Checkers!')
     pygame.init()
 
     run = True
-    clock = pygame.time.Clock()
     game = Game(SCREEN)
     board = game.get_board()
     game_tree = GameTree(board)
-    ai = AI(game_tree)
-    winner = ()
+    ai = BackgroundAI(AI(game_tree, use_bitboard=True, mode=ALPHABETA_MODE, workers=AI_WORKERS,
+                         tablebase_dir=TABLEBASE_DIR, book_path=BOOK_PATH,
+                         evaluator=PositionalEvaluator.from_file(WEIGHTS_PATH)),
+                      on_move=post_ai_move)
+    winner = None
 
-    def player_turn(events: any) -> bool:
+    def handle_events(events: list[pygame.event.Event]) -> bool:
         """
-        Helper function - to be run when it is the player's turn
+        Helper function - handles the events that woke the game loop
 
         Parameters:
-        - events : the pygame event queue
+        - events : the pygame events to handle
         Returns:
         - should_run : whether the game should keep running
         """
@@ -54,34 +93,47 @@ def main() -> None:
             if ev.type == pygame.QUIT:
                 should_run = False
 
-            if ev.type == pygame.MOUSEBUTTONDOWN:
-                position = pygame.mouse.get_pos()
-                row_num, col_num = get_row_col_from_mouse(position)
+            elif ev.type == pygame.WINDOWEXPOSED:
+                game.invalidate()
+
+            elif ev.type == pygame.MOUSEBUTTONDOWN and game.turn == constants.WHITE:
+                row_num, col_num = get_row_col_from_mouse(ev.pos)
                 game.select(row_num, col_num)
 
         return should_run
 
     while run:
-        clock.tick(FPS)
+        winner = game.get_winner()
+        if winner is not None:
+            break
+
+        if game.turn == constants.BLACK and not ai.is_thinking():
+            ai.start(game.prev_move, game.get_board(), AI_TIME_BUDGET_MS)
+            game.status = 'Thinking...'
+        elif game.turn == constants.WHITE and not ai.is_pondering():
+            ai.ponder(game.get_board(), PONDER_ALL_REPLIES, PONDER_TIME_BUDGET_MS)
+        game.update()
 
-        if game.get_winner() is not None:
-            winner = game.get_winner()
-            run = False
+        run = handle_events([pygame.event.wait()] + pygame.event.get())
 
-        elif game.turn == constants.BLACK:
-            board = game.get_board()
-            ai.update_game_tree(game.prev_move, board)
-            move = ai.make_move()
-            pygame.time.delay(100)
-            game.select(move[0][0], move[0][1])
-            game.select(move[1][0], move[1][1])
+        if run and game.turn == constants.BLACK:
+            move = ai.poll()
+            if move is not None:
+                game.status = None
+                game.select(move[0][0], move[0][1])
+                game.select(move[1][0], move[1][1])
 
-        else:
-            run = player_turn(pygame.event.get())
+    ai.cancel()
+    if winner is not None:
+        game_over(SCREEN, winner[0], winner[1], game.get_end_reason())
+    else:
+        pygame.quit()
 
-        game.update()
 
-    game_over(SCREEN, winner[0], winner[1])
+def post_ai_move() -> None:
+    """ Posts AI_MOVE_EVENT to wake the game loop, unless pygame has already been shut down """
+    if pygame.get_init():
+        pygame.event.post(pygame.event.Event(AI_MOVE_EVENT))
 
 
 def get_row_col_from_mouse(pos: tuple[int, int]) -> tuple:
@@ -102,17 +154,19 @@ def get_row_col_from_mouse(pos: tuple[int, int]) -> tuple:
     return (row, col)
 
 
-def game_over(screen: pygame.Surface, winner: tuple[int, int, int], board: list[list[Piece | int]]) -> None:
+def game_over(screen: pygame.Surface, winner: Optional[int], board: list[list[Piece | int]],
+              reason: Optional[str] = None) -> None:
     """ screen for when game ends
 
     Parameters:
     - screen: the pygame screen object.
-    - winner: the colour of the winning player.
+    - winner: the colour of the winning player, or None if the game was drawn.
     - board: the end result of the finished game of checkers.
+    - reason: why a drawn game was drawn, such as gamestatus.REPETITION, or None to not say.
 
     Preconditions:
     - screen is a valid pygame surface object
-    - winner in ((255, 255, 255), (0, 0, 0))
+    - winner in (constants.BLACK, constants.WHITE, None)
     - board is a valid game board
     """
     corbel_70 = pygame.font.SysFont('Corbel', 70)
@@ -120,35 +174,29 @@ def game_over(screen: pygame.Surface, winner: tuple[int, int, int], board: list[
     cont = True
 
     # Writing winner text
-    if winner == (0, 0, 0):
-        win_txt = corbel_70.render('BLACK WINS!', True, constants.BLACK)
+    if winner == constants.BLACK:
+        win_txt = corbel_70.render('BLACK WINS!', True, constants.BLACK_RGB)
+    elif winner == constants.WHITE:
+        win_txt = corbel_70.render('WHITE WINS!', True, constants.WHITE_RGB)
+    elif reason is not None:
+        win_txt = corbel_70.render(f'DRAW BY {reason.upper()}!', True, constants.BLACK_RGB)
     else:
-        win_txt = corbel_70.render('WHITE WINS!', True, constants.WHITE)
+        win_txt = corbel_70.render('DRAW!', True, constants.BLACK_RGB)
     draw_game_over(screen, board)
 
     # Constructing buttons
-    play_again_txt = corbel_35.render('Play Again?', True, constants.BLACK)
-    quit_txt = corbel_35.render('QUIT', True, constants.BLACK)
+    play_again_txt = corbel_35.render('Play Again?', True, constants.BLACK_RGB)
+    quit_txt = corbel_35.render('QUIT', True, constants.BLACK_RGB)
 
     win_rect = win_txt.get_rect(center=(constants.WIDTH / 2, constants.HEIGHT / 2))
     play_again_rect = play_again_txt.get_rect(center=(constants.WIDTH / 2, constants.HEIGHT / 1.6))
     quit_rect = quit_txt.get_rect(center=(constants.WIDTH / 2, constants.HEIGHT / 1.5))
 
     screen.blit(win_txt, win_rect)
+    pygame.display.update()
 
     while cont:
         x, y = pygame.mouse.get_pos()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-            elif event.type == pygame.MOUSEBUTTONDOWN and play_again_rect.left <= x <= play_again_rect.right and \
-                    play_again_rect.top <= y <= play_again_rect.bottom:
-                main()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN and quit_rect.left <= x <= quit_rect.right and \
-                    quit_rect.top <= y <= quit_rect.bottom:
-                cont = False
-
         if play_again_rect.left <= x <= play_again_rect.right and play_again_rect.top <= y <= play_again_rect.bottom:
             pygame.draw.rect(
                 surface=screen,
@@ -195,8 +243,21 @@ def game_over(screen: pygame.Surface, winner: tuple[int, int, int], board: list[
 
         screen.blit(play_again_txt, play_again_rect)
         screen.blit(quit_txt, quit_rect)
-
-        pygame.display.update()
+        pygame.display.update([play_again_rect, quit_rect])
+
+        # Sleep until the mouse moves or is clicked, or the window is closed or uncovered, instead of redrawing the
+        # buttons over and over
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            return
+        elif event.type == pygame.WINDOWEXPOSED:
+            pygame.display.update()
+        elif event.type == pygame.MOUSEBUTTONDOWN and play_again_rect.collidepoint(event.pos):
+            main()
+            return
+        elif event.type == pygame.MOUSEBUTTONDOWN and quit_rect.collidepoint(event.pos):
+            cont = False
 
 
 def draw_game_over(screen: pygame.Surface, board: list[list[Piece | int]]) -> None:
@@ -210,16 +271,8 @@ def draw_game_over(screen: pygame.Surface, board: list[list[Piece | int]]) -> No
     - screen is a valid pygame surface object.
     - board is valid game board.
     """
-    screen.fill(constants.DARK_BROWN2)
-    for row in range(constants.ROWS):
-        for col in range(row % 2, constants.ROWS, 2):
-            pygame.draw.rect(screen, constants.LIGHT_BROWN2, (
-                col * constants.SQUARE_SIZE, row * constants.SQUARE_SIZE, constants.SQUARE_SIZE, constants.SQUARE_SIZE))
-    for row in range(constants.ROWS):
-        for col in range(constants.COLS):
-            piece = board[row][col]
-            if piece != 0:
-                piece.draw(screen)
+    renderer.draw_squares(screen, constants.DARK_BROWN2, constants.LIGHT_BROWN2)
+    renderer.draw_pieces(screen, board)
 
 
 if __name__ == '__main__':
@@ -231,7 +284,7 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['pygame', 'constants', 'game', 'piece', 'ai', 'gametree'],
+        'extra-imports': ['pygame', 'constants', 'game', 'piece', 'ai', 'evaluation', 'gametree', 'renderer'],
         'max-line-length': 120,
         'disable': ['no-member']  # python-ta did not recognise members of pygame
     })
@@ -0,0 +1,205 @@
+""" Checkers parallel search
+
+Module Description
+==================
+
+This module contains a version of the alpha-beta search that spreads the moves at the root of the search across a
+pool of worker processes, so that a search can use every core of the machine.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from typing import Any, Optional
+import multiprocessing
+import os
+import time
+from board import Board
+from bitboard import BitBoard
+from search import AlphaBetaSearch, SearchTimeout, WIN_SCORE
+from evaluation import Evaluator
+from transposition import TranspositionTable, EXACT
+from zobrist import side_key
+from constants import *
+
+# The search run by each worker process, created when the process starts.
+_worker_search: Optional[AlphaBetaSearch] = None
+
+
+def _init_worker(tt_size_mb: float, evaluator: Optional[Evaluator], stop_event: Any) -> None:
+    """ Creates the search used by a worker process, with its own transposition table and the given evaluator, that
+    stops as if it ran out of time once stop_event is set.
+    """
+    global _worker_search
+    _worker_search = AlphaBetaSearch(TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None, evaluator)
+    _worker_search.stop_event = stop_event
+
+
+def _search_root_move(board: Board | BitBoard, colour: int,
+                      move: tuple[tuple[int, int], tuple[int, int]], depth: int, alpha: float, beta: float,
+                      time_left: Optional[float]) -> tuple[Optional[float], int]:
+    """ Searches one root move in a worker process.
+
+    Parameters:
+    - board: the board at the root of the search.
+    - colour: the colour of the player to move at the root.
+    - move: the start and end square of the root move to search.
+    - depth: the depth of the whole search, counting the root move.
+    - alpha: the score colour is already guaranteed by another root move.
+    - beta: the score the opponent is already guaranteed.
+    - time_left: the number of seconds the search may take, or None to search to completion.
+
+    Returns:
+    - A tuple of the score of the move from colour's point of view, or None if the search ran out of time, and the
+    number of positions visited.
+    """
+    search = _worker_search
+    search.nodes = 0
+    search._deadline = None if time_left is None else time.perf_counter() + time_left
+    if search.transposition_table is not None:
+        search.transposition_table.new_search()
+
+    for legal_move in board.legal_moves(colour):
+        if (legal_move[0], legal_move[1]) == move:
+            board.make_move(legal_move)
+            break
+
+    opponent = WHITE if colour == BLACK else BLACK
+    try:
+        return (-search._negamax(board, opponent, depth - 1, 1, -beta, -alpha), search.nodes)
+    except SearchTimeout:
+        return (None, search.nodes)
+
+
+# @check_contracts
+class ParallelSearch(AlphaBetaSearch):
+    """ An alpha-beta search that searches the root moves in parallel.
+
+    The first root move is searched in this process to find a bound for the others, which are then searched at the
+    same time in worker processes (the Young Brothers Wait strategy). Without transposition tables, the move picked
+    is the same one AlphaBetaSearch would pick. Searches that are too shallow or that have fewer than two root moves
+    run serially.
+
+    Instance Attributes:
+    - workers: the number of worker processes.
+    - min_parallel_depth: the shallowest search that is run in parallel.
+    - worker_tt_size_mb: the size of each worker's own transposition table in megabytes, or 0 for none.
+
+    Private Instance Attributes:
+    - _executor: the pool of worker processes, started by the first parallel search.
+    - _worker_stop: the event shared with the worker processes of the current or last pool that stops their
+    searches, or None before the first pool starts. It is kept after shutdown, since workers that are still starting
+    read it when they do.
+
+    Representation Invariants:
+    - self.workers >= 1
+    - self.min_parallel_depth >= 2
+    """
+    workers: int
+    min_parallel_depth: int
+    worker_tt_size_mb: float
+    _executor: Optional[ProcessPoolExecutor]
+    _worker_stop: Optional[Any]
+
+    def __init__(self, transposition_table: Optional[TranspositionTable] = None, workers: Optional[int] = None,
+                 min_parallel_depth: int = 6, worker_tt_size_mb: float = 16,
+                 evaluator: Optional[Evaluator] = None) -> None:
+        """ Initializes a parallel search using the given number of workers, by default one per core """
+        super().__init__(transposition_table, evaluator)
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.min_parallel_depth = min_parallel_depth
+        self.worker_tt_size_mb = worker_tt_size_mb
+        self._executor = None
+        self._worker_stop = None
+
+    def search(self, board: Board | BitBoard, colour: int, depth: int,
+               deadline: Optional[float] = None) -> tuple[Optional[tuple[tuple[int, int], tuple[int, int]]], float]:
+        """ Searches the given board and returns the best move for colour along with its score.
+
+        Parameters:
+        - board: the board to search, either a Board or a BitBoard.
+        - colour: the colour of the player to move.
+        - depth: the number of plies to search.
+        - deadline: the time.perf_counter() value at which to raise SearchTimeout, or None to search to completion.
+
+        Returns:
+        - A tuple of the best move, or None if colour has no moves, and its score from colour's point of view.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        - depth >= 1
+        """
+        if self.workers <= 1 or depth < self.min_parallel_depth:
+            return super().search(board, colour, depth, deadline)
+
+        table = self.transposition_table
+        key = board.zobrist ^ side_key(colour)
+        entry = table.probe(key) if table is not None else None
+        moves = self._ordered(board, colour, 0, entry[3] if entry is not None else None)
+        if len(moves) < 2:
+            return super().search(board, colour, depth, deadline)
+
+        self.nodes = 1
+        self._deadline = deadline
+        opponent = WHITE if colour == BLACK else BLACK
+        alpha, beta = -WIN_SCORE - depth - 1, WIN_SCORE + depth + 1
+
+        undo = board.make_move(moves[0])
+        try:
+            best_score = -self._negamax(board, opponent, depth - 1, 1, -beta, -alpha)
+        finally:
+            board.unmake_move(undo)
+        best_move = (moves[0][0], moves[0][1])
+
+        if self._executor is None:
+            context = multiprocessing.get_context('spawn')
+            self._worker_stop = context.Event()
+            self._executor = ProcessPoolExecutor(self.workers, context, _init_worker,
+                                                 (self.worker_tt_size_mb, self.evaluator, self._worker_stop))
+        time_left = None if deadline is None else deadline - time.perf_counter()
+        futures = [self._executor.submit(_search_root_move, board, colour, (move[0], move[1]), depth, best_score,
+                                         beta, time_left) for move in moves[1:]]
+
+        timed_out = False
+        for move, future in zip(moves[1:], futures):
+            try:
+                score, nodes = future.result()
+            except CancelledError:
+                score, nodes = None, 0
+            self.nodes += nodes
+            if score is None:
+                timed_out = True
+            elif score > best_score:
+                best_move, best_score = (move[0], move[1]), score
+        if timed_out:
+            raise SearchTimeout
+
+        self._previous_best[0] = best_move
+        if table is not None:
+            table.store(key, depth, best_score, EXACT, best_move)
+        return (best_move, best_score)
+
+    def shutdown(self) -> None:
+        """ Stops the worker processes, if they were started, without waiting for them. Root moves they are still
+        searching stop as if they ran out of time, so a search waiting on them raises SearchTimeout.
+        """
+        if self._executor is not None:
+            self._worker_stop.set()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['concurrent.futures', 'multiprocessing', 'os', 'time', 'board', 'bitboard', 'search',
+                          'evaluation', 'transposition', 'zobrist', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import', 'global-statement', 'protected-access']
+    })
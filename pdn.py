@@ -0,0 +1,219 @@
+""" Checkers PDN games
+
+Module Description
+==================
+
+This module contains functions that read and write games in Portable Draughts Notation (PDN). A move is written as
+its squares joined by '-' for a simple move or 'x' for a jump, such as '11-15' or '15x22x29'.
+
+Squares are numbered 1 to 32 as in standard PDN, where the side that moves first, black in English checkers, starts
+on squares 1 to 12. In this game white moves first, starting at the bottom of the board, so a PDN game is played
+turned around: its first player is white here, and its square n is BitBoard square 32 - n. A game's result gives the
+score of the first player first: '1-0' is a white win here, '0-1' a black win and '1/2-1/2' a draw.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Iterable, Optional
+import re
+import textwrap
+from constants import *
+from bitboard import BitBoard, SQUARE_COORDS, square_index
+
+# The result of a game as written in PDN, keyed by the colour of the winner or None for a draw.
+RESULTS = {WHITE: '1-0', BLACK: '0-1', None: '1/2-1/2'}
+
+_TOKEN = re.compile(r'\[\s*(\w+)\s+"([^"]*)"\s*]|[^\s\[]+')
+_COMMENT = re.compile(r'\{[^}]*}')
+_MOVE = re.compile(r'^\d+(?:[-x]\d+)+$')
+_RESULT = re.compile(r'^(1-0|0-1|1/2-1/2|2-0|0-2|1-1|\*)$')
+
+
+def parse_move(token: str) -> list[int]:
+    """ Returns the square numbers a move passes through.
+
+    >>> parse_move('22-18')
+    [22, 18]
+    >>> parse_move('15x22x29')
+    [15, 22, 29]
+    """
+    return [int(square) for square in re.split('[-x]', token)]
+
+
+def _strip_variations(text: str) -> str:
+    """ Returns the text with every parenthesised variation removed, including nested ones """
+    result = []
+    depth = 0
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            result.append(char)
+    return ''.join(result)
+
+
+def read_games(text: str) -> list[tuple[dict[str, str], list[list[int]], Optional[str]]]:
+    """ Reads every game in a PDN text. A game ends at its result, or where the headers of the next game begin.
+
+    Parameters:
+    - text: the contents of a PDN file.
+
+    Returns:
+    - A list holding, for each game, its headers, its moves as lists of square numbers and its result as written in
+    the game, or None if the game has no result.
+
+    >>> games = read_games('[Event "test"]\\n1. 11-15 24-20 {a comment} 2. 15-19 (2. 8-11) 1-0')
+    >>> games[0][0], games[0][1], games[0][2]
+    ({'Event': 'test'}, [[11, 15], [24, 20], [15, 19]], '1-0')
+    """
+    games = []
+    headers, moves = {}, []
+    for match in _TOKEN.finditer(_strip_variations(_COMMENT.sub(' ', text))):
+        if match.group(1) is not None:
+            if moves:
+                games.append((headers, moves, None))
+                headers, moves = {}, []
+            headers[match.group(1)] = match.group(2)
+        elif _RESULT.match(match.group(0)):
+            games.append((headers, moves, match.group(0) if match.group(0) != '*' else None))
+            headers, moves = {}, []
+        else:
+            token = match.group(0).split('.')[-1]
+            if _MOVE.match(token):
+                moves.append(parse_move(token))
+    if moves:
+        games.append((headers, moves, None))
+    return games
+
+
+def game_moves(moves: list[list[int]]) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+    """ Returns the start and end square of each move of a PDN game. Raises ValueError if a move is not legal.
+
+    Parameters:
+    - moves: the moves of the game as lists of square numbers, from the starting position with the first player,
+    white in this game, to move.
+
+    >>> game_moves([[11, 15], [23, 19], [8, 11]])
+    [((5, 2), (4, 3)), ((2, 3), (3, 2)), ((6, 1), (5, 2))]
+    >>> game_moves([[11, 15], [11, 15]])
+    Traceback (most recent call last):
+    ...
+    ValueError: move 2, 11-15, is not legal
+    """
+    board = BitBoard()
+    colour = WHITE
+    result = []
+    for ply, squares in enumerate(moves):
+        key = None
+        if all(1 <= square <= 32 for square in squares):
+            key = (SQUARE_COORDS[32 - squares[0]], SQUARE_COORDS[32 - squares[-1]])
+        for move in board.legal_moves(colour):
+            if (move[0], move[1]) == key:
+                board.make_move(move)
+                break
+        else:
+            raise ValueError(f'move {ply + 1}, {"-".join(str(square) for square in squares)}, is not legal')
+        result.append(key)
+        colour = BLACK if colour == WHITE else WHITE
+    return result
+
+
+def legal_games(text: str) -> tuple[list[tuple[list[tuple[tuple[int, int], tuple[int, int]]], Optional[int]]], int]:
+    """ Reads the games in a PDN text that have a result.
+
+    Returns:
+    - A tuple of the moves and the winner of each game with a result whose moves are all legal, as game_moves and
+    winner_of return them, and the number of games with a result that were left out because one of their moves is
+    not legal.
+
+    >>> legal_games('1. 11-15 23-19 0-1 1. 11-15 11-15 1-0 1. 11-15 *')
+    ([([((5, 2), (4, 3)), ((2, 3), (3, 2))], 1)], 1)
+    """
+    games = []
+    rejected = 0
+    for _, moves, result in read_games(text):
+        if result is None:
+            continue
+        try:
+            games.append((game_moves(moves), winner_of(result)))
+        except ValueError:
+            rejected += 1
+    return (games, rejected)
+
+
+def winner_of(result: Optional[str]) -> Optional[int]:
+    """ Returns the colour that won a game with the given PDN result, or None for a draw or an unknown result.
+
+    >>> winner_of('1-0') == WHITE
+    True
+    >>> winner_of('1/2-1/2') is None
+    True
+    """
+    if result in ('1-0', '2-0'):
+        return WHITE
+    elif result in ('0-1', '0-2'):
+        return BLACK
+    else:
+        return None
+
+
+def format_game(moves: Iterable[tuple[tuple[int, int], tuple[int, int]]], winner: Optional[int],
+                headers: Optional[dict[str, str]] = None) -> str:
+    """ Returns a game written in PDN, stopping at its first move that is not legal. A jump is written as its start
+    and end square only, such as '15x29', which read_games reads back.
+
+    Parameters:
+    - moves: the start and end square of each move of the game, from the starting position with white to move.
+    - winner: the colour that won the game, or None if it was drawn.
+    - headers: the headers to write before the moves, apart from the result, which is always written.
+
+    The trunk of the Old Fourteenth opening, as published in standard opening manuals, is written back as it was read:
+    >>> text = '''[Event "Old Fourteenth"]
+    ... [Result "1/2-1/2"]
+    ...
+    ... 1. 11-15 23-19 2. 8-11 22-17 3. 4-8 17-13 4. 15-18 24-20 5. 11-15 28-24 6. 8-11
+    ... 26-23 7. 9-14 31-26 8. 6-9 13x6 9. 2x9 1/2-1/2
+    ... '''
+    >>> (_, moves, result), = read_games(text)
+    >>> format_game(game_moves(moves), winner_of(result), {'Event': 'Old Fourteenth'}) == text
+    True
+    """
+    result = RESULTS[winner]
+    lines = [f'[{name} "{value}"]' for name, value in (headers or {}).items() if name != 'Result']
+    lines.extend([f'[Result "{result}"]', ''])
+
+    board = BitBoard()
+    colour = WHITE
+    tokens = []
+    for ply, key in enumerate(moves):
+        start, end = tuple(key[0]), tuple(key[1])
+        legal = [move for move in board.legal_moves(colour) if (move[0], move[1]) == (start, end)]
+        if not legal:
+            break
+        if ply % 2 == 0:
+            tokens.append(f'{ply // 2 + 1}.')
+        separator = 'x' if legal[0][2] else '-'
+        tokens.append(f'{32 - square_index(*start)}{separator}{32 - square_index(*end)}')
+        board.make_move(legal[0])
+        colour = BLACK if colour == WHITE else WHITE
+    tokens.append(result)
+
+    lines.append(textwrap.fill(' '.join(tokens), width=80, break_on_hyphens=False))
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['re', 'textwrap', 'bitboard', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })
@@ -0,0 +1,164 @@
+""" Checkers perft
+
+Module Description
+==================
+
+This module contains perft, which counts the move paths of a given length from a position by playing and taking back
+every move. Comparing the counts of Board and BitBoard, or of one version of the move generator with the next, checks
+that move generation is right, and timing them measures how fast it is. Divide reports the count below each root move,
+which narrows a mismatch down to the move that causes it.
+
+The rules of this game differ from English draughts: captures are not mandatory, and continued jumps keep going in
+the same direction. The counts therefore only match published English draughts perft numbers for the first two plies
+(7 and 49 from the starting position), and the counts here are the reference for this game's rules.
+
+Example, counting the paths 8 plies deep from the starting position, split by root move, across 4 processes:
+
+    python perft.py --depth 8 --divide --workers 4
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import argparse
+import multiprocessing
+import time
+from board import Board
+from bitboard import BitBoard
+from constants import *
+
+
+def perft(board: Board | BitBoard, colour: int, depth: int) -> int:
+    """ Returns the number of move paths of the given depth from board, playing and taking back moves on it.
+
+    Paths end early where a player has no moves, so they are not counted.
+
+    Parameters:
+    - board: the board to count from, which is left as it was.
+    - colour: the colour of the player to move.
+    - depth: the number of plies in each path.
+
+    Preconditions:
+    - colour in (BLACK, WHITE)
+    - depth >= 0
+
+    >>> [perft(BitBoard(), WHITE, depth) for depth in range(1, 6)]
+    [7, 49, 379, 2872, 23582]
+    >>> perft(Board(), WHITE, 4)
+    2872
+    """
+    if depth == 0:
+        return 1
+    moves = board.legal_moves(colour)
+    if depth == 1:
+        return len(moves)
+
+    opponent = WHITE if colour == BLACK else BLACK
+    total = 0
+    for move in moves:
+        undo = board.make_move(move)
+        total += perft(board, opponent, depth - 1)
+        board.unmake_move(undo)
+    return total
+
+
+def _perft_after(board: Board | BitBoard, colour: int,
+                 move: tuple[tuple[int, int], tuple[int, int]], depth: int) -> int:
+    """ Returns perft from the position after colour plays the given root move, in a worker process """
+    for legal_move in board.legal_moves(colour):
+        if (legal_move[0], legal_move[1]) == move:
+            board.make_move(legal_move)
+            break
+    return perft(board, WHITE if colour == BLACK else BLACK, depth - 1)
+
+
+def divide(board: Board | BitBoard, colour: int, depth: int,
+           workers: int = 1) -> dict[tuple[tuple[int, int], tuple[int, int]], int]:
+    """ Returns the number of move paths of the given depth that start with each move from board.
+
+    Parameters:
+    - board: the board to count from, which is left as it was.
+    - colour: the colour of the player to move.
+    - depth: the number of plies in each path.
+    - workers: the number of processes to count the root moves in, or 1 to count them in this process.
+
+    Preconditions:
+    - colour in (BLACK, WHITE)
+    - depth >= 1
+    - workers >= 1
+
+    >>> divide(BitBoard(), WHITE, 2)[((5, 0), (4, 1))]
+    7
+    """
+    moves = [(move[0], move[1]) for move in board.legal_moves(colour)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers, multiprocessing.get_context('spawn')) as executor:
+            counts = executor.map(_perft_after, [board] * len(moves), [colour] * len(moves), moves,
+                                  [depth] * len(moves))
+            return dict(zip(moves, counts))
+    return {move: _perft_after(board.__copy__(), colour, move, depth) for move in moves}
+
+
+def check(board: BitBoard, colour: int, depth: int) -> list[tuple[str, int, int]]:
+    """ Compares the divide counts of a BitBoard with those of the Board it converts to, and returns every root move
+    where they differ.
+
+    Parameters:
+    - board: the position to check.
+    - colour: the colour of the player to move.
+    - depth: the number of plies in each path.
+
+    Returns:
+    - A list holding, for each root move that does not match, the move and its counts on the BitBoard and on the
+    Board.
+
+    >>> check(BitBoard(0x3028b04, 0x700c1000), WHITE, 3)
+    []
+    """
+    bitboard_counts = divide(board, colour, depth)
+    board_counts = divide(board.to_board(), colour, depth)
+    return [(f'{move}', bitboard_counts.get(move, 0), board_counts.get(move, 0))
+            for move in sorted(set(bitboard_counts) | set(board_counts))
+            if bitboard_counts.get(move, 0) != board_counts.get(move, 0)]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Runs perft from the command line """
+    parser = argparse.ArgumentParser(description='Count checkers move paths from a position.')
+    parser.add_argument('--depth', type=int, default=6, help='the number of plies in each path')
+    parser.add_argument('--divide', action='store_true', help='print the count below each root move')
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes to count root moves in')
+    parser.add_argument('--board', action='store_true', help='count on Board instead of BitBoard')
+    parser.add_argument('--check', action='store_true', help='compare the counts of Board and BitBoard')
+    parser.add_argument('--black', type=lambda mask: int(mask, 0), default=None, help='the mask of black pieces')
+    parser.add_argument('--white', type=lambda mask: int(mask, 0), default=None, help='the mask of white pieces')
+    parser.add_argument('--kings', type=lambda mask: int(mask, 0), default=0, help='the mask of kings')
+    parser.add_argument('--black-to-move', action='store_true', help='count with black to move instead of white')
+    args = parser.parse_args(argv)
+
+    bitboard = BitBoard() if args.black is None else BitBoard(args.black, args.white or 0, args.kings)
+    colour = BLACK if args.black_to_move else WHITE
+    if args.check:
+        mismatches = check(bitboard, colour, args.depth)
+        for move, bitboard_count, board_count in mismatches:
+            print(f'{move}: BitBoard {bitboard_count}, Board {board_count}')
+        print('Board and BitBoard match' if not mismatches else f'{len(mismatches)} root moves differ')
+        return
+
+    board = bitboard.to_board() if args.board else bitboard
+    start = time.perf_counter()
+    counts = divide(board, colour, args.depth, args.workers)
+    seconds = time.perf_counter() - start
+    if args.divide:
+        for move, count in counts.items():
+            print(f'{move}: {count}')
+    total = sum(counts.values())
+    print(f'perft({args.depth}) = {total} in {seconds:.3f}s ({total / seconds if seconds else 0:.0f} paths/s)')
+
+
+if __name__ == '__main__':
+    main()
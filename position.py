@@ -0,0 +1,141 @@
+""" Checkers position encoding
+
+Module Description
+==================
+
+This module contains the binary and text forms of a position: the pieces on the board and the player to move. They
+are the key format shared by the caches, books and game corpora that store positions, and are what Board.to_bytes,
+BitBoard.to_bytes and their from_bytes, to_fen and from_fen methods use.
+
+The binary form is 12 bytes: the black, white and king masks of the position as BitBoard holds them, as three little
+endian 32-bit words. A position always has empty squares, and the king mask never includes one, so the player to move
+is stored in the king word as well: its bit for the lowest empty square is set when black is to move.
+
+The text form is the FEN of Portable Draughts Notation, such as 'W:W21,22,K30:B1,2': the player to move, then the
+squares of the white pieces and of the black pieces, numbered 1 to 32 as in pdn, with a K before each king.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+import struct
+from constants import *
+
+# The number of bytes in the binary form of a position.
+POSITION_SIZE = 12
+
+# The mask of every square.
+_FULL_MASK = (1 << 32) - 1
+
+_WORDS = struct.Struct('<III')
+
+# The letter of each colour in a FEN, and the colour of each letter.
+_FEN_LETTERS = {WHITE: 'W', BLACK: 'B'}
+_FEN_COLOURS = {'W': WHITE, 'B': BLACK}
+
+
+def encode(black: int, white: int, kings: int, colour: int) -> bytes:
+    """ Returns the binary form of a position.
+
+    Parameters:
+    - black: the mask of the squares holding black pieces.
+    - white: the mask of the squares holding white pieces.
+    - kings: the mask of the squares holding kings.
+    - colour: the colour of the player to move.
+
+    Preconditions:
+    - black & white == 0
+    - kings & ~(black | white) == 0
+    - (black | white) != (1 << 32) - 1
+    - colour in (BLACK, WHITE)
+
+    >>> encode(0b11, 0b100 << 28, 0b1, BLACK).hex()
+    '030000000000004005000000'
+    """
+    if colour == BLACK:
+        empty = _FULL_MASK ^ (black | white)
+        kings |= empty & -empty
+    return _WORDS.pack(black, white, kings)
+
+
+def decode(data: bytes) -> tuple[int, int, int, int]:
+    """ Returns the black, white and king masks and the colour to move of a position from its binary form. Raises
+    ValueError if data is not the binary form of a position.
+
+    >>> decode(encode(0b11, 0b100 << 28, 0b1, BLACK)) == (0b11, 0b100 << 28, 0b1, BLACK)
+    True
+    """
+    if len(data) != POSITION_SIZE:
+        raise ValueError(f'a position is {POSITION_SIZE} bytes, not {len(data)}')
+    black, white, kings = _WORDS.unpack(data)
+    occupied = black | white
+    if black & white or occupied == _FULL_MASK:
+        raise ValueError('not a valid position')
+    flag = kings & ~occupied
+    if flag and flag & -flag != flag:
+        raise ValueError('not a valid position')
+    return (black, white, kings & occupied, BLACK if flag else WHITE)
+
+
+def to_fen(black: int, white: int, kings: int, colour: int) -> str:
+    """ Returns the FEN of a position.
+
+    Preconditions:
+    - black & white == 0
+    - kings & ~(black | white) == 0
+    - colour in (BLACK, WHITE)
+
+    >>> to_fen(0b11, 0b100 << 28, 0b100 << 28, WHITE)
+    'W:WK31:B1,2'
+    """
+    parts = [_FEN_LETTERS[colour]]
+    for side, mask in ((WHITE, white), (BLACK, black)):
+        squares = [('K' if kings >> sq & 1 else '') + str(sq + 1) for sq in range(32) if mask >> sq & 1]
+        parts.append(_FEN_LETTERS[side] + ','.join(squares))
+    return ':'.join(parts)
+
+
+def from_fen(fen: str) -> tuple[int, int, int, int]:
+    """ Returns the black, white and king masks and the colour to move of a position from its FEN. Raises ValueError
+    if fen is not a FEN.
+
+    >>> from_fen('W:WK31:B1,2') == (0b11, 0b100 << 28, 0b100 << 28, WHITE)
+    True
+    >>> from_fen('B:W:BK5.') == (0b10000, 0, 0b10000, BLACK)
+    True
+    """
+    parts = fen.strip().rstrip('.').split(':')
+    if len(parts) != 3 or parts[0] not in _FEN_COLOURS:
+        raise ValueError(f'not a FEN: {fen!r}')
+    masks = {BLACK: 0, WHITE: 0}
+    kings = 0
+    for part in parts[1:]:
+        side = _FEN_COLOURS.get(part[:1])
+        if side is None:
+            raise ValueError(f'not a FEN: {fen!r}')
+        for token in filter(None, part[1:].split(',')):
+            king = token.startswith('K')
+            number = token[1:] if king else token
+            if not number.isdigit() or not 1 <= int(number) <= 32:
+                raise ValueError(f'not a FEN: {fen!r}')
+            bit = 1 << (int(number) - 1)
+            masks[side] |= bit
+            if king:
+                kings |= bit
+    if masks[BLACK] & masks[WHITE]:
+        raise ValueError(f'not a FEN: {fen!r}')
+    return (masks[BLACK], masks[WHITE], kings, _FEN_COLOURS[parts[0]])
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['struct', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })
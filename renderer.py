@@ -0,0 +1,275 @@
+""" Checkers renderer
+
+Module Description
+==================
+
+This module contains the functions that draw the board and its pieces with pygame. It is the only place the board and
+pieces are drawn from, so the rules and the AI never need to import pygame.
+
+The functions redraw the whole board each time they are called. BoardRenderer instead draws the empty board and each
+kind of piece once, and then repaints only the squares that changed since the last frame, returning the rectangles
+it repainted so that only those are copied to the screen.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Container, Optional
+import pygame
+from constants import *
+from board import Board
+from piece import Piece
+
+# The gap between a piece and the edge of its square, and the radius of the outline drawn around a piece.
+PADDING = 10
+OUTLINE = 45
+
+# The RGB value each piece colour is drawn in.
+PIECE_RGB = {BLACK: BLACK_RGB, WHITE: WHITE_RGB}
+
+_crown: Optional[pygame.Surface] = None
+_status_font: Optional[pygame.font.Font] = None
+
+
+def get_crown() -> pygame.Surface:
+    """ Returns the crown image drawn on kings, loading and scaling it the first time it is needed """
+    global _crown
+    if _crown is None:
+        _crown = pygame.transform.scale(pygame.image.load('crown.png'), (50, 45))
+    return _crown
+
+
+def get_status_font() -> pygame.font.Font:
+    """ Returns the font status messages are written in, creating it the first time it is needed """
+    global _status_font
+    if _status_font is None:
+        _status_font = pygame.font.SysFont('Corbel', 30)
+    return _status_font
+
+
+def draw_board(screen: pygame.Surface, board: Board) -> None:
+    """ Draws the gameboard AND the pieces on the board
+
+    Parameters:
+    - screen: a pygame surface object which will be used to display the gameboard
+    - board: the board to draw.
+
+    Preconditions:
+    - screen is an appropriate pygame surface object
+    """
+    draw_squares(screen)
+    draw_pieces(screen, board.board)
+
+
+def draw_squares(screen: pygame.Surface, dark: tuple[int, int, int] = DARK_BROWN,
+                 light: tuple[int, int, int] = LIGHT_BROWN) -> None:
+    """ Draws the squares on the gameboard WITHOUT any pieces
+
+    Parameters:
+    - screen: a pygame surface object which will be used to display the gameboard
+    - dark: the colour of the playable squares.
+    - light: the colour of the other squares.
+
+    Preconditions:
+    - screen is an appropriate pygame surface object
+    """
+    screen.fill(dark)
+    for row in range(ROWS):
+        for col in range(row % 2, ROWS, 2):
+            pygame.draw.rect(screen, light, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+
+
+def draw_pieces(screen: pygame.Surface, board: list[list[Piece | int]]) -> None:
+    """ Draws every piece in a matrix of pieces
+
+    Parameters:
+    - screen: a pygame surface object which will be used to display the pieces
+    - board: a matrix of pieces objects or 0 if a piece does not exist.
+
+    Preconditions:
+    - screen is an appropriate pygame surface object
+    """
+    for row in board:
+        for piece in row:
+            if piece != 0:
+                draw_piece(screen, piece)
+
+
+def piece_centre(piece: Piece) -> tuple[int, int]:
+    """ Returns the x,y-coordinates of the centre of a piece on the screen
+
+    >>> piece_centre(Piece(2, 3, BLACK))
+    (350, 250)
+    """
+    return (SQUARE_SIZE * piece.col + SQUARE_SIZE // 2, SQUARE_SIZE * piece.row + SQUARE_SIZE // 2)
+
+
+def draw_piece(screen: pygame.Surface, piece: Piece) -> None:
+    """ Draws the piece of the screen
+
+    Parameters:
+    - screen: The pygame surface object to draw the piece on.
+    - piece: The piece to draw.
+
+    Preconditions:
+    - screen is a valid pygame surface object.
+    """
+    _paint_piece(screen, piece.colour, piece.is_king, piece_centre(piece))
+
+
+def _paint_piece(surface: pygame.Surface, colour: int, is_king: bool, centre: tuple[int, int]) -> None:
+    """ Paints a piece of the given colour, and a crown if it is a king, centred on the given point of the surface """
+    pygame.draw.circle(surface, GREY, centre, OUTLINE)
+    pygame.draw.circle(surface, PIECE_RGB[colour], centre, SQUARE_SIZE // 2 - PADDING)
+
+    if is_king:
+        crown = get_crown()
+        surface.blit(crown, (centre[0] - crown.get_width() // 2, centre[1] - crown.get_height() // 2))
+
+
+def draw_status(screen: pygame.Surface, text: str) -> None:
+    """ Writes a status message, such as that the AI is thinking, on a grey banner across the top of the screen
+
+    Parameters:
+    - screen: the pygame surface object to write the message on.
+    - text: the message to write.
+
+    Preconditions:
+    - screen is a valid pygame surface object.
+    """
+    rendered, banner = _status_banner(screen, text)
+    pygame.draw.rect(screen, GREY, banner)
+    screen.blit(rendered, rendered.get_rect(center=banner.center))
+
+
+def _status_banner(screen: pygame.Surface, text: str) -> tuple[pygame.Surface, pygame.Rect]:
+    """ Returns a status message rendered as text, and the rectangle of the banner it is written on """
+    rendered = get_status_font().render(text, True, BLACK_RGB)
+    return (rendered, rendered.get_rect(center=(screen.get_width() // 2, SQUARE_SIZE // 2)).inflate(20, 10))
+
+
+def _squares_under(rect: pygame.Rect) -> list[tuple[int, int]]:
+    """ Returns the row and column of every square that a rectangle on the screen overlaps
+
+    >>> _squares_under(pygame.Rect(90, 10, 120, 50))
+    [(0, 0), (0, 1), (0, 2)]
+    """
+    rows = range(max(rect.top // SQUARE_SIZE, 0), min((rect.bottom - 1) // SQUARE_SIZE + 1, ROWS))
+    cols = range(max(rect.left // SQUARE_SIZE, 0), min((rect.right - 1) // SQUARE_SIZE + 1, COLS))
+    return [(row, col) for row in rows for col in cols]
+
+
+# @check_contracts
+class BoardRenderer:
+    """ Draws a board, the highlighted squares and a status message, repainting only what changed since the last frame.
+
+    The empty board is drawn once into a cached background, and each kind of piece once into a sprite, so repainting
+    a square is a blit of the background and at most one sprite.
+
+    Private Instance Attributes:
+    - _background: the empty board, or None before the first frame.
+    - _sprites: the sprite of each kind of piece, keyed by its colour and whether it is a king.
+    - _squares: what was drawn on each square in the last frame, keyed by its row and column, as the colour and
+    kingship of its piece, or None if it was empty, and whether it was highlighted. It is empty before the first frame.
+    - _status: the status message drawn in the last frame, or None if there was none.
+    - _banner: the rendered text and banner rectangle of self._status, or None if there was no status message.
+    """
+    _background: Optional[pygame.Surface]
+    _sprites: dict[tuple[int, bool], pygame.Surface]
+    _squares: dict[tuple[int, int], tuple[Optional[tuple[int, bool]], bool]]
+    _status: Optional[str]
+    _banner: Optional[tuple[pygame.Surface, pygame.Rect]]
+
+    def __init__(self) -> None:
+        """ Initializes a renderer that has not drawn a frame yet """
+        self._background = None
+        self._sprites = {}
+        self._squares = {}
+        self._status = None
+        self._banner = None
+
+    def invalidate(self) -> None:
+        """ Makes the next frame repaint the whole screen, for when something else has drawn over it """
+        self._squares = {}
+        self._status = None
+        self._banner = None
+
+    def _prepare(self, screen: pygame.Surface) -> None:
+        """ Draws the empty board and the sprite of each kind of piece in the pixel format of the screen """
+        self._background = pygame.Surface(screen.get_size()).convert(screen)
+        draw_squares(self._background)
+        for colour in (BLACK, WHITE):
+            for is_king in (False, True):
+                sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA).convert_alpha(screen)
+                sprite.fill((0, 0, 0, 0))
+                _paint_piece(sprite, colour, is_king, (SQUARE_SIZE // 2, SQUARE_SIZE // 2))
+                self._sprites[(colour, is_king)] = sprite
+
+    def draw(self, screen: pygame.Surface, board: Board, highlighted: Container[tuple[int, int]] = (),
+             status: Optional[str] = None) -> list[pygame.Rect]:
+        """ Repaints the squares of the screen that changed since the last frame and returns their rectangles, to be
+        passed to pygame.display.update. The first frame, or the first after self.invalidate, repaints the whole screen.
+
+        Parameters:
+        - screen: the pygame surface object to draw on, which must be the same surface every frame.
+        - board: the board to draw.
+        - highlighted: the row and column of each square to highlight, such as the squares the selected piece can
+        move to.
+        - status: a message to write on a banner across the top of the screen, or None for none.
+
+        Preconditions:
+        - screen is a valid pygame surface object.
+        """
+        if self._background is None:
+            self._prepare(screen)
+
+        squares = {}
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board.board[row][col]
+                squares[(row, col)] = (None if piece == 0 else (piece.colour, piece.is_king),
+                                       (row, col) in highlighted)
+
+        full = not self._squares
+        dirty = {square for square, drawn in squares.items() if self._squares.get(square) != drawn}
+        if status != self._status:
+            if self._banner is not None:
+                dirty.update(_squares_under(self._banner[1]))
+            self._banner = None if status is None else _status_banner(screen, status)
+            self._status = status
+            redraw_banner = self._banner is not None
+        else:
+            redraw_banner = self._banner is not None and not dirty.isdisjoint(_squares_under(self._banner[1]))
+        self._squares = squares
+
+        rects = []
+        for row, col in dirty:
+            rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+            screen.blit(self._background, rect, rect)
+            piece, is_highlighted = squares[(row, col)]
+            if is_highlighted:
+                screen.fill(LIGHT_RED, rect)
+            if piece is not None:
+                screen.blit(self._sprites[piece], rect)
+            rects.append(rect)
+
+        if redraw_banner:
+            rendered, banner = self._banner
+            pygame.draw.rect(screen, GREY, banner)
+            screen.blit(rendered, rendered.get_rect(center=banner.center))
+            rects.append(banner)
+        return [screen.get_rect()] if full else rects
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['pygame', 'board', 'piece', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import', 'no-member', 'global-statement']
+    })
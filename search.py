@@ -0,0 +1,302 @@
+""" Checkers alpha-beta search
+
+Module Description
+==================
+
+This module contains a negamax search with alpha-beta pruning that the AI can use instead of building and averaging a
+full GameTree. It returns the best move and its score without keeping the positions it visited, playing and taking
+back moves on the one board it is given rather than copying it at every node.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Optional
+import threading
+import time
+from board import Board
+from bitboard import BitBoard
+from evaluation import Evaluator, MaterialEvaluator
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from zobrist import side_key
+from stats import SearchStats
+from constants import *
+
+# The score of a position where the player to move has no moves left.
+WIN_SCORE = 1000
+
+# The deepest an iterative deepening search will go, however much time it has left.
+MAX_DEPTH = 64
+
+# How many nodes are visited between checks of the clock.
+_CLOCK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """ Raised inside a search when it runs past its deadline """
+
+
+# @check_contracts
+class AlphaBetaSearch:
+    """ A negamax search with alpha-beta pruning.
+
+    Moves are tried captures first, then the best move stored for the position in the transposition table, or
+    failing that the best move found at the same ply by the previous search, then the rest in the order the board
+    generates them.
+
+    Instance Attributes:
+    - nodes: the number of positions visited by the last search.
+    - completed_depth: the depth of the last search that ran to completion.
+    - transposition_table: the table of earlier search results consulted by the search, or None to not use one.
+    - stats: the collector the search records its statistics in, or None to not record any.
+    - stop_event: an event that another thread can set to stop the search as if it ran out of time, or None.
+    - evaluator: the evaluator that scores the positions at the end of the search.
+
+    Private Instance Attributes:
+    - _previous_best: maps a ply to the best move found at that ply by the most recent search.
+    - _deadline: the time.perf_counter() value at which the running search gives up, or None if it has no deadline.
+    """
+    nodes: int
+    completed_depth: int
+    transposition_table: Optional[TranspositionTable]
+    stats: Optional[SearchStats]
+    stop_event: Optional[threading.Event]
+    evaluator: Evaluator
+    _previous_best: dict[int, tuple[tuple[int, int], tuple[int, int]]]
+    _deadline: Optional[float]
+
+    def __init__(self, transposition_table: Optional[TranspositionTable] = None,
+                 evaluator: Optional[Evaluator] = None) -> None:
+        """ Initializes a new search, scoring positions with the given evaluator or by counting material """
+        self.nodes = 0
+        self.completed_depth = 0
+        self.transposition_table = transposition_table
+        self.stats = None
+        self.stop_event = None
+        self.evaluator = evaluator if evaluator is not None else MaterialEvaluator()
+        self._previous_best = {}
+        self._deadline = None
+
+    def iterative_deepening(self, board: Board | BitBoard, colour: int,
+                            time_budget_ms: Optional[int], max_depth: int = MAX_DEPTH) \
+            -> tuple[Optional[tuple[tuple[int, int], tuple[int, int]]], float]:
+        """ Searches the given board one ply deeper at a time until the time budget runs out, and returns the best
+        move found by the last search that completed along with its score.
+
+        The first ply is always searched in full, so a move is returned even if the budget is too small for it. If the
+        transposition table already holds an exact score and move for the board, such as one left by pondering, the
+        search starts one ply deeper than that score's depth instead.
+
+        Parameters:
+        - board: the board to search, either a Board or a BitBoard.
+        - colour: the colour of the player to move.
+        - time_budget_ms: the number of milliseconds the search may take, or None to search until max_depth is
+        reached or self.stop_event is set.
+        - max_depth: the deepest the search will go.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        - time_budget_ms is None or time_budget_ms >= 0
+        - max_depth >= 1
+        """
+        deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
+        table = self.transposition_table
+        entry = table.probe(board.zobrist ^ side_key(colour)) if table is not None else None
+        if entry is not None and entry[2] == EXACT and entry[3] is not None \
+                and any((move[0], move[1]) == entry[3] for move in board.legal_moves(colour)):
+            result = (entry[3], entry[1])
+            self.completed_depth = min(entry[0], max_depth)
+        else:
+            result = self.search(board, colour, 1)
+            self.completed_depth = 1
+
+        for depth in range(self.completed_depth + 1, max_depth + 1):
+            if (deadline is not None and time.perf_counter() >= deadline) or abs(result[1]) >= WIN_SCORE \
+                    or self._stop_requested():
+                break
+            try:
+                result = self.search(board, colour, depth, deadline)
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+
+        return result
+
+    def search(self, board: Board | BitBoard, colour: int, depth: int,
+               deadline: Optional[float] = None) -> tuple[Optional[tuple[tuple[int, int], tuple[int, int]]], float]:
+        """ Searches the given board and returns the best move for colour along with its score.
+
+        Parameters:
+        - board: the board to search, either a Board or a BitBoard.
+        - colour: the colour of the player to move.
+        - depth: the number of plies to search.
+        - deadline: the time.perf_counter() value at which to raise SearchTimeout, or None to search to completion.
+
+        Returns:
+        - A tuple of the best move, or None if colour has no moves, and its score from colour's point of view.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        - depth >= 1
+        """
+        self.nodes = 1
+        self._deadline = deadline
+        if self.stats is not None:
+            self.stats.count_node(0)
+        table = self.transposition_table
+        key = board.zobrist ^ side_key(colour)
+        entry = table.probe(key) if table is not None else None
+
+        moves = self._ordered(board, colour, 0, entry[3] if entry is not None else None)
+        if not moves:
+            return (None, -WIN_SCORE - depth)
+
+        opponent = WHITE if colour == BLACK else BLACK
+        alpha, beta = -WIN_SCORE - depth - 1, WIN_SCORE + depth + 1
+        best_move, best_score = (moves[0][0], moves[0][1]), alpha
+        for move in moves:
+            undo = board.make_move(move)
+            try:
+                score = -self._negamax(board, opponent, depth - 1, 1, -beta, -alpha)
+            finally:
+                board.unmake_move(undo)
+            if score > best_score:
+                best_move, best_score = (move[0], move[1]), score
+                alpha = max(alpha, score)
+
+        self._previous_best[0] = best_move
+        if table is not None:
+            table.store(key, depth, best_score, EXACT, best_move)
+        return (best_move, best_score)
+
+    def _negamax(self, board: Board | BitBoard, colour: int, depth: int, ply: int,
+                 alpha: float, beta: float) -> float:
+        """ Returns the score of board from colour's point of view, searched to the given depth.
+
+        Parameters:
+        - board: the board to search.
+        - colour: the colour of the player to move.
+        - depth: the number of plies left to search.
+        - ply: the number of plies between this board and the root of the search.
+        - alpha: the score colour is already guaranteed elsewhere in the search.
+        - beta: the score the opponent is already guaranteed elsewhere in the search.
+        """
+        self.nodes += 1
+        if self.nodes % _CLOCK_INTERVAL == 0 and (self._stop_requested() or (
+                self._deadline is not None and time.perf_counter() >= self._deadline)):
+            raise SearchTimeout
+        stats = self.stats
+        if stats is not None:
+            stats.count_node(ply)
+
+        if depth == 0:
+            if stats is None:
+                score = self.evaluator.evaluate(board)
+            else:
+                start = time.perf_counter()
+                score = self.evaluator.evaluate(board)
+                stats.eval_seconds += time.perf_counter() - start
+            return score if colour == BLACK else -score
+
+        table = self.transposition_table
+        key = board.zobrist ^ side_key(colour)
+        tt_move = None
+        if table is not None:
+            entry = table.probe(key)
+            if entry is not None:
+                entry_depth, entry_score, bound, tt_move = entry
+                if entry_depth >= depth and (bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta)
+                                             or (bound == UPPER_BOUND and entry_score <= alpha)):
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return entry_score
+
+        if stats is None:
+            moves = self._ordered(board, colour, ply, tt_move)
+        else:
+            start = time.perf_counter()
+            moves = self._ordered(board, colour, ply, tt_move)
+            stats.movegen_seconds += time.perf_counter() - start
+        if not moves:
+            return -WIN_SCORE - depth
+        original_alpha = alpha
+
+        opponent = WHITE if colour == BLACK else BLACK
+        best_move, best_score = None, -WIN_SCORE - depth - 1
+        for move in moves:
+            if stats is None:
+                undo = board.make_move(move)
+                try:
+                    score = -self._negamax(board, opponent, depth - 1, ply + 1, -beta, -alpha)
+                finally:
+                    board.unmake_move(undo)
+            else:
+                score = -self._timed_child(board, move, opponent, depth, ply, alpha, beta)
+            if score > best_score:
+                best_move, best_score = (move[0], move[1]), score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if stats is not None:
+                            stats.cutoffs += 1
+                        break
+
+        self._previous_best[ply] = best_move
+        if table is not None:
+            if best_score <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            table.store(key, depth, best_score, bound, best_move)
+        return best_score
+
+    def _stop_requested(self) -> bool:
+        """ Returns whether another thread has asked the search to stop """
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _timed_child(self, board: Board | BitBoard, move: tuple, colour: int, depth: int, ply: int,
+                     alpha: float, beta: float) -> float:
+        """ Helper function for self._negamax when statistics are recorded. Plays a move, searches the position it
+        leads to from the point of view of colour, the player to move after it, and takes the move back, adding the
+        time spent playing and taking back the move to self.stats.
+        """
+        start = time.perf_counter()
+        undo = board.make_move(move)
+        self.stats.copy_seconds += time.perf_counter() - start
+        try:
+            return self._negamax(board, colour, depth - 1, ply + 1, -beta, -alpha)
+        finally:
+            start = time.perf_counter()
+            board.unmake_move(undo)
+            self.stats.copy_seconds += time.perf_counter() - start
+
+    def _ordered(self, board: Board | BitBoard, colour: int, ply: int,
+                 tt_move: Optional[tuple[tuple[int, int], tuple[int, int]]]) -> list[tuple]:
+        """ Returns the legal moves on board for colour, ordered captures first and then the best move from the
+        transposition table or the previous search.
+
+        Parameters:
+        - board: the board to generate moves on.
+        - colour: the colour of the player to move.
+        - ply: the number of plies between this board and the root of the search.
+        - tt_move: the best move stored for board in the transposition table, or None if there is none.
+        """
+        previous_best = tt_move if tt_move is not None else self._previous_best.get(ply)
+        return sorted(board.legal_moves(colour), key=lambda m: (not m[2], (m[0], m[1]) != previous_best))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['threading', 'time', 'board', 'bitboard', 'evaluation', 'transposition', 'zobrist', 'stats',
+                          'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })
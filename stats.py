@@ -0,0 +1,160 @@
+""" Checkers search statistics
+
+Module Description
+==================
+
+This module contains a collector for statistics about how the AI chose a move: the positions it visited at each ply,
+how fast it visited them, how often the search was cut off, how useful the transposition table was, and how its time
+was split between generating moves, playing them and evaluating positions.
+
+Searches only record statistics when they are given a collector, so they cost nothing when none is used.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Any, Optional
+import json
+import time
+from transposition import TranspositionTable
+
+
+# @check_contracts
+class SearchStats:
+    """ Statistics about the search for one move.
+
+    Instance Attributes:
+    - source: how the move was chosen, such as 'alphabeta', 'average', 'book' or 'tablebase'.
+    - depth: the depth of the deepest search that completed.
+    - nodes_by_ply: the number of positions visited at each ply from the root.
+    - cutoffs: the number of positions whose search stopped early because a move was too good for the opponent to allow.
+    - tt_cutoffs: the number of positions whose score was taken from the transposition table without searching them.
+    - tt_probes: the number of transposition table lookups.
+    - tt_hits: the number of transposition table lookups that found their position.
+    - movegen_seconds: the time spent generating moves.
+    - copy_seconds: the time spent copying boards and playing and taking back moves.
+    - eval_seconds: the time spent evaluating positions.
+    - elapsed_seconds: the time between self.start and self.stop.
+
+    Private Instance Attributes:
+    - _start_time: the time.perf_counter() value when self.start was called.
+    - _start_tt: the transposition table's probes and hits when self.start was called.
+
+    Representation Invariants:
+    - self.tt_hits <= self.tt_probes
+    - all(count >= 0 for count in self.nodes_by_ply)
+    """
+    source: str
+    depth: int
+    nodes_by_ply: list[int]
+    cutoffs: int
+    tt_cutoffs: int
+    tt_probes: int
+    tt_hits: int
+    movegen_seconds: float
+    copy_seconds: float
+    eval_seconds: float
+    elapsed_seconds: float
+    _start_time: float
+    _start_tt: tuple[int, int]
+
+    def __init__(self) -> None:
+        """ Initializes an empty collector """
+        self.source = ''
+        self.depth = 0
+        self.nodes_by_ply = []
+        self.cutoffs = 0
+        self.tt_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.movegen_seconds = 0.0
+        self.copy_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.elapsed_seconds = 0.0
+        self._start_time = 0.0
+        self._start_tt = (0, 0)
+
+    def start(self, table: Optional[TranspositionTable] = None) -> None:
+        """ Starts the clock, and remembers the statistics of the transposition table the search will use, if any """
+        self._start_time = time.perf_counter()
+        if table is not None:
+            self._start_tt = (table.probes, table.hits)
+
+    def stop(self, table: Optional[TranspositionTable] = None) -> None:
+        """ Stops the clock, and records the lookups made in the transposition table since self.start """
+        self.elapsed_seconds = time.perf_counter() - self._start_time
+        if table is not None:
+            self.tt_probes = table.probes - self._start_tt[0]
+            self.tt_hits = table.hits - self._start_tt[1]
+
+    def count_node(self, ply: int) -> None:
+        """ Counts a position visited at the given ply
+
+        >>> stats = SearchStats()
+        >>> for ply in (0, 1, 1, 2):
+        ...     stats.count_node(ply)
+        >>> stats.nodes_by_ply
+        [1, 2, 1]
+        """
+        while len(self.nodes_by_ply) <= ply:
+            self.nodes_by_ply.append(0)
+        self.nodes_by_ply[ply] += 1
+
+    @property
+    def nodes(self) -> int:
+        """ The number of positions visited """
+        return sum(self.nodes_by_ply)
+
+    @property
+    def nodes_per_second(self) -> float:
+        """ The number of positions visited per second, or 0.0 if no time was recorded """
+        return self.nodes / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def branching_factors(self) -> list[float]:
+        """ Returns the effective branching factor at each ply: the positions visited at the next ply for each one
+        visited at this ply.
+
+        >>> stats = SearchStats()
+        >>> stats.nodes_by_ply = [1, 7, 21]
+        >>> stats.branching_factors()
+        [7.0, 3.0]
+        """
+        return [after / before for before, after in zip(self.nodes_by_ply, self.nodes_by_ply[1:]) if before]
+
+    def to_dict(self) -> dict[str, Any]:
+        """ Returns the statistics as a dictionary that can be written as JSON """
+        return {
+            'source': self.source,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'nodes_per_second': round(self.nodes_per_second, 1),
+            'nodes_by_ply': self.nodes_by_ply,
+            'branching_factors': [round(factor, 3) for factor in self.branching_factors()],
+            'cutoffs': self.cutoffs,
+            'tt_cutoffs': self.tt_cutoffs,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'seconds': {
+                'total': round(self.elapsed_seconds, 6),
+                'movegen': round(self.movegen_seconds, 6),
+                'copy': round(self.copy_seconds, 6),
+                'eval': round(self.eval_seconds, 6)
+            }
+        }
+
+    def to_json(self) -> str:
+        """ Returns the statistics as a JSON string """
+        return json.dumps(self.to_dict())
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['json', 'time', 'transposition'],
+        'max-line-length': 120
+    })
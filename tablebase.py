@@ -0,0 +1,553 @@
+""" Checkers endgame tablebases
+
+Module Description
+==================
+
+This module contains a generator and a reader for endgame tablebases: files holding the exact result of every position
+with only a few pieces left, and how many plies it takes to reach it with best play. They are generated by retrograde
+analysis with the rules of BitBoard, which are the same as the rules of Board.
+
+Positions are grouped by their material signature, the number of black men, black kings, white men and white kings.
+Each signature is stored in its own file, holding one byte per position for each player to move. The byte of a
+position is found by a perfect index computed from the squares its pieces stand on, so a probe reads a single byte of
+a memory-mapped file and never loads the whole file.
+
+Example, generating every tablebase with up to 4 pieces into the tablebases directory:
+
+    python tablebase.py --pieces 4 --out tablebases
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Optional
+import argparse
+import mmap
+import os
+import re
+import struct
+import time
+from constants import *
+from board import Board
+from bitboard import BitBoard, SQUARES, _STEP
+
+# The results a probe can return, from the point of view of the player to move.
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# How results are stored: a draw is 0, a win in n plies is WIN_BASE + n, a loss in n plies is LOSS_BASE + n, and an
+# index that does not stand for a legal position is INVALID.
+WIN_BASE = 1
+LOSS_BASE = 128
+INVALID = 255
+MAX_DISTANCE = LOSS_BASE - WIN_BASE - 1
+
+# Each file starts with a magic number, a version and its signature, followed by the bytes of the positions with
+# black to move and then the bytes of the positions with white to move.
+MAGIC = b'CKTB'
+VERSION = 1
+_HEADER = struct.Struct('<4sB4BI')
+_FILE_NAME = re.compile(r'^(\d)(\d)(\d)(\d)\.cktb$')
+
+# Men never stand on the row they would be promoted on, so black men have 28 squares to stand on and white men have
+# the 28 squares from index 4 onwards.
+_MAN_SQUARES = SQUARES - 4
+
+_BINOMIAL = [[0] * (SQUARES + 1) for _ in range(SQUARES + 1)]
+for _n in range(SQUARES + 1):
+    _BINOMIAL[_n][0] = 1
+    for _k in range(1, _n + 1):
+        _BINOMIAL[_n][_k] = _BINOMIAL[_n - 1][_k - 1] + _BINOMIAL[_n - 1][_k]
+
+
+def _squares(mask: int) -> list[int]:
+    """ Returns the squares in a mask in increasing order """
+    squares = []
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        squares.append(low.bit_length() - 1)
+    return squares
+
+
+def _rank(squares: list[int]) -> int:
+    """ Returns the index of a set of squares among all sets of the same size, in the combinatorial number system.
+
+    Preconditions:
+    - squares is sorted in increasing order
+
+    >>> [_rank(squares) for squares in ([0, 1], [0, 2], [1, 2], [0, 3])]
+    [0, 1, 2, 3]
+    """
+    return sum(_BINOMIAL[sq][i + 1] for i, sq in enumerate(squares))
+
+
+def _unrank(rank: int, count: int) -> list[int]:
+    """ Returns the set of count squares whose index is rank, the inverse of _rank.
+
+    >>> _unrank(3, 2)
+    [0, 3]
+    """
+    squares = []
+    for k in range(count, 0, -1):
+        sq = k - 1
+        while _BINOMIAL[sq + 1][k] <= rank:
+            sq += 1
+        rank -= _BINOMIAL[sq][k]
+        squares.append(sq)
+    squares.reverse()
+    return squares
+
+
+def _compress(sq: int, occupied: int) -> int:
+    """ Returns the index of square sq among the squares not in occupied """
+    return sq - (occupied & ((1 << sq) - 1)).bit_count()
+
+
+def _expand(index: int, occupied: int) -> int:
+    """ Returns the square whose index among the squares not in occupied is index, the inverse of _compress """
+    for sq in range(SQUARES):
+        if not occupied >> sq & 1:
+            if index == 0:
+                return sq
+            index -= 1
+    raise ValueError('index is past the last free square')
+
+
+def signature_of(board: BitBoard) -> tuple[int, int, int, int]:
+    """ Returns the material signature of a position: its number of black men, black kings, white men and white kings
+
+    >>> signature_of(BitBoard(0b11, 1 << 31, 1 << 31))
+    (2, 0, 0, 1)
+    """
+    return ((board.black & ~board.kings).bit_count(), board.black_kings,
+            (board.white & ~board.kings).bit_count(), board.white_kings)
+
+
+def signatures(max_pieces: int) -> list[tuple[int, int, int, int]]:
+    """ Returns every signature with both colours on the board and at most max_pieces pieces, ordered so that any
+    capture or promotion leads to a signature earlier in the list.
+
+    >>> signatures(2)
+    [(0, 1, 0, 1), (0, 1, 1, 0), (1, 0, 0, 1), (1, 0, 1, 0)]
+    """
+    result = []
+    for black_men in range(max_pieces):
+        for black_kings in range(max_pieces - black_men):
+            for white_men in range(max_pieces):
+                for white_kings in range(max_pieces - white_men):
+                    signature = (black_men, black_kings, white_men, white_kings)
+                    if black_men + black_kings >= 1 and white_men + white_kings >= 1 and sum(signature) <= max_pieces:
+                        result.append(signature)
+    result.sort(key=lambda s: (sum(s), s[0] + s[2], s))
+    return result
+
+
+def table_size(signature: tuple[int, int, int, int]) -> int:
+    """ Returns the number of indices of a signature for each player to move.
+
+    >>> table_size((1, 0, 1, 0))
+    784
+    """
+    black_men, black_kings, white_men, white_kings = signature
+    free = SQUARES - black_men - white_men
+    return (_BINOMIAL[_MAN_SQUARES][black_men] * _BINOMIAL[_MAN_SQUARES][white_men]
+            * _BINOMIAL[free][black_kings] * _BINOMIAL[free - black_kings][white_kings])
+
+
+def position_index(signature: tuple[int, int, int, int], black: int, white: int, kings: int) -> int:
+    """ Returns the index of a position within its signature.
+
+    Black men are placed on the squares black men can stand on, then white men on the squares white men can stand on,
+    then black kings on the squares left free by the men and white kings on the squares left free by every other
+    piece.
+
+    Preconditions:
+    - signature == signature_of(BitBoard(black, white, kings))
+
+    >>> position_index((1, 0, 1, 0), 1 << 27, 1 << 4, 0)
+    756
+    """
+    black_men, black_kings, white_men, _ = signature
+    free = SQUARES - black_men - white_men
+    men = (black | white) & ~kings
+    king_squares = black & kings
+
+    index = _rank(_squares(black & ~kings))
+    index = index * _BINOMIAL[_MAN_SQUARES][white_men] + _rank([sq - 4 for sq in _squares(white & ~kings)])
+    index = index * _BINOMIAL[free][black_kings] + _rank([_compress(sq, men) for sq in _squares(king_squares)])
+    index = (index * _BINOMIAL[free - black_kings][signature[3]]
+             + _rank([_compress(sq, men | king_squares) for sq in _squares(white & kings)]))
+    return index
+
+
+def position_from_index(signature: tuple[int, int, int, int], index: int) -> Optional[tuple[int, int, int]]:
+    """ Returns the black, white and king masks of the position with the given index within a signature, or None if
+    the index places a black man and a white man on the same square.
+
+    Preconditions:
+    - 0 <= index < table_size(signature)
+
+    >>> position_from_index((1, 0, 1, 0), 756) == (1 << 27, 1 << 4, 0)
+    True
+    >>> position_from_index((1, 0, 1, 0), 112) is None
+    True
+    """
+    black_men, black_kings, white_men, white_kings = signature
+    free = SQUARES - black_men - white_men
+    index, white_king_rank = divmod(index, _BINOMIAL[free - black_kings][white_kings])
+    index, black_king_rank = divmod(index, _BINOMIAL[free][black_kings])
+    black_man_rank, white_man_rank = divmod(index, _BINOMIAL[_MAN_SQUARES][white_men])
+
+    black = sum(1 << sq for sq in _unrank(black_man_rank, black_men))
+    white = sum(1 << (sq + 4) for sq in _unrank(white_man_rank, white_men))
+    if black & white:
+        return None
+
+    men = black | white
+    king_squares = sum(1 << _expand(sq, men) for sq in _unrank(black_king_rank, black_kings))
+    occupied = men | king_squares
+    white_kings_mask = sum(1 << _expand(sq, occupied) for sq in _unrank(white_king_rank, white_kings))
+    return (black | king_squares, white | white_kings_mask, king_squares | white_kings_mask)
+
+
+def decode(value: int) -> tuple[int, int]:
+    """ Returns the result and the distance in plies stored in a tablebase byte.
+
+    Preconditions:
+    - value != INVALID
+
+    >>> decode(0), decode(WIN_BASE + 3), decode(LOSS_BASE + 4)
+    ((0, 0), (1, 3), (-1, 4))
+    """
+    if value == DRAW:
+        return (DRAW, 0)
+    elif value < LOSS_BASE:
+        return (WIN, value - WIN_BASE)
+    else:
+        return (LOSS, value - LOSS_BASE)
+
+
+def _terminal_value(board: BitBoard, colour: int) -> Optional[int]:
+    """ Returns the byte of a position that is over according to Board.get_winner, or None if the game goes on """
+    winner = board.get_winner()
+    if winner is None:
+        return None
+    return WIN_BASE if winner == colour else LOSS_BASE
+
+
+def _is_quiet(board: BitBoard, move: tuple[tuple[int, int], tuple[int, int], int]) -> bool:
+    """ Returns whether a move keeps the signature of the board, by neither capturing nor promoting """
+    if move[2]:
+        return False
+    start_row, start_col = move[0]
+    return bool(board.kings >> (start_row * 4 + start_col // 2) & 1) or move[1][0] not in (0, ROWS - 1)
+
+
+def _predecessors(signature: tuple[int, int, int, int], position: tuple[int, int, int],
+                  colour: int) -> list[int]:
+    """ Returns the indices of the positions colour could have made a quiet move from to reach position.
+
+    Parameters:
+    - signature: the signature of the position.
+    - position: the black, white and king masks of the position.
+    - colour: the colour of the player who made the move.
+    """
+    black, white, kings = position
+    occupied = black | white
+    result = []
+    for sq in _squares(black if colour == BLACK else white):
+        if kings >> sq & 1:
+            directions = (0, 1, 2, 3)
+        else:
+            directions = (0, 1) if colour == BLACK else (2, 3)
+        for d in directions:
+            origin = _STEP[sq][d]
+            if origin != -1 and not occupied >> origin & 1:
+                moved = (1 << sq) | (1 << origin)
+                if colour == BLACK:
+                    previous = (black ^ moved, white, kings ^ moved if kings >> sq & 1 else kings)
+                else:
+                    previous = (black, white ^ moved, kings ^ moved if kings >> sq & 1 else kings)
+                result.append(position_index(signature, *previous))
+    return result
+
+
+def _solve(signature: tuple[int, int, int, int],
+           solved: dict[tuple[int, int, int, int], tuple[bytes, bytes]]) -> tuple[bytearray, bytearray]:
+    """ Solves every position of a signature by retrograde analysis.
+
+    Every position is first scored from its moves that capture or promote, which lead to signatures that are already
+    solved. Results are then passed back through quiet moves in order of distance: a position is won as soon as one
+    of its moves reaches a lost position, and lost once every one of its moves reaches a won position. Positions left
+    unresolved at the end are draws.
+
+    Parameters:
+    - signature: the signature to solve.
+    - solved: the tables of every signature a capture or promotion from this signature can lead to.
+
+    Returns:
+    - The tables of the signature, with black to move and with white to move.
+    """
+    size = table_size(signature)
+    colours = (BLACK, WHITE)
+    values = (bytearray(size), bytearray(size))
+    remaining = (bytearray(size), bytearray(size))
+    longest = (bytearray(size), bytearray(size))
+    escapes = (bytearray(size), bytearray(size))
+    buckets = {}
+    terminals = []
+
+    for side, colour in enumerate(colours):
+        opponent = colours[1 - side]
+        for index in range(size):
+            position = position_from_index(signature, index)
+            if position is None:
+                values[side][index] = INVALID
+                continue
+            board = BitBoard(*position)
+            terminal = _terminal_value(board, colour)
+            if terminal is not None:
+                values[side][index] = terminal
+                terminals.append((side, index, 0))
+                continue
+
+            quiet = 0
+            best_win = None
+            for move in board.legal_moves(colour):
+                if _is_quiet(board, move):
+                    quiet += 1
+                    continue
+                undo = board.make_move(move)
+                value = _terminal_value(board, opponent)
+                if value is None:
+                    child = signature_of(board)
+                    value = solved[child][1 - side][position_index(child, board.black, board.white, board.kings)]
+                board.unmake_move(undo)
+
+                if value == DRAW:
+                    escapes[side][index] = 1
+                elif value >= LOSS_BASE:
+                    escapes[side][index] = 1
+                    distance = value - LOSS_BASE + 1
+                    best_win = distance if best_win is None else min(best_win, distance)
+                else:
+                    longest[side][index] = max(longest[side][index], value - WIN_BASE)
+
+            remaining[side][index] = quiet
+            if best_win is not None:
+                buckets.setdefault(best_win, []).append((side, index, WIN_BASE + best_win))
+            elif quiet == 0 and not escapes[side][index]:
+                distance = longest[side][index] + 1
+                buckets.setdefault(distance, []).append((side, index, LOSS_BASE + distance))
+
+    def propagate(side: int, index: int, distance: int) -> None:
+        """ Passes the result of a newly resolved position back to the positions that can move to it """
+        previous_side = 1 - side
+        won = values[side][index] < LOSS_BASE
+        for previous in _predecessors(signature, position_from_index(signature, index), colours[previous_side]):
+            if values[previous_side][previous] != DRAW:
+                continue
+            if not won:
+                buckets.setdefault(distance + 1, []).append((previous_side, previous, WIN_BASE + distance + 1))
+                continue
+            remaining[previous_side][previous] -= 1
+            longest[previous_side][previous] = max(longest[previous_side][previous], distance)
+            if remaining[previous_side][previous] == 0 and not escapes[previous_side][previous]:
+                loss = longest[previous_side][previous] + 1
+                buckets.setdefault(loss, []).append((previous_side, previous, LOSS_BASE + loss))
+
+    for side, index, distance in terminals:
+        propagate(side, index, distance)
+
+    distance = 1
+    while buckets:
+        if distance > MAX_DISTANCE:
+            raise OverflowError(f'{signature} has a position more than {MAX_DISTANCE} plies from its result')
+        for side, index, value in buckets.pop(distance, []):
+            if values[side][index] == DRAW:
+                values[side][index] = value
+                propagate(side, index, distance)
+        distance += 1
+    return values
+
+
+def _file_name(signature: tuple[int, int, int, int]) -> str:
+    """ Returns the name of the file of a signature
+
+    >>> _file_name((1, 0, 0, 2))
+    '1002.cktb'
+    """
+    return ''.join(str(count) for count in signature) + '.cktb'
+
+
+def generate(directory: str, max_pieces: int = 4, verbose: bool = False) -> None:
+    """ Generates the tablebase files of every signature with at most max_pieces pieces into a directory.
+
+    Files already in the directory are read instead of generated again, so an interrupted run can be continued.
+
+    Parameters:
+    - directory: the directory to write the files to, created if it does not exist.
+    - max_pieces: the most pieces in any position of the tablebases.
+    - verbose: whether to print each signature as it is solved.
+
+    Preconditions:
+    - 2 <= max_pieces <= 9
+    """
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    for signature in signatures(max_pieces):
+        path = os.path.join(directory, _file_name(signature))
+        size = table_size(signature)
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                file.seek(_HEADER.size)
+                solved[signature] = (file.read(size), file.read(size))
+            continue
+
+        start = time.perf_counter()
+        black_to_move, white_to_move = _solve(signature, solved)
+        solved[signature] = (bytes(black_to_move), bytes(white_to_move))
+        with open(path + '.tmp', 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, *signature, size))
+            file.write(black_to_move)
+            file.write(white_to_move)
+        os.replace(path + '.tmp', path)
+        if verbose:
+            print(f'{_file_name(signature)}: {2 * size} positions in {time.perf_counter() - start:.1f}s')
+
+
+# @check_contracts
+class Tablebase:
+    """ The tablebase files in a directory, opened as memory maps the first time a position of their signature is
+    probed.
+
+    Instance Attributes:
+    - directory: the directory holding the files.
+    - max_pieces: the largest number of pieces such that every signature with that many pieces or fewer has a file.
+
+    Private Instance Attributes:
+    - _paths: the path of the file of each signature in the directory.
+    - _tables: the size and memory map of each file opened so far.
+
+    Representation Invariants:
+    - self.max_pieces >= 0
+    """
+    directory: str
+    max_pieces: int
+    _paths: dict[tuple[int, int, int, int], str]
+    _tables: dict[tuple[int, int, int, int], tuple[int, mmap.mmap]]
+
+    def __init__(self, directory: str) -> None:
+        """ Finds the tablebase files in a directory, which may not exist """
+        self.directory = directory
+        self._paths = {}
+        self._tables = {}
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                match = _FILE_NAME.match(name)
+                if match is not None:
+                    self._paths[tuple(int(count) for count in match.groups())] = os.path.join(directory, name)
+
+        self.max_pieces = 0
+        while self._paths and all(signature in self._paths for signature in signatures(self.max_pieces + 1)):
+            self.max_pieces += 1
+
+    def _table(self, signature: tuple[int, int, int, int]) -> Optional[tuple[int, mmap.mmap]]:
+        """ Returns the size and memory map of the file of a signature, opening it if needed, or None if there is no
+        file for the signature.
+        """
+        if signature not in self._tables:
+            if signature not in self._paths:
+                return None
+            with open(self._paths[signature], 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, *file_signature, size = _HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION or tuple(file_signature) != signature:
+                data.close()
+                raise ValueError(f'{self._paths[signature]} is not a tablebase file for {signature}')
+            self._tables[signature] = (size, data)
+        return self._tables[signature]
+
+    def probe(self, board: Board | BitBoard, colour: int) -> Optional[tuple[int, int]]:
+        """ Looks up a position in the tablebase.
+
+        Parameters:
+        - board: the position to look up.
+        - colour: the colour of the player to move.
+
+        Returns:
+        - A tuple of the result of the position from colour's point of view (WIN, DRAW or LOSS) and the number of
+        plies until the game is won or lost with best play, or None if the position is not in the tablebase.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        if isinstance(board, Board):
+            board = BitBoard.from_board(board)
+        terminal = _terminal_value(board, colour)
+        if terminal is not None:
+            return decode(terminal)
+
+        signature = signature_of(board)
+        table = self._table(signature)
+        if table is None:
+            return None
+        size, data = table
+        offset = _HEADER.size + (0 if colour == BLACK else size)
+        return decode(data[offset + position_index(signature, board.black, board.white, board.kings)])
+
+    def best_move(self, board: Board | BitBoard,
+                  colour: int) -> Optional[tuple[tuple[tuple[int, int], tuple[int, int]], int, int]]:
+        """ Finds the best move in a position from the tablebase: the fastest win, any draw, or the slowest loss.
+
+        Parameters:
+        - board: the position to find a move in.
+        - colour: the colour of the player to move.
+
+        Returns:
+        - A tuple of the start and end square of the move, the result of the position from colour's point of view and
+        the number of plies until the game is won or lost, or None if colour has no moves or a position after one of
+        the moves is not in the tablebase.
+
+        Preconditions:
+        - colour in (BLACK, WHITE)
+        """
+        if isinstance(board, Board):
+            board = BitBoard.from_board(board)
+        opponent = WHITE if colour == BLACK else BLACK
+        best = None
+        best_key = None
+        for move in board.legal_moves(colour):
+            undo = board.make_move(move)
+            probe = self.probe(board, opponent)
+            board.unmake_move(undo)
+            if probe is None:
+                return None
+            result, distance = -probe[0], probe[1] + 1
+            key = (result, -distance if result == WIN else distance)
+            if best_key is None or key > best_key:
+                best, best_key = ((move[0], move[1]), result, distance if result != DRAW else 0), key
+        return best
+
+    def close(self) -> None:
+        """ Closes every file opened so far """
+        for _, data in self._tables.values():
+            data.close()
+        self._tables = {}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Generates tablebases from the command line """
+    parser = argparse.ArgumentParser(description='Generate checkers endgame tablebases.')
+    parser.add_argument('--pieces', type=int, default=4, help='the most pieces in any position')
+    parser.add_argument('--out', default='tablebases', help='the directory to write the files to')
+    args = parser.parse_args(argv)
+    generate(args.out, args.pieces, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
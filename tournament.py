@@ -0,0 +1,276 @@
+""" Checkers self-play tournament
+
+Module Description
+==================
+
+This module contains a command line tournament runner that plays games between two AI configurations without a
+display. Games are spread across a pool of processes, and the result of every game is appended to a JSON lines file
+and to a binary game corpus (see corpus.py) as soon as it finishes. A game is drawn by threefold repetition, by a
+number of plies without a capture or a man moving, or when it reaches a maximum number of plies, so every game ends.
+
+Example, playing 100 games across 8 processes:
+
+    python tournament.py --games 100 --workers 8 --a mode=alphabeta,depth=6 --b mode=average,depth=4 \
+        --out results.jsonl --corpus games.corpus
+
+An engine configuration is a comma separated list of key=value options:
+- mode: 'alphabeta' or 'average'.
+- depth: the search depth, or the game tree depth in average mode.
+- time: the time budget per move in milliseconds, for alphabeta mode.
+- bitboard: 1 to search on a BitBoard, 0 to search on Board copies.
+- tt: the size of the transposition table in megabytes.
+- workers: the number of processes each alphabeta search spreads its root moves across, 1 (the default) to search
+  in the engine's own process.
+- tb: a directory of endgame tablebase files to play from once few enough pieces are left.
+- book: an opening book file to play from while the game is still in it.
+- stats: 1 to add statistics about how the engine chose each of its moves to the game records.
+- eval: the evaluator that scores positions, 'material', 'positional' (the default) or a weights file written by
+  tuning.py.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Optional, TextIO
+import argparse
+import contextlib
+import json
+import random
+import sys
+import time
+from bitboard import BitBoard
+from gametree import GameTree
+from ai import AI, AVERAGE_MODE, ALPHABETA_MODE
+from evaluation import make_evaluator
+from parallel import ParallelSearch
+from gamestatus import GameStatus, DEFAULT_NO_PROGRESS_PLIES
+from constants import *
+
+if TYPE_CHECKING:
+    from corpus import CorpusWriter
+
+# The number of plies after which a game is called a draw.
+DEFAULT_MAX_PLIES = 200
+
+
+def parse_engine(spec: str) -> dict[str, Any]:
+    """ Returns the keyword arguments for AI described by an engine configuration string.
+
+    Parameters:
+    - spec: a comma separated list of key=value options, as described in the module docstring.
+
+    >>> parse_engine('mode=alphabeta,depth=6,time=200')
+    {'use_bitboard': True, 'mode': 'alphabeta', 'search_depth': 6, 'time_budget_ms': 200}
+    >>> parse_engine('mode=alphabeta,time=500,workers=4')
+    {'use_bitboard': True, 'mode': 'alphabeta', 'time_budget_ms': 500, 'workers': 4}
+    >>> parse_engine('mode=average,depth=3,bitboard=0')
+    {'use_bitboard': False, 'mode': 'average', 'tree_depth': 3}
+    """
+    options = dict(item.split('=', 1) for item in spec.split(',') if item)
+    config = {'use_bitboard': options.pop('bitboard', '1') != '0', 'mode': options.pop('mode', ALPHABETA_MODE)}
+    if config['mode'] not in (AVERAGE_MODE, ALPHABETA_MODE):
+        raise ValueError(f"unknown mode {config['mode']!r}")
+
+    if 'depth' in options:
+        depth_key = 'tree_depth' if config['mode'] == AVERAGE_MODE else 'search_depth'
+        config[depth_key] = int(options.pop('depth'))
+    if 'time' in options:
+        config['time_budget_ms'] = int(options.pop('time'))
+    if 'tt' in options:
+        config['tt_size_mb'] = float(options.pop('tt'))
+    if 'workers' in options:
+        config['workers'] = int(options.pop('workers'))
+    if 'tb' in options:
+        config['tablebase_dir'] = options.pop('tb')
+    if 'book' in options:
+        config['book_path'] = options.pop('book')
+    if 'stats' in options:
+        config['collect_stats'] = options.pop('stats') != '0'
+    if 'eval' in options:
+        config['evaluator'] = make_evaluator(options.pop('eval'))
+
+    if options:
+        raise ValueError(f'unknown engine options {sorted(options)}')
+    return config
+
+
+def play_game(white: dict[str, Any], black: dict[str, Any], max_plies: int = DEFAULT_MAX_PLIES,
+              random_plies: int = 0, seed: Optional[int] = None,
+              no_progress_plies: int = DEFAULT_NO_PROGRESS_PLIES) -> dict[str, Any]:
+    """ Plays one game between two AI configurations and returns its record.
+
+    Parameters:
+    - white: the keyword arguments for the AI playing white, who moves first.
+    - black: the keyword arguments for the AI playing black.
+    - max_plies: the number of plies after which the game is called a draw.
+    - random_plies: the number of plies at the start of the game that are played at random instead of by the AIs,
+    so that games between the same configurations differ.
+    - seed: the seed of the random opening plies.
+    - no_progress_plies: the number of plies without a capture or a man moving after which the game is drawn.
+
+    Returns:
+    - A dictionary with the winning colour ('white', 'black' or 'draw'), why the game ended (one of the reasons in
+    gamestatus, or 'max plies'), the number of plies played, the moves played, the score from black's point of view
+    of each move (None for a random one) and the milliseconds each side spent on each of its moves, along with the
+    search statistics of each side that collects them.
+    """
+    board = BitBoard()
+    engines = {WHITE: AI(GameTree(board), colour=WHITE, **white), BLACK: AI(GameTree(board), colour=BLACK, **black)}
+    think_ms = {WHITE: [], BLACK: []}
+    moves = []
+    scores = []
+    turn, prev_move = WHITE, '*'
+    status = GameStatus(board, turn, no_progress_plies)
+    rng = random.Random(seed)
+
+    while not status.is_over() and len(moves) < max_plies:
+        if len(moves) < random_plies:
+            move = rng.choice(board.legal_moves(turn))
+            prev_move = (move[0], move[1])
+            scores.append(None)
+        else:
+            engine = engines[turn]
+            current = board.to_board()
+            start = time.perf_counter()
+            engine.update_game_tree(prev_move, current)
+            prev_move = engine.make_move()
+            think_ms[turn].append(round((time.perf_counter() - start) * 1000, 3))
+            scores.append(engine.game_tree.material_advantage)
+
+        for move in board.legal_moves(turn):
+            if (move[0], move[1]) == prev_move:
+                status.play(board, move)
+                break
+        moves.append(prev_move)
+        turn = BLACK if turn == WHITE else WHITE
+
+    record = {
+        'result': 'white' if status.winner == WHITE else 'black' if status.winner == BLACK else 'draw',
+        'reason': status.reason if status.is_over() else 'max plies',
+        'plies': len(moves),
+        'moves': moves,
+        'scores': scores,
+        'think_ms': {'white': think_ms[WHITE], 'black': think_ms[BLACK]}
+    }
+    for engine in engines.values():
+        if isinstance(engine.search, ParallelSearch):
+            engine.search.shutdown()
+    if engines[WHITE].collect_stats or engines[BLACK].collect_stats:
+        record['stats'] = {'white': engines[WHITE].stats_log, 'black': engines[BLACK].stats_log}
+    return record
+
+
+def _play_numbered_game(game: int, engine_a: dict[str, Any], engine_b: dict[str, Any], max_plies: int,
+                        random_plies: int, no_progress_plies: int) -> dict[str, Any]:
+    """ Plays game number game of a tournament, with engine a playing white in even games and black in odd ones.
+    Consecutive games share the seed of their random opening plies, so both engines play each opening from both sides.
+    """
+    if game % 2 == 0:
+        record = {'game': game, 'white': 'a', 'black': 'b'}
+        record.update(play_game(engine_a, engine_b, max_plies, random_plies, game // 2, no_progress_plies))
+    else:
+        record = {'game': game, 'white': 'b', 'black': 'a'}
+        record.update(play_game(engine_b, engine_a, max_plies, random_plies, game // 2, no_progress_plies))
+    record['winner'] = record[record['result']] if record['result'] != 'draw' else None
+    return record
+
+
+def run_tournament(engine_a: dict[str, Any], engine_b: dict[str, Any], games: int, workers: Optional[int] = None,
+                   output: Optional[TextIO] = None, max_plies: int = DEFAULT_MAX_PLIES,
+                   random_plies: int = 0, no_progress_plies: int = DEFAULT_NO_PROGRESS_PLIES,
+                   corpus: Optional[CorpusWriter] = None) -> dict[str, Any]:
+    """ Plays a number of games between two AI configurations across a pool of processes, with each configuration
+    playing white in half of the games.
+
+    Parameters:
+    - engine_a: the keyword arguments for the first AI.
+    - engine_b: the keyword arguments for the second AI.
+    - games: the number of games to play.
+    - workers: the number of processes to play games in, by default one per core.
+    - output: a text file to write the record of each game to as a JSON line as soon as it finishes, or None.
+    - max_plies: the number of plies after which a game is called a draw.
+    - random_plies: the number of plies at the start of each game that are played at random.
+    - no_progress_plies: the number of plies without a capture or a man moving after which a game is drawn.
+    - corpus: a corpus to append each game to as soon as it finishes, or None.
+
+    Returns:
+    - A summary of the tournament: the wins of each engine, the draws and how many were drawn for each reason, the
+    average game length in plies and the average milliseconds each engine spent per move.
+
+    Preconditions:
+    - games >= 0
+    """
+    wins = {'a': 0, 'b': 0}
+    draws = 0
+    draw_reasons = {}
+    plies = 0
+    think_ms = {'a': [], 'b': []}
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_play_numbered_game, game, engine_a, engine_b, max_plies, random_plies,
+                                   no_progress_plies)
+                   for game in range(games)]
+        for future in as_completed(futures):
+            record = future.result()
+            if output is not None:
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+            if corpus is not None:
+                corpus.add_records([record])
+                corpus.flush()
+
+            if record['winner'] is None:
+                draws += 1
+                draw_reasons[record['reason']] = draw_reasons.get(record['reason'], 0) + 1
+            else:
+                wins[record['winner']] += 1
+            plies += record['plies']
+            think_ms[record['white']].extend(record['think_ms']['white'])
+            think_ms[record['black']].extend(record['think_ms']['black'])
+
+    return {
+        'games': games,
+        'a_wins': wins['a'],
+        'b_wins': wins['b'],
+        'draws': draws,
+        'draw_reasons': draw_reasons,
+        'average_plies': plies / games if games else 0.0,
+        'a_average_think_ms': sum(think_ms['a']) / len(think_ms['a']) if think_ms['a'] else 0.0,
+        'b_average_think_ms': sum(think_ms['b']) / len(think_ms['b']) if think_ms['b'] else 0.0
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Runs a tournament from the command line and prints its summary as JSON """
+    parser = argparse.ArgumentParser(description='Play games between two checkers AI configurations.')
+    parser.add_argument('--a', type=parse_engine, default=parse_engine(''), help='the first engine configuration')
+    parser.add_argument('--b', type=parse_engine, default=parse_engine(''), help='the second engine configuration')
+    parser.add_argument('--games', type=int, default=100, help='the number of games to play')
+    parser.add_argument('--workers', type=int, default=None, help='the number of processes, by default one per core')
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+                        help='the number of plies after which a game is a draw')
+    parser.add_argument('--random-plies', type=int, default=0,
+                        help='the number of plies at the start of each game that are played at random')
+    parser.add_argument('--no-progress-plies', type=int, default=DEFAULT_NO_PROGRESS_PLIES,
+                        help='the number of plies without a capture or a man moving after which a game is a draw')
+    parser.add_argument('--out', default=None, help='a JSON lines file to append the record of each game to')
+    parser.add_argument('--corpus', default=None, help='a corpus file to append each game to')
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        output = stack.enter_context(open(args.out, 'a')) if args.out is not None else None
+        corpus = None
+        if args.corpus is not None:
+            from corpus import CorpusWriter  # only needed, along with numpy, to write a corpus
+            corpus = stack.enter_context(CorpusWriter(args.corpus))
+        summary = run_tournament(args.a, args.b, args.games, args.workers, output, args.max_plies, args.random_plies,
+                                 args.no_progress_plies, corpus)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
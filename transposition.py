@@ -0,0 +1,123 @@
+""" Checkers transposition table
+
+Module Description
+==================
+
+This module contains a fixed-size table of search results keyed by Zobrist hash, so that the search can reuse what it
+learnt about a position when it reaches the same position again through a different order of moves.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from typing import Optional
+
+# Whether a stored score is the exact score of the position, or only a bound on it because the search was cut off.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Roughly how many bytes one entry takes up, counting the entry's tuple, its key and score, and its slot in the table.
+ENTRY_BYTES = 200
+
+
+# @check_contracts
+class TranspositionTable:
+    """ A fixed-size table of search results.
+
+    Each hash maps to a single slot. A new result replaces the one in its slot if the old one was stored by an
+    earlier search or was searched to a depth no deeper than the new one.
+
+    Instance Attributes:
+    - size: the number of slots in the table.
+    - probes: the number of times the table has been looked up.
+    - hits: the number of lookups that found the position they were looking for.
+
+    Private Instance Attributes:
+    - _slots: the entries of the table, each a tuple of the hash, depth, score, bound, best move and the generation
+    of the search that stored it, or None for an empty slot.
+    - _generation: a counter increased at the start of every search.
+
+    Representation Invariants:
+    - self.size >= 1
+    - len(self._slots) == self.size
+    - 0 <= self.hits <= self.probes
+    """
+    size: int
+    probes: int
+    hits: int
+    _slots: list[Optional[tuple]]
+    _generation: int
+
+    def __init__(self, size_mb: float = 16) -> None:
+        """ Initializes an empty table that takes up about size_mb megabytes when full
+
+        Preconditions:
+        - size_mb > 0
+        """
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.probes = 0
+        self.hits = 0
+        self._slots = [None] * self.size
+        self._generation = 0
+
+    def new_search(self) -> None:
+        """ Marks every stored entry as belonging to an earlier search, so that any of them can be replaced """
+        self._generation += 1
+
+    def probe(self, key: int) -> Optional[tuple[int, float, int, Optional[tuple[tuple[int, int], tuple[int, int]]]]]:
+        """ Looks up a position in the table.
+
+        Parameters:
+        - key: the Zobrist hash of the position, including the player to move.
+
+        Returns:
+        - A tuple of the depth, score, bound and best move stored for the position, or None if it is not stored.
+        """
+        self.probes += 1
+        entry = self._slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int,
+              move: Optional[tuple[tuple[int, int], tuple[int, int]]]) -> None:
+        """ Stores a search result, unless its slot holds a deeper result from the current search.
+
+        Parameters:
+        - key: the Zobrist hash of the position, including the player to move.
+        - depth: the number of plies the position was searched to.
+        - score: the score of the position from the point of view of the player to move.
+        - bound: EXACT, LOWER_BOUND or UPPER_BOUND.
+        - move: the best move found in the position, or None if there is none.
+
+        Preconditions:
+        - bound in (EXACT, LOWER_BOUND, UPPER_BOUND)
+        """
+        index = key % self.size
+        entry = self._slots[index]
+        if entry is None or entry[5] != self._generation or depth >= entry[1]:
+            self._slots[index] = (key, depth, score, bound, move, self._generation)
+
+    def hit_rate(self) -> float:
+        """ Returns the fraction of lookups that found their position, or 0.0 if there have been none """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self) -> None:
+        """ Empties the table and resets its statistics """
+        self._slots = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120
+    })
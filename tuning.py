@@ -0,0 +1,300 @@
+""" Checkers evaluation tuning
+
+Module Description
+==================
+
+This module contains a command line tool that tunes the weights of the PositionalEvaluator to a corpus of games, in
+the style of Texel tuning. Every quiet position of every game, one where the player to move has no capture, is
+labelled with the game's outcome for black: 1 for a win, 0.5 for a draw and 0 for a loss. The weights are then chosen
+to minimise the logistic loss of predicting those outcomes from the evaluator's scores, times a scale fitted to the
+default weights first.
+
+A PositionalEvaluator's score is a weighted sum of its terms, so the terms of every position are extracted once, in
+batches with NumPy by evaluation.feature_matrix, and the loss is minimised with Newton's method, which converges in a
+few passes over the positions. The tuned weights are written to a JSON file that the AI loads at startup.
+
+Examples, tuning on the games of a tournament and a PDN file, and on a corpus file written by corpus.py:
+
+    python tuning.py --jsonl results.jsonl --pdn games.pdn --out weights.json
+    python tuning.py --corpus games.corpus --out weights.json
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+from array import array
+from typing import Any, Iterable, Optional
+import argparse
+import json
+import time
+import numpy as np
+import pdn
+from bitboard import BitBoard
+from evaluation import DEFAULT_WEIGHTS, FEATURES, feature_matrix
+from corpus import CorpusReader, QUIET, masks
+from constants import *
+
+# The number of plies at the start of each game whose positions are left out, since they are the same in most games.
+DEFAULT_SKIP_PLIES = 8
+
+# The number of Newton steps taken to minimise the loss.
+DEFAULT_ITERATIONS = 25
+
+# The strength of the L2 penalty that keeps the weights near the default weights when the corpus says little about them.
+DEFAULT_L2 = 1.0
+
+# The number of positions whose terms are extracted at once.
+_CHUNK = 1 << 16
+
+# The outcome for black of a game, keyed by the winner.
+_OUTCOMES = {BLACK: 1.0, WHITE: 0.0, None: 0.5}
+
+
+# @check_contracts
+class Corpus:
+    """ The positions of a corpus of games, with the outcome of each position's game for black.
+
+    Instance Attributes:
+    - black: the black mask of each position.
+    - white: the white mask of each position.
+    - kings: the king mask of each position.
+    - outcomes: the outcome for black of each position's game.
+    - games: the number of games the positions were taken from.
+
+    Representation Invariants:
+    - len(self.black) == len(self.white) == len(self.kings) == len(self.outcomes)
+    """
+    black: array
+    white: array
+    kings: array
+    outcomes: array
+    games: int
+
+    def __init__(self) -> None:
+        """ Initializes an empty corpus """
+        self.black = array('Q')
+        self.white = array('Q')
+        self.kings = array('Q')
+        self.outcomes = array('d')
+        self.games = 0
+
+    def __len__(self) -> int:
+        """ Returns the number of positions in the corpus """
+        return len(self.outcomes)
+
+    def add_game(self, moves: Iterable[tuple[tuple[int, int], tuple[int, int]]], winner: Optional[int],
+                 skip_plies: int = DEFAULT_SKIP_PLIES) -> None:
+        """ Adds the quiet positions of a game, stopping at its first move that is not legal.
+
+        Parameters:
+        - moves: the start and end square of each move of the game, from the starting position with white to move.
+        - winner: the colour that won the game, or None if it was drawn.
+        - skip_plies: the number of plies at the start of the game whose positions are left out.
+
+        >>> corpus = Corpus()
+        >>> corpus.add_game([((5, 0), (4, 1)), ((2, 1), (3, 2))], BLACK, skip_plies=0)
+        >>> len(corpus), corpus.outcomes[0]
+        (3, 1.0)
+        """
+        board = BitBoard()
+        colour = WHITE
+        outcome = _OUTCOMES[winner]
+        moves = iter(moves)
+        ply = 0
+        while True:
+            legal_moves = board.legal_moves(colour)
+            if ply >= skip_plies and not any(move[2] for move in legal_moves):
+                self._add_position(board, outcome)
+            key = next(moves, None)
+            if key is None:
+                break
+            start, end = tuple(key[0]), tuple(key[1])
+            legal = [move for move in legal_moves if (move[0], move[1]) == (start, end)]
+            if not legal:
+                break
+            board.make_move(legal[0])
+            colour = BLACK if colour == WHITE else WHITE
+            ply += 1
+        self.games += 1
+
+    def _add_position(self, board: BitBoard, outcome: float) -> None:
+        """ Adds one position with the outcome of its game """
+        self.black.append(board.black)
+        self.white.append(board.white)
+        self.kings.append(board.kings)
+        self.outcomes.append(outcome)
+
+    def add_records(self, records: Iterable[dict[str, Any]], skip_plies: int = DEFAULT_SKIP_PLIES) -> None:
+        """ Adds the games recorded by tournament.play_game """
+        for record in records:
+            winner = WHITE if record['result'] == 'white' else BLACK if record['result'] == 'black' else None
+            self.add_game(record['moves'], winner, skip_plies)
+
+    def add_pdn(self, text: str, skip_plies: int = DEFAULT_SKIP_PLIES) -> int:
+        """ Adds the games of a PDN text that have a known result, and returns the number of those left out because
+        one of their moves is not legal
+
+        >>> corpus = Corpus()
+        >>> corpus.add_pdn('1. 11-15 23-19 2. 8-11 22-17 1-0 1. 11-15 11-15 0-1 1. 11-15 *', skip_plies=0)
+        1
+        >>> corpus.games, len(corpus), corpus.outcomes.tolist()
+        (1, 5, [0.0, 0.0, 0.0, 0.0, 0.0])
+        """
+        games, rejected = pdn.legal_games(text)
+        for moves, winner in games:
+            self.add_game(moves, winner, skip_plies)
+        return rejected
+
+    def add_corpus(self, reader: CorpusReader, skip_plies: int = DEFAULT_SKIP_PLIES) -> None:
+        """ Adds the quiet positions of the games of a corpus file, in batches without replaying the games """
+        games = set()
+        for batch in reader.batches():
+            batch = batch[(batch['flags'] & QUIET != 0) & (batch['ply'] >= skip_plies)]
+            black, white, kings, _ = masks(batch)
+            self.black.frombytes(black.astype(np.uint64).tobytes())
+            self.white.frombytes(white.astype(np.uint64).tobytes())
+            self.kings.frombytes(kings.astype(np.uint64).tobytes())
+            self.outcomes.frombytes(((batch['result'] + 1) / 2).astype(np.float64).tobytes())
+            games.update(np.unique(batch['game']).tolist())
+        self.games += len(games)
+
+    def features(self) -> np.ndarray:
+        """ Returns the matrix of the terms of every position, as evaluation.feature_matrix, extracted in batches """
+        black, white, kings = (np.frombuffer(masks, dtype=np.uint64) for masks in (self.black, self.white, self.kings))
+        if len(black) == 0:
+            return np.zeros((0, len(FEATURES)))
+        return np.concatenate([feature_matrix(black[i:i + _CHUNK], white[i:i + _CHUNK], kings[i:i + _CHUNK])
+                               for i in range(0, len(black), _CHUNK)])
+
+
+def logistic_loss(scores: np.ndarray, outcomes: np.ndarray) -> float:
+    """ Returns the mean logistic loss of predicting the outcomes from the scores, which are in logits.
+
+    >>> round(logistic_loss(np.array([0.0, 0.0]), np.array([1.0, 0.0])), 6)
+    0.693147
+    """
+    return float(np.mean(np.logaddexp(0, scores) - outcomes * scores))
+
+
+def fit(features: np.ndarray, outcomes: np.ndarray, scale: float, initial: np.ndarray,
+        iterations: int = DEFAULT_ITERATIONS, l2: float = DEFAULT_L2) -> np.ndarray:
+    """ Returns the weights that minimise the logistic loss of predicting the outcomes from the features' scores at
+    the given scale, plus an L2 penalty on their distance from the initial weights, found by Newton's method. The
+    penalty is measured in logits, so its strength does not depend on the scale.
+
+    Parameters:
+    - features: a matrix with a row of features for each position.
+    - outcomes: the outcome of each position, between 0 and 1.
+    - scale: the number that turns a score into logits.
+    - initial: the weights to start from, which the penalty pulls the result towards.
+    - iterations: the largest number of Newton steps to take.
+    - l2: the strength of the L2 penalty.
+
+    Preconditions:
+    - len(features) == len(outcomes) > 0
+    - len(initial) == features.shape[1]
+
+    >>> x = np.array([[-1.0], [1.0], [2.0], [-2.0]])
+    >>> bool(fit(x, np.array([0.25, 0.75, 0.9, 0.1]), 1.0, np.zeros(1))[0] > 0)
+    True
+    """
+    weights = initial.astype(np.float64)
+    l2 *= scale * scale
+    penalty = l2 * np.eye(features.shape[1])
+    for _ in range(iterations):
+        predictions = 1 / (1 + np.exp(-scale * (features @ weights)))
+        gradient = scale * features.T @ (predictions - outcomes) / len(outcomes) + l2 * (weights - initial)
+        hessian = scale * scale * (features * (predictions * (1 - predictions))[:, None]).T @ features \
+            / len(outcomes) + penalty
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.max(np.abs(step)) < 1e-9:
+            break
+    return weights
+
+
+def fit_scale(scores: np.ndarray, outcomes: np.ndarray, iterations: int = DEFAULT_ITERATIONS) -> float:
+    """ Returns the number that best turns the scores into logits predicting the outcomes
+
+    >>> round(fit_scale(np.array([1.0, -1.0]), np.array([0.75, 0.25])), 6)
+    1.098612
+    """
+    return float(fit(scores[:, None], outcomes, 1.0, np.zeros(1), iterations, 0.0)[0])
+
+
+def tune(features: np.ndarray, outcomes: np.ndarray, iterations: int = DEFAULT_ITERATIONS,
+         l2: float = DEFAULT_L2) -> tuple[dict[str, float], float]:
+    """ Returns the weights that best predict the outcomes, along with the scale that turns their scores into logits.
+
+    As in Texel tuning, the scale is fitted to the scores of the default weights first and then held fixed, so the
+    tuned weights stay in units of about one man.
+
+    Preconditions:
+    - len(features) == len(outcomes) > 0
+    """
+    initial = np.array([DEFAULT_WEIGHTS[name] for name in FEATURES])
+    scale = fit_scale(features @ initial, outcomes, iterations)
+    weights = fit(features, outcomes, scale, initial, iterations, l2)
+    return ({name: float(weight) for name, weight in zip(FEATURES, weights)}, scale)
+
+
+def weights_loss(features: np.ndarray, outcomes: np.ndarray, weights: dict[str, float], scale: float) -> float:
+    """ Returns the logistic loss of predicting the outcomes from the scores of the given weights at the given scale """
+    return logistic_loss(scale * (features @ np.array([weights[name] for name in FEATURES])), outcomes)
+
+
+def write_weights(path: str, weights: dict[str, float], scale: float, positions: int, loss: float) -> None:
+    """ Writes tuned weights to a JSON file that evaluation.PositionalEvaluator.from_file reads """
+    with open(path, 'w') as file:
+        json.dump({'weights': weights, 'scale': scale, 'positions': positions, 'loss': loss}, file, indent=2)
+        file.write('\n')
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """ Tunes the evaluation weights from the command line """
+    parser = argparse.ArgumentParser(description='Tune the checkers evaluation weights to a corpus of games.')
+    parser.add_argument('--jsonl', action='append', default=[], help='a JSON lines file written by tournament.py')
+    parser.add_argument('--pdn', action='append', default=[], help='a PDN file of games')
+    parser.add_argument('--corpus', action='append', default=[], help='a corpus file written by corpus.py')
+    parser.add_argument('--out', default='weights.json', help='the weights file to write')
+    parser.add_argument('--skip-plies', type=int, default=DEFAULT_SKIP_PLIES,
+                        help='the number of plies at the start of each game to leave out')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='the largest number of Newton steps')
+    parser.add_argument('--l2', type=float, default=DEFAULT_L2,
+                        help='the strength of the pull towards the default weights')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    corpus = Corpus()
+    for path in args.jsonl:
+        with open(path) as file:
+            corpus.add_records((json.loads(line) for line in file if line.strip()), args.skip_plies)
+    for path in args.pdn:
+        with open(path) as file:
+            rejected = corpus.add_pdn(file.read(), args.skip_plies)
+        if rejected:
+            print(f'{path}: skipped {rejected} game(s) with a move that is not legal')
+    for path in args.corpus:
+        corpus.add_corpus(CorpusReader(path), args.skip_plies)
+    if len(corpus) == 0:
+        parser.error('the corpus has no positions')
+    features = corpus.features()
+    outcomes = np.frombuffer(corpus.outcomes, dtype=np.float64)
+    print(f'{len(corpus)} positions from {corpus.games} games in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    weights, scale = tune(features, outcomes, args.iterations, args.l2)
+    default_loss = weights_loss(features, outcomes, DEFAULT_WEIGHTS, scale)
+    loss = weights_loss(features, outcomes, weights, scale)
+    print(f'loss {default_loss:.6f} with the default weights, {loss:.6f} tuned, in {time.perf_counter() - start:.1f}s')
+    for name in FEATURES:
+        print(f'{name:<10} {DEFAULT_WEIGHTS[name]:>8.4f} -> {weights[name]:>8.4f}')
+
+    write_weights(args.out, weights, scale, len(corpus), loss)
+    print(f'wrote {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+""" Checkers Zobrist hashing
+
+Module Description
+==================
+
+This module contains the random keys used to hash checkers positions. A position's hash is the XOR of the key of every
+piece on the board, so moving, capturing or promoting a piece updates the hash by XORing a few keys in and out.
+
+Copyright and Usage Information
+===============================
+
+This file is Copyright (c) 2023 Hubert Xu, Ibrahim Mohammad Malik, Ryan Zhang, Vishnu Neelanath
+"""
+from __future__ import annotations
+import random
+from constants import *
+
+_random = random.Random(2023)
+
+# PIECE_KEYS[row][col][kind] is the key of a piece of the given kind on the given square, where the kinds are a black
+# man, a black king, a white man and a white king.
+PIECE_KEYS = [[[_random.getrandbits(64) for _ in range(4)] for _ in range(COLS)] for _ in range(ROWS)]
+
+# XORed into a hash when it is black to move.
+BLACK_TO_MOVE = _random.getrandbits(64)
+
+
+def piece_key(row: int, col: int, colour: int, is_king: bool) -> int:
+    """ Returns the key of a piece with the given colour and rank on the given square.
+
+    Parameters:
+    - row: the row of the piece.
+    - col: the column of the piece.
+    - colour: the colour of the piece.
+    - is_king: whether the piece is a king.
+
+    Preconditions:
+    - row < ROWS and row >= 0
+    - col < COLS and col >= 0
+    - colour in (BLACK, WHITE)
+    """
+    return PIECE_KEYS[row][col][(0 if colour == BLACK else 2) + is_king]
+
+
+def side_key(colour: int) -> int:
+    """ Returns the key to XOR into a position's hash when the given colour is to move.
+
+    Parameters:
+    - colour: the colour of the player to move.
+
+    Preconditions:
+    - colour in (BLACK, WHITE)
+    """
+    return BLACK_TO_MOVE if colour == BLACK else 0
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['random', 'constants'],
+        'max-line-length': 120,
+        'disable': ['wildcard-import']
+    })